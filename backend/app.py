@@ -7,13 +7,16 @@ through Twilio integration with proper validation and error handling.
 
 import os
 import logging
-from fastapi import FastAPI, Response, Form, HTTPException, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response, Form, HTTPException
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field, validator
 from twilio.twiml.messaging_response import MessagingResponse
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from openai_client import get_ai_response
+from openai_client import generate_ai_response, fallback_reply, is_retryable, summarize_history, openai_manager
+from conversation_memory import conversation_memory
+from delivery_queue import DeliveryQueue, DeliveryJob, GenerationError, TwilioSender, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_WHATSAPP_NUMBER
+from rate_limiter import sender_limiter
+from coalescer import message_coalescer
 
 # Configure logging
 logging.basicConfig(
@@ -25,20 +28,62 @@ logger = logging.getLogger(__name__)
 # Configuration from environment variables
 MAX_MESSAGE_LENGTH = int(os.getenv("MAX_MESSAGE_LENGTH", "1000"))
 MAX_TOKENS = int(os.getenv("MAX_TOKENS", "150"))
-RATE_LIMIT = os.getenv("RATE_LIMIT_PER_MINUTE", "10/minute")
+# "async" acknowledges Twilio at once and delivers replies via the REST API; "sync" replies in the TwiML response
+REPLY_MODE = os.getenv("REPLY_MODE", "async").lower()
+BUSY_MESSAGE = "We are receiving a lot of messages right now. Please try again in a minute."
+
+if REPLY_MODE == "async" and not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN):
+    logger.warning("REPLY_MODE=async needs TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN; falling back to sync replies")
+    REPLY_MODE = "sync"
+
+async def generate_reply(sender: str, body: str) -> str:
+    """
+    Generate the reply to a message in the context of the sender's conversation and remember the exchange.
+    
+    Args:
+        sender (str): The sender's WhatsApp address.
+        body (str): The validated message content.
+        
+    Returns:
+        str: The AI-generated reply.
+        
+    Raises:
+        GenerationError: If OpenAI fails; nothing is remembered, so the delivery queue can retry.
+    """
+    history = conversation_memory.messages(sender)
+    try:
+        ai_response = await generate_ai_response(body, max_tokens=MAX_TOKENS, history=history)
+    except Exception as e:
+        raise GenerationError(f"OpenAI request failed: {e}", retryable=is_retryable(e)) from e
+    await conversation_memory.append(sender, body, ai_response)
+    return ai_response
+
+
+# Global delivery queue instance (its workers only run in async reply mode)
+delivery_queue = DeliveryQueue(generate_reply, TwilioSender())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared OpenAI connection pool and start the delivery workers on startup; drain and close them on shutdown."""
+    await openai_manager.start()
+    if REPLY_MODE == "async":
+        await delivery_queue.start()
+    yield
+    await delivery_queue.stop()
+    await delivery_queue.sender.aclose()
+    await openai_manager.aclose()
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
 
 app = FastAPI(
     title="WhatsApp Bot API",
     description="Production-ready FastAPI application for WhatsApp chatbot using Twilio",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Add rate limiting middleware
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Older messages of long conversations are summarized instead of resent verbatim
+conversation_memory.summarizer = summarize_history
 
 
 class TwilioRequest(BaseModel):
@@ -48,9 +93,11 @@ class TwilioRequest(BaseModel):
     Attributes:
         Body (str): The message content sent by the user.
         From (str): The phone number of the message sender.
+        To (str): Our WhatsApp number the message was sent to (replies are sent from it).
     """
     Body: str = Field(..., max_length=MAX_MESSAGE_LENGTH, min_length=1)
     From: str = Field(..., regex=r'^whatsapp:\+\d{1,15}$')
+    To: str = Field(TWILIO_WHATSAPP_NUMBER, regex=r'^(whatsapp:\+\d{1,15})?$')
     
     @validator('Body')
     def validate_message_content(cls, v):
@@ -77,15 +124,45 @@ async def root() -> dict[str, str]:
     return {"message": "WhatsApp Bot API is running", "status": "healthy"}
 
 
+@app.get("/metrics")
+async def metrics() -> dict:
+    """
+    Runtime metrics endpoint.
+    
+    Returns:
+        dict: OpenAI connection pool utilization, delivery queue, rate limiter and coalescing
+              counters, and the number of remembered conversations.
+    """
+    return {
+        "openai": openai_manager.metrics(),
+        "delivery": dict(delivery_queue.metrics(), mode=REPLY_MODE),
+        "rate_limit": sender_limiter.metrics(),
+        "coalesced_messages": message_coalescer.merged,
+        "conversations": len(conversation_memory)
+    }
+
+
+def enqueue_delivery(sender: str, recipient: str, body: str) -> None:
+    """Queue a (possibly coalesced) message for the delivery workers, or tell the sender to retry later."""
+    job = DeliveryJob(sender=sender, recipient=recipient, body=body)
+    if not delivery_queue.enqueue(job):
+        # The queue filled up while the message waited in the coalescer
+        logger.warning(f"Delivery queue full, asking {sender} to retry later")
+        delivery_queue.reply_now(job, BUSY_MESSAGE)
+
+
 @app.post("/webhook")
-@limiter.limit(RATE_LIMIT)
-async def webhook(request: Request, data: TwilioRequest = Form(...)) -> Response:
+async def webhook(data: TwilioRequest = Form(...)) -> Response:
     """
     Handle incoming WhatsApp messages from Twilio webhook.
     
-    This endpoint processes incoming WhatsApp messages sent via Twilio's webhook,
-    validates the form data using Pydantic models, generates an AI response using 
-    OpenAI, and returns a TwiML response back to the sender.
+    This endpoint processes incoming WhatsApp messages sent via Twilio's webhook and
+    validates the form data using Pydantic models and rate-limits each sender by phone
+    number. Messages a sender sends in quick succession are coalesced into one query.
+    In async reply mode the message is queued and an empty TwiML response is returned
+    at once; a delivery worker sends the AI response through the Twilio REST API. In
+    sync mode the AI response is generated using OpenAI and returned in the TwiML
+    response of the request that opened the batch; the merged requests get an empty one.
     
     Args:
         data (TwilioRequest): Validated form data containing message body and sender
@@ -95,26 +172,60 @@ async def webhook(request: Request, data: TwilioRequest = Form(...)) -> Response
         Response: XML response containing TwiML for replying to the message.
         
     Raises:
-        HTTPException: 500 if there's an internal server error processing the request.
+        HTTPException: 429 if the sender is over their rate limit, 500 if there's an
+                       internal server error processing the request.
     """
+    allowed, retry_after = sender_limiter.acquire(data.From)
+    if not allowed:
+        logger.warning(f"Rate limit exceeded for {data.From}")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many messages. Please slow down.",
+            headers={"Retry-After": str(max(1, round(retry_after)))}
+        )
+    
     try:
         # Log received message for debugging (only log first 100 chars for security)
         safe_message = data.Body[:100] + "..." if len(data.Body) > 100 else data.Body
         logger.info(f"Message from {data.From}: {safe_message}")
         
-        # Get AI response from OpenAI with configurable max_tokens
-        ai_response = await get_ai_response(data.Body, max_tokens=MAX_TOKENS)
+        twiml_response = MessagingResponse()
+        
+        if REPLY_MODE == "async":
+            # Acknowledge Twilio immediately; the (coalesced) reply is generated and delivered by a worker
+            if delivery_queue.full():
+                logger.warning(f"Delivery queue full, asking {data.From} to retry later")
+                twiml_response.message(BUSY_MESSAGE)
+            else:
+                message_coalescer.add(
+                    data.From, data.Body, lambda sender, body: enqueue_delivery(sender, data.To, body)
+                )
+            return Response(content=str(twiml_response), media_type="application/xml")
+        
+        # Wait for the sender's burst to end; later messages of the burst are answered by this request
+        query = await message_coalescer.submit(data.From, data.Body)
+        if query is None:
+            return Response(content=str(twiml_response), media_type="application/xml")
+        
+        # Get AI response from OpenAI with configurable max_tokens, in the context of the sender's conversation
+        history = conversation_memory.messages(data.From)
+        try:
+            ai_response = await generate_ai_response(query, max_tokens=MAX_TOKENS, history=history)
+        except Exception as e:
+            # Apologize, but keep the failed exchange out of the conversation memory
+            twiml_response.message(fallback_reply(e))
+            return Response(content=str(twiml_response), media_type="application/xml")
         
         # Create TwiML response with AI-generated content
-        twiml_response = MessagingResponse()
         twiml_response.message(ai_response)
         
         logger.info(f"Sent response to {data.From} (length: {len(ai_response)})")
         
-        # Return XML response
+        # Return XML response; the exchange is remembered (and summarized if needed) after it is sent
         return Response(
             content=str(twiml_response),
-            media_type="application/xml"
+            media_type="application/xml",
+            background=BackgroundTask(conversation_memory.append, data.From, query, ai_response)
         )
         
     except ValueError as e:
@@ -0,0 +1,131 @@
+"""
+Message Coalescer Module.
+
+People often send a thought as several short WhatsApp messages in a row.
+This module merges such bursts, so they are answered with one OpenAI call
+instead of one call per message. A message is answered at once unless it
+arrives within COALESCE_WINDOW seconds of the sender's previous one; only
+then is a batch opened, which collects the sender's messages for one window.
+Single messages therefore never wait.
+"""
+
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Configuration from environment variables
+COALESCE_WINDOW = float(os.getenv("COALESCE_WINDOW", "2.0"))  # seconds; 0 disables coalescing
+COALESCE_MAX_MESSAGES = int(os.getenv("COALESCE_MAX_MESSAGES", "5"))
+
+FlushCallback = Callable[[str, str], None]
+
+
+@dataclass
+class _Batch:
+    """Messages collected for one sender and the callback that receives them."""
+    on_flush: FlushCallback
+    messages: List[str] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class MessageCoalescer:
+    """
+    Per-sender batching of messages that arrive in quick succession.
+
+    A batch is opened by a sender's second message within the window, and
+    flushed when its window closes or when it reaches max_messages. Only used
+    from the event loop, so it needs no lock.
+    """
+
+    def __init__(self, window: float = COALESCE_WINDOW, max_messages: int = COALESCE_MAX_MESSAGES):
+        self.window = window
+        self.max_messages = max_messages
+        self._batches: Dict[str, _Batch] = {}
+        # Senders seen within the last window -> loop time of their last message, oldest first
+        self._last_seen: "OrderedDict[str, float]" = OrderedDict()
+        self.merged = 0
+
+    def add(self, sender: str, body: str, on_flush: FlushCallback) -> bool:
+        """
+        Add a message to the sender's open batch, or open a new one.
+
+        Args:
+            sender (str): The sender's WhatsApp address.
+            body (str): The message content.
+            on_flush (FlushCallback): Called with (sender, merged text) when a new batch is flushed
+                                      (at once if the message is not part of a burst); ignored if
+                                      the message joins an open batch.
+
+        Returns:
+            bool: True if the message opened a new batch, False if it was merged into an open one.
+        """
+        batch = self._batches.get(sender)
+        if batch is not None:
+            batch.messages.append(body)
+            self.merged += 1
+            if len(batch.messages) >= self.max_messages:
+                self._flush(sender)
+            return False
+
+        loop = asyncio.get_running_loop()
+        bursting = self._seen_recently(sender, loop.time())
+        batch = _Batch(on_flush, [body])
+        self._batches[sender] = batch
+        if not bursting or self.window <= 0 or self.max_messages <= 1:
+            self._flush(sender)
+        else:
+            batch.timer = loop.call_later(self.window, self._flush, sender)
+        return True
+
+    async def submit(self, sender: str, body: str) -> Optional[str]:
+        """
+        Add a message and wait for its batch to close.
+
+        Args:
+            sender (str): The sender's WhatsApp address.
+            body (str): The message content.
+
+        Returns:
+            Optional[str]: The merged text if this message opened the batch, None if it was merged
+                           into a batch another request is waiting for.
+        """
+        merged = asyncio.get_running_loop().create_future()
+        if not self.add(sender, body, lambda _, text: merged.done() or merged.set_result(text)):
+            return None
+        return await merged
+
+    def _seen_recently(self, sender: str, now: float) -> bool:
+        """Record a message from the sender; True if their previous one came within the window."""
+        while self._last_seen and next(iter(self._last_seen.values())) < now - self.window:
+            self._last_seen.popitem(last=False)
+        recent = sender in self._last_seen
+        self._last_seen[sender] = now
+        self._last_seen.move_to_end(sender)
+        return recent
+
+    def _flush(self, sender: str) -> None:
+        """Close the sender's batch and hand the merged text to its callback."""
+        batch = self._batches.pop(sender, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        if len(batch.messages) > 1:
+            logger.info(f"Coalesced {len(batch.messages)} messages from {sender}")
+        try:
+            batch.on_flush(sender, "\n".join(batch.messages))
+        except Exception as e:
+            logger.error(f"Flushing coalesced messages from {sender} failed: {e}", exc_info=True)
+
+    def __len__(self) -> int:
+        return len(self._batches)
+
+
+# Global message coalescer instance
+message_coalescer = MessageCoalescer()
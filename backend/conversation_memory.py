@@ -0,0 +1,221 @@
+"""
+Conversation Memory Module.
+
+This module keeps a bounded, per-sender history of the WhatsApp conversation
+so follow-up messages can be answered in context. Each sender has a ring
+buffer of recent messages plus a running summary of older ones, idle senders
+are evicted in least-recently-used order, and the history sent to OpenAI is
+capped by a token budget, so prompt size does not grow with the conversation.
+
+Histories live in process memory by default. With MEMORY_BACKEND=sqlite they
+are kept in a SQLite file instead, so they survive restarts and can be shared
+by workers on the same host; the file must be on a persistent volume for that.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Configuration from environment variables
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "12"))
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "800"))
+MEMORY_MAX_CHATS = int(os.getenv("MEMORY_MAX_CHATS", "10000"))
+MEMORY_IDLE_TTL = int(os.getenv("MEMORY_IDLE_TTL", "86400"))
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "memory").lower()  # "memory" or "sqlite"
+MEMORY_SQLITE_PATH = os.getenv("MEMORY_SQLITE_PATH", "conversations.sqlite3")
+
+# Rough token estimate; good enough for budgeting without loading a tokenizer
+CHARS_PER_TOKEN = 4
+
+Message = Dict[str, str]  # OpenAI chat message: {"role": ..., "content": ...}
+Summarizer = Callable[[str, List[Message]], Awaitable[str]]
+Entry = Tuple[str, Deque[Message]]  # (summary, recent messages)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of tokens in a text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class InMemoryStore:
+    """Process-local LRU store of sender histories, bounded by sender count and idle time."""
+
+    def __init__(self, max_chats: int = MEMORY_MAX_CHATS, idle_ttl: float = MEMORY_IDLE_TTL):
+        self.max_chats = max_chats
+        self.idle_ttl = idle_ttl
+        # sender -> (last used, summary, recent messages), least recently used first
+        self._chats: "OrderedDict[str, Tuple[float, str, Deque[Message]]]" = OrderedDict()
+
+    def load(self, sender: str) -> Optional[Entry]:
+        """Get a sender's (summary, messages), or None if unknown or idle for too long."""
+        entry = self._chats.get(sender)
+        if entry is None or time.time() - entry[0] > self.idle_ttl:
+            return None
+        return entry[1], deque(entry[2])
+
+    def save(self, sender: str, summary: str, turns: Deque[Message]) -> None:
+        """Store a sender's history, mark it as recently used and evict idle and excess senders."""
+        now = time.time()
+        self._chats.pop(sender, None)
+        self._chats[sender] = (now, summary, deque(turns))
+        while self._chats:
+            oldest, (used_at, _, _) = next(iter(self._chats.items()))
+            if len(self._chats) <= self.max_chats and now - used_at <= self.idle_ttl:
+                break
+            del self._chats[oldest]
+
+    def __len__(self) -> int:
+        return len(self._chats)
+
+
+class SQLiteStore:
+    """
+    SQLite store of sender histories that survives restarts.
+
+    Rows are small and the file is local, so queries run on the event loop
+    like the in-process store instead of in a thread.
+    """
+
+    def __init__(self, path: str = MEMORY_SQLITE_PATH, max_chats: int = MEMORY_MAX_CHATS, idle_ttl: float = MEMORY_IDLE_TTL):
+        self.path = path
+        self.max_chats = max_chats
+        self.idle_ttl = idle_ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "sender TEXT PRIMARY KEY, summary TEXT NOT NULL, turns TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_last_used ON conversations(last_used)")
+        self._conn.commit()
+
+    def load(self, sender: str) -> Optional[Entry]:
+        """Get a sender's (summary, messages), or None if unknown or idle for too long."""
+        row = self._conn.execute(
+            "SELECT summary, turns, last_used FROM conversations WHERE sender = ?", (sender,)
+        ).fetchone()
+        if row is None or time.time() - row[2] > self.idle_ttl:
+            return None
+        return row[0], deque(json.loads(row[1]))
+
+    def save(self, sender: str, summary: str, turns: Deque[Message]) -> None:
+        """Store a sender's history, mark it as recently used and evict idle and excess senders."""
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO conversations (sender, summary, turns, last_used) VALUES (?, ?, ?, ?)",
+            (sender, summary, json.dumps(list(turns), ensure_ascii=False), now),
+        )
+        self._conn.execute("DELETE FROM conversations WHERE last_used < ?", (now - self.idle_ttl,))
+        overflow = len(self) - self.max_chats
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM conversations WHERE sender IN "
+                "(SELECT sender FROM conversations ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+
+class ConversationMemory:
+    """
+    Memory of recent messages per WhatsApp sender.
+
+    Bounded by MEMORY_MAX_CHATS senders, MEMORY_MAX_TURNS messages per sender
+    and MEMORY_TOKEN_BUDGET tokens of history per prompt. It is only used from
+    the event loop and never awaits between reading and writing a sender's
+    entry, so it needs no lock.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = MEMORY_MAX_TURNS,
+        token_budget: int = MEMORY_TOKEN_BUDGET,
+        max_chats: int = MEMORY_MAX_CHATS,
+        idle_ttl: float = MEMORY_IDLE_TTL,
+        summarizer: Optional[Summarizer] = None,
+        store: Optional[Union[InMemoryStore, SQLiteStore]] = None,
+    ):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        if store is None:
+            store = SQLiteStore(max_chats=max_chats, idle_ttl=idle_ttl) if MEMORY_BACKEND == "sqlite" \
+                else InMemoryStore(max_chats, idle_ttl)
+        self.store = store
+
+    def messages(self, sender: str) -> List[Message]:
+        """
+        Get the sender's history as OpenAI chat messages.
+
+        Args:
+            sender (str): The sender's WhatsApp address (the Twilio "From" field)
+
+        Returns:
+            List[Message]: Summary (as a system message) and recent messages, oldest first
+        """
+        entry = self.store.load(sender)
+        if entry is None:
+            return []
+        summary, turns = entry
+        history = [{"role": "system", "content": f"Summary of earlier conversation: {summary}"}] if summary else []
+        return history + list(turns)
+
+    async def append(self, sender: str, user_text: str, assistant_text: str) -> None:
+        """
+        Record one exchange, compacting the sender's history to the turn and token limits.
+
+        Args:
+            sender (str): The sender's WhatsApp address
+            user_text (str): The user's message
+            assistant_text (str): The reply that was sent
+        """
+        summary, turns = self.store.load(sender) or ("", deque())
+        # A single huge message must not blow the budget on its own
+        max_chars = self.token_budget // 4 * CHARS_PER_TOKEN
+        turns.append({"role": "user", "content": user_text[-max_chars:]})
+        turns.append({"role": "assistant", "content": assistant_text[-max_chars:]})
+
+        overflow: List[Message] = []
+        while len(turns) > self.max_turns or (
+            len(turns) > 2
+            and estimate_tokens(summary) + sum(estimate_tokens(m["content"]) for m in turns) > self.token_budget
+        ):
+            overflow.append(turns.popleft())
+
+        self.store.save(sender, summary, turns)
+
+        if not overflow or self.summarizer is None:
+            return
+        try:
+            new_summary = (await self.summarizer(summary, overflow)).strip()
+        except Exception as e:
+            logger.warning(f"Conversation summarization failed for {sender}: {e}")
+            return
+        # The sender may have been evicted (or written to) while the summary was generated
+        entry = self.store.load(sender)
+        if entry is not None:
+            self.store.save(sender, new_summary[-(self.token_budget // 2) * CHARS_PER_TOKEN:], entry[1])
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+
+# Global conversation memory instance
+conversation_memory = ConversationMemory()
@@ -0,0 +1,322 @@
+"""
+Delivery Queue Module.
+
+This module implements the asynchronous reply mode: the webhook only
+validates and enqueues incoming messages, while a pool of background workers
+generates each answer and delivers it through the Twilio Messages REST API.
+Messages from one sender are answered one at a time and in order. Failed
+generations and deliveries are retried with exponential backoff; messages that
+still cannot be answered are written to a dead-letter file for inspection.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field, asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Configuration from environment variables
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
+TWILIO_API_BASE = os.getenv("TWILIO_API_BASE", "https://api.twilio.com")
+TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER", "")  # e.g. whatsapp:+14155238886
+DELIVERY_WORKERS = int(os.getenv("DELIVERY_WORKERS", "8"))
+DELIVERY_QUEUE_SIZE = int(os.getenv("DELIVERY_QUEUE_SIZE", "1000"))
+DELIVERY_MAX_RETRIES = int(os.getenv("DELIVERY_MAX_RETRIES", "4"))
+DELIVERY_BACKOFF_BASE = float(os.getenv("DELIVERY_BACKOFF_BASE", "1.0"))  # seconds
+DEAD_LETTER_PATH = os.getenv("DEAD_LETTER_PATH", "dead_letters.jsonl")
+
+Generator = Callable[[str, str], Awaitable[str]]
+
+
+class GenerationError(Exception):
+    """Raised by a Generator when no reply could be generated; `retryable` tells whether trying again can help."""
+
+    def __init__(self, message: str, retryable: bool):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class DeliveryError(Exception):
+    """Raised when Twilio rejects a message; `retryable` tells whether trying again can help."""
+
+    def __init__(self, message: str, retryable: bool):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+@dataclass
+class DeliveryJob:
+    """
+    One incoming message waiting for its reply.
+
+    Attributes:
+        sender (str): The user's WhatsApp address (the Twilio "From" field).
+        recipient (str): Our WhatsApp address the user wrote to (the Twilio "To" field).
+        body (str): The user's message.
+        reply (Optional[str]): The generated answer, kept so retries only resend it.
+        attempts (int): Attempts made so far to generate and deliver the reply.
+        enqueued_at (float): Unix time the webhook accepted the message.
+    """
+    sender: str
+    recipient: str
+    body: str
+    reply: Optional[str] = None
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.time)
+
+
+class TwilioSender:
+    """Minimal async client for the Twilio Messages REST API."""
+
+    def __init__(
+        self,
+        account_sid: str = TWILIO_ACCOUNT_SID,
+        auth_token: str = TWILIO_AUTH_TOKEN,
+        base_url: str = TWILIO_API_BASE,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.account_sid = account_sid
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            auth=(account_sid, auth_token),
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            transport=transport,
+        )
+
+    async def send(self, from_: str, to: str, body: str) -> str:
+        """
+        Send a WhatsApp message.
+
+        Args:
+            from_ (str): Our WhatsApp address.
+            to (str): The recipient's WhatsApp address.
+            body (str): Message text.
+
+        Returns:
+            str: The Twilio message SID.
+
+        Raises:
+            DeliveryError: If the request fails; retryable for network errors, 429 and 5xx.
+        """
+        try:
+            response = await self._client.post(
+                f"/2010-04-01/Accounts/{self.account_sid}/Messages.json",
+                data={"From": from_, "To": to, "Body": body},
+            )
+        except httpx.HTTPError as e:
+            raise DeliveryError(f"Twilio request failed: {e}", retryable=True) from e
+
+        if response.status_code >= 400:
+            retryable = response.status_code == 429 or response.status_code >= 500
+            raise DeliveryError(f"Twilio returned {response.status_code}: {response.text[:200]}", retryable)
+        return response.json().get("sid", "")
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP client."""
+        await self._client.aclose()
+
+
+class DeadLetterStore:
+    """Append-only JSONL file of messages that could not be delivered."""
+
+    def __init__(self, path: str = DEAD_LETTER_PATH):
+        self.path = path
+        self.count = 0
+
+    def record(self, job: DeliveryJob, error: str) -> None:
+        """
+        Store a failed job.
+
+        Args:
+            job (DeliveryJob): The job that could not be delivered.
+            error (str): The last error.
+        """
+        entry = dict(asdict(job), error=error, failed_at=time.time())
+        with open(self.path, "a", encoding="utf-8") as dead_letters:
+            dead_letters.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.count += 1
+        logger.error(f"Dead-lettered reply to {job.sender} after {job.attempts} attempt(s): {error}")
+
+
+class DeliveryQueue:
+    """
+    Bounded queue of incoming messages drained by a pool of worker tasks.
+
+    Each worker generates the reply with `generate(sender, body)` and sends it
+    with the TwilioSender, so throughput is bounded by the number of workers
+    rather than by how many webhook requests are open. A job waits until the
+    previous job of the same sender has been delivered or dead-lettered, so
+    replies arrive in order and each one is generated with the earlier
+    exchanges already in the conversation history.
+    """
+
+    def __init__(
+        self,
+        generate: Generator,
+        sender: TwilioSender,
+        dead_letters: Optional[DeadLetterStore] = None,
+        workers: int = DELIVERY_WORKERS,
+        max_size: int = DELIVERY_QUEUE_SIZE,
+        max_retries: int = DELIVERY_MAX_RETRIES,
+        backoff_base: float = DELIVERY_BACKOFF_BASE,
+    ):
+        self.generate = generate
+        self.sender = sender
+        self.dead_letters = dead_letters or DeadLetterStore()
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._queue: "asyncio.Queue[DeliveryJob]" = asyncio.Queue(maxsize=max_size)
+        self._tasks: List[asyncio.Task] = []
+        self._direct: Set[asyncio.Task] = set()  # replies sent outside the queue
+        self._senders: Dict[str, asyncio.Lock] = {}  # per-sender locks of jobs being processed
+        self._pending: Dict[str, int] = {}  # jobs holding or waiting for each sender's lock
+        self._stats = {"enqueued": 0, "rejected": 0, "delivered": 0, "retries": 0, "dead_lettered": 0}
+        self._delivery_seconds = 0.0
+
+    def enqueue(self, job: DeliveryJob) -> bool:
+        """
+        Accept a message for asynchronous delivery without waiting.
+
+        Args:
+            job (DeliveryJob): The message to answer.
+
+        Returns:
+            bool: False if the queue is full and the message was not accepted.
+        """
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._stats["rejected"] += 1
+            return False
+        self._stats["enqueued"] += 1
+        return True
+
+    def reply_now(self, job: DeliveryJob, reply: str) -> None:
+        """
+        Send a fixed reply outside the queue, e.g. a "busy" notice for a rejected message.
+
+        Transient errors are retried and failed deliveries dead-lettered as for queued jobs.
+
+        Args:
+            job (DeliveryJob): The message being answered.
+            reply (str): The reply to send.
+        """
+        job.reply = reply
+        task = asyncio.create_task(self._process_direct(job))
+        self._direct.add(task)
+        task.add_done_callback(self._direct.discard)
+
+    def full(self) -> bool:
+        """Whether new messages would currently be rejected."""
+        return self._queue.full()
+
+    async def start(self) -> None:
+        """Start the worker tasks."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+            logger.info(f"Delivery queue started with {self.workers} workers")
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """
+        Let the workers finish queued messages for up to drain_timeout seconds, then stop them.
+
+        Args:
+            drain_timeout (float): Seconds to wait for the queue to drain.
+        """
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping delivery queue with {self._queue.qsize()} undelivered message(s)")
+        if self._direct:
+            await asyncio.wait(self._direct, timeout=drain_timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self) -> None:
+        """Wait until every queued message has been delivered or dead-lettered."""
+        await self._queue.join()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get delivery counters.
+
+        Returns:
+            Dict[str, Any]: Queue depth, worker count, counters and mean seconds from enqueue to delivery.
+        """
+        delivered = self._stats["delivered"]
+        return dict(
+            self._stats,
+            queue_depth=self._queue.qsize(),
+            workers=len(self._tasks),
+            mean_delivery_seconds=self._delivery_seconds / delivered if delivered else 0.0,
+        )
+
+    async def _worker(self, index: int) -> None:
+        """Worker loop: process jobs until cancelled."""
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process_in_order(job)
+            except Exception as e:
+                # Never let one bad message kill the worker
+                logger.error(f"Delivery worker {index} failed on a job from {job.sender}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _process_in_order(self, job: DeliveryJob) -> None:
+        """Process a job once the sender's earlier jobs are done."""
+        # No await between taking the job off the queue and queueing for the lock, so jobs keep their order
+        lock = self._senders.setdefault(job.sender, asyncio.Lock())
+        self._pending[job.sender] = self._pending.get(job.sender, 0) + 1
+        try:
+            async with lock:
+                await self._process(job)
+        finally:
+            self._pending[job.sender] -= 1
+            if not self._pending[job.sender]:
+                del self._pending[job.sender]
+                del self._senders[job.sender]
+
+    async def _process_direct(self, job: DeliveryJob) -> None:
+        """Deliver a reply_now() job, logging failures like a worker would."""
+        try:
+            await self._process(job)
+        except Exception as e:
+            logger.error(f"Direct reply to {job.sender} failed: {e}", exc_info=True)
+
+    async def _process(self, job: DeliveryJob) -> None:
+        """Generate (once) and deliver a reply, retrying transient failures."""
+        while True:
+            job.attempts += 1
+            try:
+                if job.reply is None:
+                    job.reply = await self.generate(job.sender, job.body)
+                await self.sender.send(job.recipient, job.sender, job.reply)
+            except (GenerationError, DeliveryError) as e:
+                if not e.retryable or job.attempts > self.max_retries:
+                    self._stats["dead_lettered"] += 1
+                    self.dead_letters.record(job, str(e))
+                    return
+                delay = self.backoff_base * 2 ** (job.attempts - 1) * random.uniform(0.5, 1.0)
+                stage = "Delivery to" if isinstance(e, DeliveryError) else "Generating the reply to"
+                logger.warning(f"{stage} {job.sender} failed ({e}); retry {job.attempts}/{self.max_retries} in {delay:.1f}s")
+                self._stats["retries"] += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self._stats["delivered"] += 1
+            self._delivery_seconds += time.time() - job.enqueued_at
+            logger.info(f"Delivered reply to {job.sender} (length: {len(job.reply)}, attempts: {job.attempts})")
+            return
@@ -2,11 +2,16 @@
 OpenAI Client Module.
 
 This module handles all communication with the OpenAI API for generating
-AI responses to user messages.
+AI responses to user messages. All calls share one pooled, keep-alive
+AsyncOpenAI client whose lifecycle is tied to the FastAPI app lifespan.
 """
 
 import os
 import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
 import openai
 from dotenv import load_dotenv
 
@@ -16,60 +21,263 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Connection pool configuration from environment variables
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "true").lower() == "true"
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+
+class OpenAIClientManager:
+    """
+    Owns the process-wide AsyncOpenAI client and its HTTP connection pool.
+    
+    start() and aclose() are called from the FastAPI lifespan; the client is
+    also created lazily on first use so the module keeps working outside the
+    app (e.g. in scripts). Every API call should run inside request() so the
+    pool utilization metrics stay accurate.
+    """
+    
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._client: Optional[openai.AsyncOpenAI] = None
+        self._http2 = False
+        self._in_flight = 0
+        self._stats = {"requests": 0, "errors": 0, "max_in_flight": 0, "clients_created": 0}
+    
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        """The shared AsyncOpenAI client, created on first access."""
+        if self._client is None:
+            self._create()
+        return self._client
+    
+    async def start(self) -> None:
+        """Create the client and its connection pool (called on app startup)."""
+        if self._client is None:
+            self._create()
+    
+    async def aclose(self) -> None:
+        """Close the client and all pooled connections (called on app shutdown)."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            logger.info("OpenAI HTTP connection pool closed")
+        self._http_client = None
+        self._client = None
+    
+    @asynccontextmanager
+    async def request(self) -> AsyncIterator[openai.AsyncOpenAI]:
+        """
+        Track one API call for the utilization metrics.
+        
+        Yields:
+            openai.AsyncOpenAI: The shared client
+        """
+        client = self.client
+        self._in_flight += 1
+        self._stats["requests"] += 1
+        self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._in_flight)
+        try:
+            yield client
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            self._in_flight -= 1
+    
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get connection pool utilization metrics.
+        
+        Returns:
+            Dict[str, Any]: Request counters, in-flight calls, pool limits and,
+            when the transport exposes them, open and idle connection counts
+        """
+        metrics: Dict[str, Any] = dict(
+            self._stats,
+            started=self._client is not None,
+            http2=self._http2,
+            in_flight=self._in_flight,
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            utilization=self._in_flight / OPENAI_MAX_CONNECTIONS if OPENAI_MAX_CONNECTIONS else 0.0,
+        )
+        # httpx does not expose pool state publicly; read it from httpcore when available
+        pool = getattr(getattr(self._http_client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            metrics["pool_connections"] = len(connections)
+            metrics["pool_idle_connections"] = sum(1 for connection in connections if connection.is_idle())
+        return metrics
+    
+    def _create(self) -> None:
+        """Build the pooled HTTP client and the AsyncOpenAI client on top of it."""
+        http2 = OPENAI_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401  (httpx needs it for HTTP/2)
+            except ImportError:
+                logger.warning("OPENAI_HTTP2 is enabled but the 'h2' package is missing; using HTTP/1.1")
+                http2 = False
+        
+        self._http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+            transport=self._transport,
+        )
+        self._client = openai.AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=self._http_client,
+            max_retries=OPENAI_MAX_RETRIES,
+        )
+        self._http2 = http2
+        self._stats["clients_created"] += 1
+        logger.info(
+            f"OpenAI client ready (http2={http2}, max_connections={OPENAI_MAX_CONNECTIONS}, "
+            f"keepalive={OPENAI_MAX_KEEPALIVE_CONNECTIONS})"
+        )
+
+
+# Global OpenAI client manager instance
+openai_manager = OpenAIClientManager()
+
 
-async def get_ai_response(user_prompt: str, max_tokens: int = 150) -> str:
+async def generate_ai_response(
+    user_prompt: str, max_tokens: int = 150, history: Optional[List[Dict[str, str]]] = None
+) -> str:
     """
     Generate an AI response using OpenAI's GPT-4o-mini model.
     
     This function takes a user prompt and generates a response using OpenAI's
-    chat completions API with the gpt-4o-mini model.
+    chat completions API with the gpt-4o-mini model. Errors propagate so callers
+    can retry; get_ai_response() turns them into an apology instead.
     
     Args:
         user_prompt (str): The user's message to generate a response for.
         max_tokens (int): Maximum number of tokens in the response.
+        history (Optional[List[Dict[str, str]]]): Earlier messages of the conversation,
+            oldest first, as returned by ConversationMemory.messages().
         
     Returns:
         str: The AI-generated response content.
         
     Raises:
-        Exception: If there's an error communicating with the OpenAI API.
+        openai.OpenAIError: If there's an error communicating with the OpenAI API.
     """
-    try:
-        # Initialize OpenAI client with API key from environment
-        client = openai.AsyncOpenAI(
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
-        
-        # Define system prompt
-        system_prompt = "You are a helpful assistant."
-        
-        # Call OpenAI chat completions API
+    # Define system prompt
+    system_prompt = "You are a helpful assistant."
+    
+    # Call OpenAI chat completions API over the shared, pooled client
+    async with openai_manager.request() as client:
         response = await client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
+                *(history or []),
                 {"role": "user", "content": user_prompt}
             ],
             max_tokens=max_tokens,
             temperature=0.7
         )
+    
+    # Extract and return the AI response content
+    ai_response = response.choices[0].message.content
+    return ai_response if ai_response else "I'm sorry, I couldn't generate a response."
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether a failed OpenAI call may succeed when tried again later.
+    
+    Args:
+        error (Exception): The error raised by generate_ai_response().
         
-        # Extract and return the AI response content
-        ai_response = response.choices[0].message.content
-        return ai_response if ai_response else "I'm sorry, I couldn't generate a response."
-        
-    except openai.APIError as e:
-        logger.error(f"OpenAI API error: {str(e)}")
-        return "I'm experiencing technical difficulties. Please try again later."
+    Returns:
+        bool: True for rate limits, timeouts, connection errors and server errors.
+    """
+    return isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError))
+
+
+def fallback_reply(error: Exception) -> str:
+    """
+    Get the apology sent to the user when no AI response could be generated.
+    
+    Args:
+        error (Exception): The error raised by generate_ai_response().
         
-    except openai.RateLimitError as e:
-        logger.warning(f"OpenAI rate limit exceeded: {str(e)}")
+    Returns:
+        str: A short message telling the user what went wrong.
+    """
+    if isinstance(error, openai.RateLimitError):
+        logger.warning(f"OpenAI rate limit exceeded: {str(error)}")
         return "I'm currently busy. Please try again in a moment."
-        
-    except openai.AuthenticationError as e:
-        logger.error(f"OpenAI authentication error: {str(e)}")
+    if isinstance(error, openai.AuthenticationError):
+        logger.error(f"OpenAI authentication error: {str(error)}")
         return "There's a configuration issue. Please contact support."
+    if isinstance(error, openai.APIError):
+        logger.error(f"OpenAI API error: {str(error)}")
+        return "I'm experiencing technical difficulties. Please try again later."
+    logger.error(f"Unexpected error while getting AI response: {str(error)}", exc_info=error)
+    return "I encountered an unexpected error. Please try again."
+
+
+async def get_ai_response(
+    user_prompt: str, max_tokens: int = 150, history: Optional[List[Dict[str, str]]] = None
+) -> str:
+    """
+    Generate an AI response, answering with an apology if the OpenAI call fails.
+    
+    Args:
+        user_prompt (str): The user's message to generate a response for.
+        max_tokens (int): Maximum number of tokens in the response.
+        history (Optional[List[Dict[str, str]]]): Earlier messages of the conversation,
+            oldest first, as returned by ConversationMemory.messages().
         
+    Returns:
+        str: The AI-generated response content, or fallback_reply() on errors.
+    """
+    try:
+        return await generate_ai_response(user_prompt, max_tokens=max_tokens, history=history)
     except Exception as e:
-        logger.error(f"Unexpected error while getting AI response: {str(e)}", exc_info=True)
-        return "I encountered an unexpected error. Please try again." 
\ No newline at end of file
+        return fallback_reply(e)
+
+
+async def summarize_history(summary: str, messages: List[Dict[str, str]]) -> str:
+    """
+    Fold older conversation messages into a running summary.
+    
+    Used by ConversationMemory once a sender's history exceeds its token budget.
+    Errors propagate so the memory keeps its previous summary.
+    
+    Args:
+        summary (str): The current summary (may be empty).
+        messages (List[Dict[str, str]]): Messages that no longer fit the history.
+        
+    Returns:
+        str: The updated summary.
+    """
+    transcript = "\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in messages)
+    async with openai_manager.request() as client:
+        response = await client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Maintain a short running summary of a chat. Keep names, facts, numbers and open "
+                               "questions the user may refer back to. Respond with the summary only, at most 120 words."
+                },
+                {"role": "user", "content": f"Current summary:\n{summary or '(empty)'}\n\nNew messages:\n{transcript}"}
+            ],
+            max_tokens=200,
+            temperature=0
+        )
+    return response.choices[0].message.content or summary
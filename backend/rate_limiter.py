@@ -0,0 +1,108 @@
+"""
+Rate Limiter Module.
+
+This module implements per-sender rate limiting for the WhatsApp webhook.
+Requests arrive from Twilio's IP addresses, so limits are keyed on the
+sender's phone number (the Twilio "From" field) instead of the remote
+address. Each sender gets a token bucket: a steady refill rate plus a burst
+allowance. Senders whose bucket has refilled completely carry no state worth
+keeping, so they are evicted, and the store never holds more than
+RATE_LIMIT_MAX_SENDERS entries.
+"""
+
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Configuration from environment variables
+RATE_LIMIT = os.getenv("RATE_LIMIT_PER_MINUTE", "10/minute")  # "10" or "10/minute"
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_MAX_SENDERS = int(os.getenv("RATE_LIMIT_MAX_SENDERS", "100000"))
+
+
+def parse_rate(rate: str) -> float:
+    """
+    Parse a per-minute rate such as "10" or "10/minute".
+
+    Args:
+        rate (str): The configured rate.
+
+    Returns:
+        float: Allowed requests per second.
+    """
+    return float(rate.split("/", 1)[0]) / 60.0
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket per key, in a bounded LRU store.
+
+    Only used from the event loop and never awaits, so it needs no lock.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = parse_rate(RATE_LIMIT),
+        burst: int = RATE_LIMIT_BURST,
+        max_keys: int = RATE_LIMIT_MAX_SENDERS,
+    ):
+        self.rate = rate_per_second
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        # Seconds after which an unused bucket is full again, i.e. indistinguishable from a new one
+        self.idle_after = self.burst / self.rate
+        # key -> (tokens, last update), least recently used first
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.rejected = 0
+
+    def acquire(self, key: str) -> Tuple[bool, float]:
+        """
+        Take one token from the key's bucket.
+
+        Args:
+            key (str): The sender's WhatsApp address.
+
+        Returns:
+            Tuple[bool, float]: Whether the request is allowed and, if not, seconds until it would be.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        allowed = tokens >= 1.0
+        if allowed:
+            tokens -= 1.0
+        else:
+            self.rejected += 1
+        self._buckets[key] = (tokens, now)
+        self._evict(now)
+        return allowed, 0.0 if allowed else (1.0 - tokens) / self.rate
+
+    def _evict(self, now: float) -> None:
+        """Drop buckets that have refilled completely and the least recently used ones beyond max_keys."""
+        while self._buckets:
+            key, (_, updated) = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_keys and now - updated < self.idle_after:
+                break
+            del self._buckets[key]
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Get limiter counters.
+
+        Returns:
+            Dict[str, float]: Tracked senders and rejected requests.
+        """
+        return {"senders": len(self._buckets), "rejected": self.rejected}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# Global per-sender rate limiter instance
+sender_limiter = TokenBucketLimiter()
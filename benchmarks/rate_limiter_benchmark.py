@@ -0,0 +1,96 @@
+"""
+Micro-benchmark for the Telegram bot's rate limiter.
+
+Measures checks per second (single- and multi-threaded) and the memory held
+per 100k users for the GCRA limiter, next to the timestamp-deque design it
+replaced. Run from the repository root:
+
+    python benchmarks/rate_limiter_benchmark.py [--users 100000] [--threads 8]
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+import tracemalloc
+from collections import defaultdict, deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.rate_limiter import RateLimiter, ShardedMemoryBackend  # noqa: E402
+
+
+class DequeRateLimiter:
+    """The previous design: one global lock and a deque of timestamps per user, kept forever."""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._user_requests = defaultdict(deque)
+
+    def is_allowed(self, user_id: int) -> bool:
+        with self._lock:
+            now = time.time()
+            user_queue = self._user_requests[user_id]
+            while user_queue and user_queue[0] < now - self.window:
+                user_queue.popleft()
+            if len(user_queue) < self.limit:
+                user_queue.append(now)
+                return True
+            return False
+
+
+def ops_per_second(limiter, users: int, threads: int, checks: int) -> float:
+    """Run `checks` checks spread over `threads` threads and `users` user IDs."""
+    per_thread = checks // threads
+
+    def worker(offset: int):
+        for i in range(per_thread):
+            limiter.is_allowed((offset + i * 7919) % users)
+
+    pool = [threading.Thread(target=worker, args=(t * per_thread,)) for t in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def memory_per_100k(factory, users: int) -> float:
+    """Bytes held after each of `users` users made one request, scaled to 100k users."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    limiter = factory()
+    for user_id in range(users):
+        limiter.is_allowed(user_id)
+    used = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    tracemalloc.stop()
+    del limiter
+    return used * 100_000 / users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--checks", type=int, default=400_000)
+    args = parser.parse_args()
+
+    candidates = {
+        "gcra (sharded)": lambda: RateLimiter(limit=10, window=60, backend=ShardedMemoryBackend(shards=16)),
+        "deque (global lock)": lambda: DequeRateLimiter(limit=10, window=60),
+    }
+
+    print(f"{'limiter':<22}{'1 thread ops/s':>16}{f'{args.threads} threads ops/s':>20}{'MB per 100k users':>20}")
+    for name, factory in candidates.items():
+        single = ops_per_second(factory(), args.users, 1, args.checks)
+        multi = ops_per_second(factory(), args.users, args.threads, args.checks)
+        memory = memory_per_100k(factory, args.users) / 1024 ** 2
+        print(f"{name:<22}{single:>16,.0f}{multi:>20,.0f}{memory:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark of the retrieval backends: Chroma against the NumPy indexes.
+
+Builds a synthetic, clustered corpus once as a Chroma store and as a vector
+snapshot, then loads each backend in a fresh process and reports load time,
+resident memory added by loading, single-query latency, batched throughput
+and recall@k against an exact float32 search. Run from the repository root:
+
+    python benchmarks/vector_index_benchmark.py [--rows 5000] [--dim 768] [--queries 200]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+from src.core.vector_index import normalize_rows  # noqa: E402
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """Returns stored vectors for the benchmark's chunk texts ("chunk <row>")."""
+
+    def __init__(self, matrix: np.ndarray):
+        self.matrix = matrix
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.matrix[int(text.split()[1])].tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status", "r") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def corpus(rows: int, dim: int, queries: int, seed: int = 0):
+    """Clustered unit vectors, like embeddings of a knowledge base with a few dozen topics."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(rows // 100, 8), dim))
+    matrix = centers[rng.integers(len(centers), size=rows)] + 0.5 * rng.normal(size=(rows, dim))
+    query_matrix = centers[rng.integers(len(centers), size=queries)] + 0.5 * rng.normal(size=(queries, dim))
+    return normalize_rows(matrix), normalize_rows(query_matrix)
+
+
+def build(directory: str, matrix: np.ndarray) -> str:
+    """Write the corpus as a Chroma store and as a float16 snapshot; returns the snapshot path."""
+    from langchain_community.vectorstores import Chroma
+    from src.core.vector_snapshot import write_snapshot
+
+    texts = [f"chunk {row}" for row in range(len(matrix))]
+    metadatas = [{"row": row} for row in range(len(matrix))]
+    db = Chroma(persist_directory=os.path.join(directory, "chroma"), embedding_function=PrecomputedEmbeddings(matrix))
+    for start in range(0, len(texts), 1000):
+        db.add_texts(texts[start:start + 1000], metadatas[start:start + 1000], ids=texts[start:start + 1000])
+    return write_snapshot(os.path.join(directory, "snapshot"), texts, texts, metadatas, matrix)
+
+
+def measure(backend: str, directory: str, snapshot_path: str, queries: np.ndarray, k: int, batch: int) -> Dict[str, float]:
+    """Load one backend in this (fresh) process and time it."""
+    baseline = rss_mb()
+    started = time.perf_counter()
+    if backend == "chroma":
+        from langchain_community.vectorstores import Chroma
+        db = Chroma(persist_directory=os.path.join(directory, "chroma"), embedding_function=PrecomputedEmbeddings(queries))
+        db.similarity_search_by_vector(queries[0].tolist(), k=k)  # the client loads the HNSW index lazily
+    else:
+        from src.core.vector_snapshot import SnapshotVectorStore
+        db = SnapshotVectorStore.load(snapshot_path, PrecomputedEmbeddings(queries), index=backend.split(":")[1])
+        db.similarity_search_by_vector(queries[0].tolist(), k=k)
+    load_seconds = time.perf_counter() - started
+    loaded_rss = rss_mb() - baseline
+
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        documents = db.similarity_search_by_vector(query.tolist(), k=k)
+        latencies.append(time.perf_counter() - started)
+        results.append([document.metadata["row"] for document in documents])
+
+    # Chroma's LangChain store has no batch search; it answers the queries one by one
+    started = time.perf_counter()
+    for start in range(0, len(queries), batch):
+        chunk = queries[start:start + batch]
+        if backend == "chroma":
+            for query in chunk:
+                db.similarity_search_by_vector(query.tolist(), k=k)
+        else:
+            db.similarity_search_batch_by_vector_with_score(chunk, k=k)
+    batch_qps = len(queries) / (time.perf_counter() - started)
+
+    latencies.sort()
+    return {
+        "load_s": load_seconds,
+        "rss_mb": loaded_rss,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "batch_qps": batch_qps,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args()
+
+    matrix, queries = corpus(args.rows, args.dim, args.queries)
+    truth = [set(np.argsort(-row)[:args.k]) for row in queries @ matrix.T]
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Building a {args.rows} x {args.dim} corpus...")
+        snapshot_path = build(directory, matrix)
+
+        print(f"{'backend':<14}{'load s':>9}{'RSS MB':>9}{'p50 ms':>9}{'p95 ms':>9}{'batch q/s':>11}{'recall':>8}")
+        context = multiprocessing.get_context("spawn")
+        for backend in ("chroma", "numpy:mmap", "numpy:exact", "numpy:ivf"):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(measure, backend, directory, snapshot_path, queries, args.k, args.batch).result()
+            recall = np.mean([len(set(rows) & expected) / args.k for rows, expected in zip(result["results"], truth)])
+            print(f"{backend:<14}{result['load_s']:>9.2f}{result['rss_mb']:>9.1f}{result['p50_ms']:>9.2f}"
+                  f"{result['p95_ms']:>9.2f}{result['batch_qps']:>11,.0f}{recall:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 # ingest.py
 import os
+import sys
 import shutil
 import logging
 from dotenv import load_dotenv
 from google.cloud import storage
 from google.api_core import exceptions
 from src.core.vector_store import create_vector_store, VECTOR_STORE_DIR
+from src.core.vector_snapshot import resolve_snapshot_path, POINTER_FILE, SNAPSHOT_SUFFIX
+from src.core.gcs_sync import StoreSync, GCSBucket
 
 load_dotenv()
 
@@ -19,9 +22,10 @@ if not PROJECT_ID:
     raise ValueError("Google Cloud project ID is not set. Please set the GCP_PROJECT_ID or GOOGLE_CLOUD_PROJECT environment variable.")
 
 BUCKET_NAME = f"{PROJECT_ID}-knowledge-base"
+SNAPSHOT_PREFIX = "kb_snapshot"  # startup.sh downloads the snapshot named by the pointer object under this prefix
 
-def upload_directory_to_gcs(source_directory: str, bucket_name: str):
-    """Uploads the contents of a directory to a GCS bucket."""
+def get_or_create_bucket(bucket_name: str) -> storage.Bucket:
+    """Returns the GCS bucket, creating it if it does not exist."""
     storage_client = storage.Client()
     
     try:
@@ -31,34 +35,55 @@ def upload_directory_to_gcs(source_directory: str, bucket_name: str):
         logging.info(f"Bucket '{bucket_name}' not found. Creating a new one.")
         bucket = storage_client.create_bucket(bucket_name, location="europe-west1") # Specify location
         logging.info(f"Bucket '{bucket_name}' created successfully.")
+    return bucket
+
 
-    # Clear existing vector_store objects in the bucket before uploading new ones
-    blobs_to_delete = list(bucket.list_blobs(prefix=f"{VECTOR_STORE_DIR}/"))
-    if blobs_to_delete:
-        logging.info(f"Deleting {len(blobs_to_delete)} old objects from gs://{bucket_name}/{VECTOR_STORE_DIR}/")
-        bucket.delete_blobs(blobs_to_delete)
+def upload_directory_to_gcs(source_directory: str, bucket_name: str):
+    """
+    Publishes the contents of a directory to a GCS bucket as a new store version.
+    
+    Only files whose checksum is not in the bucket yet are uploaded (concurrently),
+    and containers switch to the new version only once it is complete; see src.core.gcs_sync.
+    """
+    bucket = get_or_create_bucket(bucket_name)
+    sync = StoreSync(GCSBucket(bucket), VECTOR_STORE_DIR)
+    # Snapshots are uploaded on their own by upload_snapshot_to_gcs
+    result = sync.upload(source_directory, exclude=(f"*{SNAPSHOT_SUFFIX}", POINTER_FILE))
+    logging.info(f"Directory '{source_directory}' published to gs://{bucket_name}/{VECTOR_STORE_DIR}/ "
+                 f"as version '{result['version']}'.")
 
-    for root, _, files in os.walk(source_directory):
-        for file in files:
-            local_path = os.path.join(root, file)
-            gcs_path = os.path.join(VECTOR_STORE_DIR, os.path.relpath(local_path, source_directory)).replace("\\", "/")
-            
-            blob = bucket.blob(gcs_path)
-            logging.info(f"Uploading '{local_path}' to 'gs://{bucket_name}/{gcs_path}'")
-            blob.upload_from_filename(local_path)
-            
-    logging.info(f"Directory '{source_directory}' uploaded successfully.")
+
+def upload_snapshot_to_gcs(snapshot_path: str, bucket_name: str):
+    """
+    Uploads the vector snapshot and then points the pointer object at it.
+    
+    Snapshot files are named by their content hash, so an unchanged snapshot is
+    not uploaded again, and containers only see the new name once the upload is complete.
+    """
+    bucket = get_or_create_bucket(bucket_name)
+    name = os.path.basename(snapshot_path)
+    blob = bucket.blob(f"{SNAPSHOT_PREFIX}/{name}")
+    if blob.exists():
+        logging.info(f"Snapshot '{name}' is already in gs://{bucket_name}/{SNAPSHOT_PREFIX}/")
+    else:
+        logging.info(f"Uploading '{snapshot_path}' to 'gs://{bucket_name}/{SNAPSHOT_PREFIX}/{name}'")
+        blob.upload_from_filename(snapshot_path)
+    bucket.blob(f"{SNAPSHOT_PREFIX}/{POINTER_FILE}").upload_from_string(name, content_type="text/plain")
+    logging.info(f"Current snapshot set to '{name}'.")
 
 
 if __name__ == "__main__":
     logging.info("--- Starting Knowledge Base Ingestion Process ---")
     
-    # Step 1: Create the vector store locally
-    create_vector_store()
+    # Step 1: Create or incrementally update the vector store locally
+    create_vector_store(full_rebuild="--full-rebuild" in sys.argv)
 
     # Step 2: Upload the created vector store to GCS
     if os.path.exists(VECTOR_STORE_DIR):
         upload_directory_to_gcs(VECTOR_STORE_DIR, BUCKET_NAME)
+        snapshot_path = resolve_snapshot_path(VECTOR_STORE_DIR)
+        if snapshot_path:
+            upload_snapshot_to_gcs(snapshot_path, BUCKET_NAME)
     else:
         logging.error(f"Vector store directory '{VECTOR_STORE_DIR}' not found after creation process. Aborting upload.")
         # Exit with a non-zero code to fail the CI/CD step
@@ -2,12 +2,15 @@
 """
 Main entry point for the Telegram RAG Multi-Agent Bot.
 
-This module is responsible for starting the Telegram bot and configuring
-the logging for the application. It also runs an HTTP server for Cloud Run health checks.
+This module is responsible for starting the Telegram bot with long polling and
+configuring the logging for the application. It also runs an HTTP server for
+health checks. Intended for local development; the Cloud Run deployment serves
+the bot in webhook mode from src.api.webhook_handler (see startup.sh).
 """
 
 import os
 import sys
+import json
 import logging
 import threading
 from http.server import HTTPServer, BaseHTTPRequestHandler
@@ -16,6 +19,8 @@ from http.server import HTTPServer, BaseHTTPRequestHandler
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
 from src.bots import telegram_bot
+from src.agents.main_agent import agent_initializer
+from src.core.config import config
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -58,7 +63,13 @@ def validate_environment():
 
 
 class HealthCheckHandler(BaseHTTPRequestHandler):
-    """Simple HTTP handler for Cloud Run health checks."""
+    """
+    HTTP handler for Cloud Run health checks.
+    
+    /health is the liveness probe and answers as soon as the process is up.
+    /ready is the readiness/startup probe and answers 200 only once the AI
+    components are initialized, with the initialization status as JSON.
+    """
     
     def do_GET(self):
         if self.path == '/health':
@@ -66,6 +77,12 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
             self.send_header('Content-type', 'text/plain')
             self.end_headers()
             self.wfile.write(b'OK')
+        elif self.path == '/ready':
+            status = agent_initializer.status()
+            self.send_response(200 if status["ready"] else 503)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(status).encode("utf-8"))
         else:
             self.send_response(404)
             self.end_headers()
@@ -102,6 +119,10 @@ if __name__ == "__main__":
         health_thread = threading.Thread(target=run_health_server, daemon=True)
         health_thread.start()
         
+        # Warm the AI components while the bot connects, so the first user does not pay for it
+        if config.WARMUP_ON_START:
+            agent_initializer.start_background()
+        
         # Start the Telegram bot (main thread)
         telegram_bot.run()
         
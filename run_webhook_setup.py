@@ -40,8 +40,21 @@ async def setup_webhook():
         print("💡 Upewnij się, że ustawiłeś zmienną TELEGRAM_BOT_TOKEN przed uruchomieniem skryptu.")
         return False
     
-    # Stały URL webhooka
-    webhook_url = "https://chatbot-service-157843431191.europe-west1.run.app"
+    # Telegram dołącza ten sekret jako nagłówek X-Telegram-Bot-Api-Secret-Token do każdego żądania;
+    # serwer webhooka odrzuca wszystkie aktualizacje bez niego
+    secret_token = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+    
+    if not secret_token:
+        logger.error("❌ TELEGRAM_WEBHOOK_SECRET nie jest ustawiony w zmiennych środowiskowych!")
+        print("❌ BŁĄD: Nie znaleziono TELEGRAM_WEBHOOK_SECRET w zmiennych środowiskowych.")
+        print("💡 Ustaw ten sam sekret co w usłudze Cloud Run (np. wynik: openssl rand -hex 32).")
+        return False
+    
+    # Adres usługi Cloud Run; serwer webhooka (src/api/webhook_handler.py) przyjmuje aktualizacje pod
+    # TELEGRAM_WEBHOOK_PATH, więc token bota nie trafia do URL-a ani do logów dostępu
+    service_url = os.getenv("WEBHOOK_URL", "https://chatbot-service-157843431191.europe-west1.run.app")
+    webhook_path = os.getenv("TELEGRAM_WEBHOOK_PATH", "/telegram")
+    webhook_url = f"{service_url.rstrip('/')}/{webhook_path.lstrip('/')}"
     
     try:
         # Inicjalizuj bota
@@ -54,17 +67,14 @@ async def setup_webhook():
         current_webhook = await bot.get_webhook_info()
         logger.info(f"Aktualny webhook: {current_webhook.url}")
         
-        if current_webhook.url == webhook_url:
-            print(f"✅ Webhook jest już ustawiony na: {webhook_url}")
-            print("ℹ️  Nie ma potrzeby zmiany konfiguracji.")
-            return True
-        
+        # Sekretu nie da się odczytać z get_webhook_info, więc webhook jest zawsze odnawiany
         # Ustaw nowy webhook
         print(f"🔄 Ustawianie webhooka na: {webhook_url}")
         success = await bot.set_webhook(
             url=webhook_url,
             drop_pending_updates=True,  # Usuń pending wiadomości z polling
             max_connections=40,  # Optymalizacja dla Cloud Run
+            secret_token=secret_token,
             allowed_updates=["message", "callback_query"]  # Tylko potrzebne typy aktualizacji
         )
         
@@ -0,0 +1,124 @@
+"""
+Single-flight initialization of the agent's AI components.
+
+The components are expensive to build (LLM clients, embeddings, Chroma, the
+BM25 index), so they are created once per process. ComponentInitializer makes
+sure only one thread runs the initialization while concurrent callers wait
+for it, can start it in the background at boot, and reports liveness and
+readiness state together with per-component timings for health checks.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from src.core.metrics import StageTimer
+
+logger = logging.getLogger(__name__)
+
+# Initialization states
+IDLE = "idle"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+class ComponentInitializer:
+    """
+    Thread-safe, single-flight wrapper around an initialization function.
+
+    The function receives a StageTimer and should time each component it
+    builds with timer.stage(name). A failed initialization is retried by the
+    next caller of ensure_ready().
+    """
+
+    def __init__(self, initialize: Callable[[StageTimer], None], name: str = "AI components"):
+        self._initialize = initialize
+        self.name = name
+        self._lock = threading.Lock()
+        self._state = IDLE
+        self._error: Optional[str] = None
+        self._attempts = 0
+        self._seconds = 0.0
+        self._components: Dict[str, float] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether initialization has completed successfully."""
+        return self._state == READY
+
+    def ensure_ready(self) -> None:
+        """
+        Initialize the components unless that has already happened.
+
+        Callers arriving while another thread initializes block until it
+        finishes instead of initializing again.
+
+        Raises:
+            Exception: Whatever the initialization function raised
+        """
+        if self._state == READY:
+            return
+        with self._lock:
+            if self._state == READY:
+                return
+            self._run()
+
+    async def aensure_ready(self) -> None:
+        """Async version of ensure_ready; the blocking initialization runs off the event loop."""
+        if self._state != READY:
+            await asyncio.to_thread(self.ensure_ready)
+
+    def start_background(self) -> None:
+        """Start warming the components in a daemon thread; returns immediately."""
+        if self._state == READY or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._warm_up, name="agent-warmup", daemon=True)
+        self._thread.start()
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the initialization state for health checks.
+
+        Returns:
+            Dict[str, Any]: State, readiness flag, attempt count, last error,
+            total seconds and seconds per component of the last attempt
+        """
+        return {
+            "state": self._state,
+            "ready": self.ready,
+            "attempts": self._attempts,
+            "error": self._error,
+            "seconds": round(self._seconds, 3),
+            "components": {name: round(seconds, 3) for name, seconds in self._components.items()},
+        }
+
+    def _run(self) -> None:
+        """Run one initialization attempt; must be called with the lock held."""
+        self._state = WARMING
+        self._attempts += 1
+        timer = StageTimer()
+        logger.info(f"Initializing {self.name} (attempt {self._attempts})...")
+        try:
+            self._initialize(timer)
+        except Exception as e:
+            self._state = FAILED
+            self._error = str(e)
+            raise
+        finally:
+            self._seconds = timer.total()
+            self._components = dict(timer.stages)
+        self._state = READY
+        self._error = None
+        logger.info(f"{self.name} ready in {self._seconds:.2f}s: {timer.summary()}")
+
+    def _warm_up(self) -> None:
+        """Background thread target; failures are logged and retried on the first request."""
+        start = time.perf_counter()
+        try:
+            self.ensure_ready()
+        except Exception as e:
+            logger.error(f"Background warm-up of {self.name} failed after {time.perf_counter() - start:.2f}s: {e}", exc_info=True)
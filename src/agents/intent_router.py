@@ -0,0 +1,254 @@
+"""
+Local fast-path intent routing for the agent pipeline.
+
+This module resolves obvious user requests into structured commands without
+calling the parser LLM. A router runs a list of pluggable classifiers (regex
+and keyword rules, optionally a lightweight local model) and only returns a
+command when the best match reaches the confidence threshold. Anything below
+the threshold falls back to the LLM parser in main_agent.
+"""
+
+import re
+import pickle
+import logging
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import pytz
+from pydantic import BaseModel
+
+from src.core.config import config
+from src.core.models import SearchKnowledgeBase, GetCurrentTime, TIMEZONE_ALIASES
+
+logger = logging.getLogger(__name__)
+
+# City names derived from the tz database, e.g. "tokyo" -> "Asia/Tokyo".
+# The explicit alias table wins over these on conflicts.
+_CITY_TIMEZONES: Dict[str, str] = {
+    tz.split("/")[-1].replace("_", " ").lower(): tz for tz in pytz.common_timezones
+}
+_CITY_TIMEZONES.update(TIMEZONE_ALIASES)
+
+# Vocabulary that signals the request may be about time rather than the knowledge base
+_TIME_VOCABULARY = re.compile(
+    r"\b(time|clock|timezone|hour|hours|o'clock|godzin\w*|czas\w*|zegar\w*|stref\w*)\b",
+    re.IGNORECASE,
+)
+
+# Explicit "what time is it" style requests in English and Polish. The English
+# patterns require the request to end (or continue with "is it" / "now" / "in")
+# right after "time", so questions like "what is the time complexity" don't match.
+_TIME_SUFFIX = r"(?=\s*(?:is\s+it\b|now\b|right\s+now\b|in\b|please\b|[?.!]|$))"
+_TIME_QUESTION_PATTERNS = [
+    re.compile(r"\bwhat(?:'s| is)?\s+(?:the\s+)?(?:current\s+|local\s+)?time" + _TIME_SUFFIX, re.IGNORECASE),
+    re.compile(r"\b(?:current|local)\s+time" + _TIME_SUFFIX, re.IGNORECASE),
+    re.compile(r"\bkt[óo]ra\s+(?:jest\s+)?(?:teraz\s+)?godzina\b", re.IGNORECASE),
+    re.compile(r"\b(?:aktualn\w*|obecn\w*)\s+(?:czas|godzin\w*)\b", re.IGNORECASE),
+]
+
+# Location following "in" / "w" at the end of the request, e.g. "... in New York?"
+_LOCATION_PATTERN = re.compile(r"\b(?:in|w)\s+([^\W\d][\w/ \-]*?)\s*[?.!]*\s*$", re.IGNORECASE)
+
+
+def resolve_timezone(location: str) -> Optional[str]:
+    """
+    Resolve a city, country alias or tz database name to a pytz timezone.
+
+    Args:
+        location (str): Free-form location text extracted from the request
+
+    Returns:
+        Optional[str]: A valid timezone name, or None if it cannot be resolved locally
+    """
+    candidate = location.strip()
+    if not candidate:
+        return None
+    if candidate in pytz.all_timezones_set:
+        return candidate
+    return _CITY_TIMEZONES.get(candidate.lower())
+
+
+@dataclass
+class IntentMatch:
+    """A command proposed by a classifier together with its confidence."""
+
+    command: BaseModel
+    confidence: float
+    source: str
+
+
+class IntentClassifier(ABC):
+    """Base class for pluggable local intent classifiers."""
+
+    name: str = "classifier"
+
+    @abstractmethod
+    def classify(self, user_input: str) -> Optional[IntentMatch]:
+        """
+        Propose a command for the user input.
+
+        Args:
+            user_input (str): The user's natural language query
+
+        Returns:
+            Optional[IntentMatch]: A proposed command, or None if the classifier has no opinion
+        """
+
+
+class TimeQueryRule(IntentClassifier):
+    """Regex rule for explicit current-time requests, e.g. "what time is it in Warsaw"."""
+
+    name = "time_query"
+
+    def classify(self, user_input: str) -> Optional[IntentMatch]:
+        if not any(pattern.search(user_input) for pattern in _TIME_QUESTION_PATTERNS):
+            return None
+
+        location_match = _LOCATION_PATTERN.search(user_input)
+        if not location_match:
+            return IntentMatch(GetCurrentTime(timezone="UTC"), 0.95, self.name)
+
+        timezone = resolve_timezone(location_match.group(1))
+        if timezone is None:
+            # A location we can't map locally (e.g. an inflected Polish city name):
+            # let the LLM parser extract it instead of silently answering in UTC.
+            return IntentMatch(GetCurrentTime(timezone="UTC"), 0.5, self.name)
+        return IntentMatch(GetCurrentTime(timezone=timezone), 0.95, self.name)
+
+
+class KnowledgeQuestionRule(IntentClassifier):
+    """Keyword rule: requests without any time vocabulary are knowledge base questions."""
+
+    name = "knowledge_question"
+
+    def classify(self, user_input: str) -> Optional[IntentMatch]:
+        if not user_input.strip() or _TIME_VOCABULARY.search(user_input):
+            return None
+        return IntentMatch(SearchKnowledgeBase(query=user_input), 0.9, self.name)
+
+
+class LocalModelClassifier(IntentClassifier):
+    """
+    Adapter for a lightweight local text classifier.
+
+    The model must follow the scikit-learn interface: ``predict_proba`` over a
+    list of texts and ``classes_`` holding task names ("search_knowledge_base",
+    "get_current_time").
+    """
+
+    name = "local_model"
+
+    def __init__(self, model: Any):
+        self.model = model
+
+    @classmethod
+    def from_path(cls, path: str) -> "LocalModelClassifier":
+        """Load a pickled model from a trusted local path."""
+        with open(path, "rb") as model_file:
+            return cls(pickle.load(model_file))
+
+    def classify(self, user_input: str) -> Optional[IntentMatch]:
+        probabilities = self.model.predict_proba([user_input])[0]
+        best = max(range(len(probabilities)), key=lambda i: probabilities[i])
+        task, confidence = self.model.classes_[best], float(probabilities[best])
+
+        if task == "search_knowledge_base":
+            return IntentMatch(SearchKnowledgeBase(query=user_input), confidence, self.name)
+        if task == "get_current_time":
+            location_match = _LOCATION_PATTERN.search(user_input)
+            timezone = resolve_timezone(location_match.group(1)) if location_match else "UTC"
+            if timezone is None:
+                return None
+            return IntentMatch(GetCurrentTime(timezone=timezone), confidence, self.name)
+        return None
+
+
+class IntentRouter:
+    """
+    Runs local classifiers in front of the LLM parser.
+
+    The highest-confidence match wins. If it is below the threshold, route()
+    returns None and the caller should fall back to the LLM parser.
+    """
+
+    def __init__(self, classifiers: Optional[List[IntentClassifier]] = None, threshold: Optional[float] = None):
+        self.classifiers: List[IntentClassifier] = list(classifiers or [])
+        self.threshold = config.INTENT_ROUTER_THRESHOLD if threshold is None else threshold
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"total": 0, "llm": 0}
+
+    def register(self, classifier: IntentClassifier) -> None:
+        """Add a classifier to the router."""
+        self.classifiers.append(classifier)
+
+    def classify(self, user_input: str) -> Optional[IntentMatch]:
+        """
+        Get the highest-confidence match without recording routing statistics.
+
+        Args:
+            user_input (str): The user's natural language query
+
+        Returns:
+            Optional[IntentMatch]: The best match, which may be below the threshold, or None
+        """
+        best: Optional[IntentMatch] = None
+        for classifier in self.classifiers:
+            try:
+                match = classifier.classify(user_input)
+            except Exception as e:
+                logger.warning(f"Intent classifier '{classifier.name}' failed: {e}")
+                continue
+            if match is not None and (best is None or match.confidence > best.confidence):
+                best = match
+        return best
+
+    def route(self, user_input: str) -> Optional[BaseModel]:
+        """
+        Resolve the user input locally if a classifier is confident enough.
+
+        Args:
+            user_input (str): The user's natural language query
+
+        Returns:
+            Optional[BaseModel]: The command to execute, or None to use the LLM parser
+        """
+        best = self.classify(user_input)
+        route = best.source if best is not None and best.confidence >= self.threshold else "llm"
+        with self._lock:
+            self._stats["total"] += 1
+            self._stats[route] = self._stats.get(route, 0) + 1
+
+        if route == "llm":
+            return None
+        logger.info(f"Intent routed locally by '{best.source}' (confidence {best.confidence:.2f})")
+        return best.command
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get routing counters.
+
+        Returns:
+            Dict[str, Any]: Per-route counts and the share of requests that skipped the LLM parser
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        stats["fast_path_rate"] = (stats["total"] - stats["llm"]) / stats["total"] if stats["total"] else 0.0
+        return stats
+
+
+def build_default_router() -> IntentRouter:
+    """Create the router with the built-in rules and the optional local model."""
+    router = IntentRouter([TimeQueryRule(), KnowledgeQuestionRule()])
+    if config.INTENT_MODEL_PATH:
+        try:
+            router.register(LocalModelClassifier.from_path(config.INTENT_MODEL_PATH))
+            logger.info(f"Loaded local intent model from '{config.INTENT_MODEL_PATH}'")
+        except Exception as e:
+            logger.error(f"Failed to load local intent model: {e}")
+    return router
+
+
+# Global intent router instance
+intent_router = build_default_router()
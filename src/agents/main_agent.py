@@ -3,27 +3,49 @@ Main Agent Module with Parse-Execute-Supervise Architecture and Lazy Initializat
 
 This module implements a three-step agent system with lazy loading:
 1. Parse: Convert natural language input into structured commands
-2. Execute: Run the appropriate tools based on the parsed command  
-3. Supervise: Review and potentially correct the output for quality assurance
+2. Execute: Run the appropriate tools based on the parsed command; knowledge base
+   questions are answered with one retrieval and one grounded completion (direct RAG),
+   with the tool-calling agent as a fallback
+3. Supervise: Review and potentially correct the output for quality assurance,
+   synchronously, in the background or not at all depending on the supervision policy
 
-The AI components are initialized lazily on first request to improve startup performance
-for Cloud Run deployments and health checks.
+The AI components are initialized once per process, either by a background warm-up
+started at boot or lazily on the first request, so startup stays fast for Cloud Run
+deployments and health checks.
 """
 
 import os
+import time
+import asyncio
 import logging
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional, Sequence, Set
+import numpy as np
 from pydantic import BaseModel
 
+from langchain_core.documents import Document
+
 from langchain_community.vectorstores import Chroma
 from langchain_google_vertexai import VertexAIEmbeddings
 from langchain_openai import ChatOpenAI
 from langchain.tools.retriever import create_retriever_tool
 from langchain.agents import AgentExecutor, create_tool_calling_agent
-from langchain import hub
 
 from src.core.models import AgentCommand, SearchKnowledgeBase, GetCurrentTime
 from src.core.config import config
+from src.core.semantic_cache import semantic_cache
+from src.core.embedding_cache import CachedEmbeddings
+from src.core.bm25_index import BM25Index
+from src.core.vector_snapshot import RELEVANCE_SCORE, SnapshotVectorStore, resolve_snapshot_path
+from src.core.vector_index import BACKEND_NUMPY
+from src.core.hybrid_retriever import HybridRetriever, MODE_VECTOR
+from src.core.metrics import StageTimer, pipeline_metrics
+from src.core.conversation_memory import conversation_memory, ChatHistory, Turn
+from src.prompts.registry import prompt_registry, PARSER, SUPERVISOR, DIRECT_RAG, EXECUTOR, SUMMARIZER
+from src.agents.initializer import ComponentInitializer
+from src.agents.intent_router import intent_router
+from src.agents.supervision import supervision_policy, verdict_log, SupervisionDecision, SYNC, ASYNC
 from src.tools.datetime_tools import get_current_time
 
 # --- CONFIGURATION ---
@@ -33,132 +55,416 @@ logger = logging.getLogger(__name__)
 # --- CONSTANTS ---
 # Configuration is now loaded from src.core.config
 
+# Knowledge base execution modes selectable via config.EXECUTION_MODE
+EXECUTION_DIRECT = "direct"
+EXECUTION_AGENT = "agent"
+
+NO_SUMMARY_ANSWER = "I found some information, but I'm having trouble summarizing it."
+
 # --- LAZY INITIALIZATION SETUP ---
 # This dictionary will hold our initialized AI components.
 # It will be populated only on the first request.
 AI_COMPONENTS: Dict[str, Any] = {}
 
+# Bounds how many conversations the async pipeline processes at once.
+# Created lazily so it binds to the running event loop.
+_CONCURRENCY_LIMITER: Optional[asyncio.Semaphore] = None
+
+# Background supervision runs after the reply has been sent.
+# The sync path uses a small thread pool, the async path keeps task references here.
+_BACKGROUND_SUPERVISOR = ThreadPoolExecutor(
+    max_workers=config.SUPERVISION_BACKGROUND_WORKERS,
+    thread_name_prefix="supervisor",
+)
+_BACKGROUND_TASKS: Set[asyncio.Task] = set()
+
+# Conversation memory is also written after the reply has been sent, since folding old
+# turns into the summary can take a summarizer LLM call. Async paths use _BACKGROUND_TASKS.
+_BACKGROUND_MEMORY = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory")
+
+
+def _chroma_vectors(db: Chroma) -> Callable[[Sequence[str]], Optional[np.ndarray]]:
+    """Look up stored chunk embeddings in the Chroma store, for MMR over hybrid results."""
+    def document_vectors(ids: Sequence[str]) -> Optional[np.ndarray]:
+        if any(chunk_id is None for chunk_id in ids):
+            return None
+        stored = db.get(ids=list(ids), include=["embeddings"])
+        vectors = dict(zip(stored["ids"], stored["embeddings"]))
+        if len(vectors) < len(set(ids)):
+            return None
+        return np.asarray([vectors[chunk_id] for chunk_id in ids], dtype=np.float32)
+    return document_vectors
+
 
-def initialize_agent():
+def initialize_agent(timer: Optional[StageTimer] = None):
     """
     Initializes all heavyweight AI components.
     
-    This function is called only once when the first request comes in.
-    This lazy initialization pattern ensures fast startup for Cloud Run
-    health checks while deferring expensive model loading until needed.
+    This function runs once per process, either in the background warm-up
+    started at boot or on the first request, always through agent_initializer
+    so concurrent callers never initialize twice. Deferring it keeps startup
+    fast for Cloud Run liveness checks.
+    
+    Args:
+        timer (Optional[StageTimer]): Timer receiving one stage per component
     """
     if "agent_executor" in AI_COMPONENTS:
         logger.info("AI components already initialized.")
         return
 
     logger.info("Performing one-time initialization of AI components...")
+    timer = timer or StageTimer()
 
-    # Validation: Check if vector store exists
-    if not os.path.exists(config.VECTOR_STORE_DIR):
+    # Validation: Check if a snapshot or the vector store exists
+    snapshot_path = resolve_snapshot_path(config.VECTOR_SNAPSHOT_DIR) if config.RETRIEVAL_BACKEND == BACKEND_NUMPY else None
+    if snapshot_path is None and not os.path.exists(config.VECTOR_STORE_DIR):
         logger.error(f"Vector store directory '{config.VECTOR_STORE_DIR}' not found.")
         logger.error("Please run 'python ingest.py' first to create the knowledge base.")
         raise FileNotFoundError(f"Vector store not found at {config.VECTOR_STORE_DIR}")
 
     # 1. Initialize models with configurable parameters
-    parser_llm = ChatOpenAI(
-        model_name=config.PARSER_MODEL, 
-        temperature=config.PARSER_TEMPERATURE,
-        **config.get_openai_config()
-    ).with_structured_output(AgentCommand)
-    
-    executor_llm = ChatOpenAI(
-        model_name=config.EXECUTOR_MODEL, 
-        temperature=config.EXECUTOR_TEMPERATURE,
-        **config.get_openai_config()
-    )
+    with timer.stage("parser_llm"):
+        parser_llm = ChatOpenAI(
+            model_name=config.PARSER_MODEL, 
+            temperature=config.PARSER_TEMPERATURE,
+            **config.get_openai_config()
+        ).with_structured_output(AgentCommand)
     
-    supervisor_llm = ChatOpenAI(
-        model_name=config.SUPERVISOR_MODEL, 
-        temperature=config.SUPERVISOR_TEMPERATURE,
-        **config.get_openai_config()
-    )
+    with timer.stage("executor_llm"):
+        executor_llm = ChatOpenAI(
+            model_name=config.EXECUTOR_MODEL, 
+            temperature=config.EXECUTOR_TEMPERATURE,
+            **config.get_openai_config()
+        )
+    
+    with timer.stage("supervisor_llm"):
+        supervisor_llm = ChatOpenAI(
+            model_name=config.SUPERVISOR_MODEL, 
+            temperature=config.SUPERVISOR_TEMPERATURE,
+            **config.get_openai_config()
+        )
 
     # 2. Initialize Retriever Tool with configurable parameters
-    embeddings = VertexAIEmbeddings(
-        model_name=config.EMBEDDING_MODEL,
-        **config.get_vertex_ai_config()
-    )
-    db = Chroma(persist_directory=config.VECTOR_STORE_DIR, embedding_function=embeddings)
-    retriever = db.as_retriever(search_kwargs={"k": config.RETRIEVAL_K})
+    with timer.stage("embeddings"):
+        embeddings = VertexAIEmbeddings(
+            model_name=config.EMBEDDING_MODEL,
+            **config.get_vertex_ai_config()
+        )
+        if config.EMBEDDING_CACHE_ENABLED:
+            # Repeated queries (and the semantic cache lookup + retrieval of the
+            # same query) are embedded only once
+            embeddings = CachedEmbeddings(embeddings, model_name=config.EMBEDDING_MODEL)
 
-    knowledge_base_tool = create_retriever_tool(
-        retriever,
-        "knowledge_base_search",
-        "Searches and returns information from the user's knowledge base. Use this for any questions that require context from provided documents."
-    )
-    tools = [knowledge_base_tool, get_current_time]
+    with timer.stage("vector_db"):
+        if snapshot_path is not None:
+            # Searched in-process with NumPy; no Chroma client is opened
+            db = SnapshotVectorStore.load(
+                snapshot_path,
+                embeddings,
+                index=config.VECTOR_INDEX,
+                n_lists=config.IVF_LISTS or None,
+                n_probe=config.IVF_PROBES,
+            )
+            logger.info(f"Using vector snapshot '{snapshot_path}' ({len(db.snapshot)} chunks, {db.snapshot.dtype}, "
+                        f"{config.VECTOR_INDEX} index)")
+        else:
+            if config.RETRIEVAL_BACKEND == BACKEND_NUMPY:
+                logger.warning("No vector snapshot found; using the Chroma store.")
+            db = Chroma(persist_directory=config.VECTOR_STORE_DIR, embedding_function=embeddings)
+
+    with timer.stage("retriever"):
+        # Fuse with the prebuilt BM25 index unless plain vector retrieval is configured
+        bm25_path = os.path.join(config.VECTOR_STORE_DIR, config.BM25_INDEX_FILE)
+        bm25_index = None
+        if config.RETRIEVAL_MODE != MODE_VECTOR and not config.RETRIEVAL_SECTIONS:
+            if snapshot_path is not None:
+                bm25_index = db.snapshot.bm25_index()
+            elif os.path.exists(bm25_path):
+                bm25_index = BM25Index.load(bm25_path)
+
+        if config.RETRIEVAL_MODE != MODE_VECTOR and config.RETRIEVAL_SECTIONS:
+            logger.warning("RETRIEVAL_SECTIONS is set; using vector-only retrieval so the filter applies.")
+        elif config.RETRIEVAL_MODE != MODE_VECTOR and bm25_index is None:
+            logger.warning("BM25 index not found; using vector-only retrieval.")
+        hybrid = config.RETRIEVAL_MODE != MODE_VECTOR and bm25_index is not None
+        mmr = config.RETRIEVAL_SEARCH_TYPE == "mmr"
+        fetch_k = max(config.MMR_FETCH_K, config.RETRIEVAL_K)
+
+        search_kwargs: Dict[str, Any] = {"k": config.RETRIEVAL_K}
+        if config.RETRIEVAL_SECTIONS:
+            # Restrict retrieval to chosen source files of the knowledge base dump
+            search_kwargs["filter"] = {"section": {"$in": config.RETRIEVAL_SECTIONS}}
+        if mmr and hybrid:
+            # MMR runs on the fused candidates instead, so the vector half returns its plain top fetch_k
+            retriever = db.as_retriever(search_type="similarity", search_kwargs=dict(search_kwargs, k=fetch_k))
+        else:
+            if mmr:
+                search_kwargs.update(fetch_k=fetch_k, lambda_mult=config.MMR_LAMBDA)
+            retriever = db.as_retriever(search_type=config.RETRIEVAL_SEARCH_TYPE, search_kwargs=search_kwargs)
+
+        if hybrid:
+            retriever = HybridRetriever(
+                vector_retriever=retriever,
+                bm25_index=bm25_index,
+                k=config.RETRIEVAL_K,
+                mode=config.RETRIEVAL_MODE,
+                lexical_only_overlap=config.LEXICAL_ONLY_OVERLAP,
+                rrf_k=config.RRF_K,
+                mmr_lambda=config.MMR_LAMBDA if mmr else None,
+                fetch_k=fetch_k,
+                document_vectors=db.document_vectors if snapshot_path is not None else _chroma_vectors(db),
+            )
 
     # 3. Create the Executor Agent with configurable verbosity
-    executor_prompt = hub.pull("hwchase17/openai-tools-agent")
-    agent = create_tool_calling_agent(executor_llm, tools, executor_prompt)
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=config.VERBOSE_LOGGING)
+    with timer.stage("agent_executor"):
+        knowledge_base_tool = create_retriever_tool(
+            retriever,
+            "knowledge_base_search",
+            "Searches and returns information from the user's knowledge base. Use this for any questions that require context from provided documents."
+        )
+        tools = [knowledge_base_tool, get_current_time]
+
+        # The prompt comes from the local registry, so initialization needs no network fetch
+        executor_prompt = prompt_registry.get(EXECUTOR)
+        agent = create_tool_calling_agent(executor_llm, tools, executor_prompt)
+        agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=config.VERBOSE_LOGGING)
     
     # Store components in the global dictionary
+    AI_COMPONENTS["embeddings"] = embeddings
+    AI_COMPONENTS["vector_db"] = db
+    AI_COMPONENTS["retriever"] = retriever
     AI_COMPONENTS["parser_llm"] = parser_llm
+    AI_COMPONENTS["executor_llm"] = executor_llm
     AI_COMPONENTS["agent_executor"] = agent_executor
     AI_COMPONENTS["supervisor_llm"] = supervisor_llm
+
+    # Old turns of long conversations are folded into a summary by the executor LLM
+    conversation_memory.summarizer = _summarize_turns
     
     logger.info("AI components initialization complete.")
 
 
+# Single-flight initialization shared by the warm-up thread and all request paths
+agent_initializer = ComponentInitializer(initialize_agent)
+
+
 # --- CORE AGENT LOGIC ---
 
-def parse_command(user_input: str) -> BaseModel:
+def _build_parser_prompt(user_input: str, history: Optional[ChatHistory] = None) -> str:
+    """Build the prompt used by the parser LLM to classify the user's intent."""
+    return prompt_registry.render(PARSER, user_input=user_input, history=(history or ChatHistory()).render())
+
+
+def _build_supervisor_prompt(original_query: str, generated_answer: str) -> str:
+    """Build the prompt used by the supervisor LLM to review an answer."""
+    return prompt_registry.render(SUPERVISOR, original_query=original_query, generated_answer=generated_answer)
+
+
+def _source_label(document: Document) -> str:
+    """Where a chunk comes from: its knowledge base file and the headings above it."""
+    label = document.metadata.get("section", "knowledge base")
+    if document.metadata.get("headings"):
+        label = f"{label} > {document.metadata['headings']}"
+    return label
+
+
+def _top_relevance_score(documents: List[Document]) -> Optional[float]:
+    """Relevance score of the best retrieved chunk, or None if the vector store did not report scores."""
+    scores = [document.metadata[RELEVANCE_SCORE] for document in documents if RELEVANCE_SCORE in document.metadata]
+    return max(scores) if scores else None
+
+
+def _build_direct_rag_prompt(query: str, documents: List[Document], history: Optional[ChatHistory] = None) -> str:
+    """Build the prompt for answering a knowledge base question from retrieved chunks in one call."""
+    context = "\n\n".join(
+        f"[{i}] ({_source_label(document)})\n{document.page_content}"
+        for i, document in enumerate(documents, start=1)
+    )
+    return prompt_registry.render(DIRECT_RAG, context=context, query=query, history=(history or ChatHistory()).render())
+
+
+def _summarize_turns(summary: str, turns: List[Turn]) -> str:
+    """Fold conversation turns that no longer fit the memory budget into the running summary."""
+    prompt = prompt_registry.render(
+        SUMMARIZER,
+        summary=summary or "(empty)",
+        messages=ChatHistory(turns=turns).render(),
+        max_words=config.MEMORY_TOKEN_BUDGET // 4,
+    )
+    return AI_COMPONENTS["executor_llm"].invoke(prompt).content
+
+
+def _load_history(chat_id: Optional[str]) -> ChatHistory:
+    """Get the remembered context of a chat; empty when memory is disabled or there is no chat."""
+    if not config.MEMORY_ENABLED or chat_id is None:
+        return ChatHistory()
+    try:
+        return conversation_memory.history(chat_id)
+    except Exception as e:
+        logger.warning(f"Could not load conversation memory for chat {chat_id}: {e}")
+        return ChatHistory()
+
+
+def _remember(chat_id: Optional[str], user_input: str, answer: str) -> None:
+    """Record an exchange in the chat's memory; failures never affect the reply."""
+    if not config.MEMORY_ENABLED or chat_id is None:
+        return
+    try:
+        conversation_memory.append(chat_id, user_input, answer)
+    except Exception as e:
+        logger.warning(f"Could not update conversation memory for chat {chat_id}: {e}")
+
+
+def _remember_in_background(chat_id: Optional[str], user_input: str, answer: str) -> None:
+    """Record an exchange once the reply has been returned (sync path)."""
+    if config.MEMORY_ENABLED and chat_id is not None:
+        _BACKGROUND_MEMORY.submit(_remember, chat_id, user_input, answer)
+
+
+def _aremember_in_background(chat_id: Optional[str], user_input: str, answer: str) -> None:
+    """Record an exchange in a background task once the reply has been returned (async paths)."""
+    if config.MEMORY_ENABLED and chat_id is not None:
+        task = asyncio.create_task(asyncio.to_thread(_remember, chat_id, user_input, answer))
+        _BACKGROUND_TASKS.add(task)
+        task.add_done_callback(_BACKGROUND_TASKS.discard)
+
+
+def _apply_supervisor_feedback(generated_answer: str, supervisor_feedback: str) -> str:
+    """Return the original answer if the supervisor approved it, otherwise the revision."""
+    if supervisor_feedback.strip().upper() == "APPROVED":
+        logger.info("Supervisor approved the original answer.")
+        return generated_answer
+    else:
+        logger.warning(f"Supervisor revised the answer. New answer: '{supervisor_feedback}'")
+        return supervisor_feedback
+
+
+def _route_locally(user_input: str, history: Optional[ChatHistory] = None) -> Optional[BaseModel]:
+    """
+    Resolves obvious requests with the intent router, without an LLM round trip.
+    
+    Follow-ups need the parser, which sees the history and rewrites them into
+    standalone queries, so they are never routed locally.
+    
+    Args:
+        user_input (str): The user's natural language query
+        history (Optional[ChatHistory]): The chat's history
+        
+    Returns:
+        Optional[BaseModel]: The command, or None if the LLM parser must decide
+    """
+    if not config.INTENT_ROUTER_ENABLED or history:
+        return None
+    command = intent_router.route(user_input)
+    if command is not None:
+        logger.info(f"Parsed command locally: {command.dict()}")
+    return command
+
+
+def parse_command(
+    user_input: str, history: Optional[ChatHistory] = None, route_locally: bool = True
+) -> BaseModel:
     """
     Parses the user's natural language input into a structured Pydantic model command.
     
     Args:
         user_input (str): The user's natural language query
+        history (Optional[ChatHistory]): The chat's history, used to resolve follow-up questions
+        route_locally (bool): Try the intent router first; False if the caller already did
         
     Returns:
         BaseModel: A structured command object based on the user's intent
     """
     logger.info(f"Parsing command for input: '{user_input}'")
-    
-    parser_prompt = f"""
-    Given the user's request, determine the appropriate task and its parameters.
-    
-    Available tasks:
-    1. 'search_knowledge_base': Use this when the user is asking a question or looking for information that might be in the provided documents. The 'query' should be the user's question.
-    2. 'get_current_time': Use this when the user asks for the current time. The 'timezone' parameter is optional and defaults to UTC, but if the user specifies a city or timezone (e.g., "time in Warsaw", "what time is it in New York"), extract it.
 
-    User Request: "{user_input}"
-    
-    Now, provide the output in the required JSON format.
-    """
+    # Fast path: resolve obvious requests locally without an LLM round trip
+    command = _route_locally(user_input, history) if route_locally else None
+    if command is not None:
+        return command
     
     parser_llm = AI_COMPONENTS["parser_llm"]
-    command = parser_llm.invoke(parser_prompt)
+    command = parser_llm.invoke(_build_parser_prompt(user_input, history))
     logger.info(f"Parsed command: {command.dict()}")
     return command
 
 
-def execute_command(command: BaseModel) -> str:
+def answer_directly(
+    query: str, timer: Optional[StageTimer] = None, history: Optional[ChatHistory] = None
+) -> Optional[str]:
+    """
+    Answers a knowledge base question with one retrieval and one grounded completion.
+    
+    The parser has already decided the question needs the knowledge base, so
+    there is no need to let the executor LLM pick the retrieval tool first.
+    
+    Args:
+        query (str): The knowledge base question
+        timer (Optional[StageTimer]): Timer receiving the "retrieve" and "generate" stages and the retrieval score
+        history (Optional[ChatHistory]): The chat's history
+        
+    Returns:
+        Optional[str]: The answer, or None if nothing was retrieved and the agent should be used
+    """
+    timer = timer or StageTimer()
+    with timer.stage("retrieve"):
+        documents = AI_COMPONENTS["retriever"].invoke(query)
+    timer.retrieval_score = _top_relevance_score(documents)
+    if not documents:
+        logger.info("Direct RAG retrieved no context; falling back to the agent executor.")
+        return None
+
+    with timer.stage("generate"):
+        response = AI_COMPONENTS["executor_llm"].invoke(_build_direct_rag_prompt(query, documents, history))
+    return response.content or None
+
+
+def _agent_input(query: str, history: Optional[ChatHistory]) -> Dict[str, Any]:
+    """Build the AgentExecutor input, passing the chat history to the prompt's chat_history slot."""
+    if history:
+        return {"input": query, "chat_history": history.as_messages()}
+    return {"input": query}
+
+
+def execute_command(
+    command: BaseModel, timer: Optional[StageTimer] = None, history: Optional[ChatHistory] = None
+) -> str:
     """
     Executes a parsed command using the appropriate tools.
     
     Args:
         command (BaseModel): A structured command object to execute
+        timer (Optional[StageTimer]): Timer receiving the execution stages and path
+        history (Optional[ChatHistory]): The chat's history
         
     Returns:
         str: The result of executing the command
     """
     logger.info(f"Executing command: {command.dict()}")
+    timer = timer or StageTimer()
     
     if isinstance(command, SearchKnowledgeBase):
-        # If the task is to search the knowledge base, invoke the agent executor with the query
+        # Direct RAG first: a single completion over the retrieved chunks
+        if config.EXECUTION_MODE == EXECUTION_DIRECT:
+            try:
+                answer = answer_directly(command.query, timer, history)
+            except Exception as e:
+                logger.warning(f"Direct RAG failed ({e}); falling back to the agent executor.")
+                answer = None
+            if answer is not None:
+                timer.path = EXECUTION_DIRECT
+                return answer
+
+        # Tool-calling agent: the executor LLM decides when to search the knowledge base
+        timer.path = EXECUTION_AGENT
         agent_executor = AI_COMPONENTS["agent_executor"]
-        result = agent_executor.invoke({"input": command.query})
-        return result.get("output", "I found some information, but I'm having trouble summarizing it.")
+        with timer.stage("agent"):
+            result = agent_executor.invoke(_agent_input(command.query, history))
+        return result.get("output", NO_SUMMARY_ANSWER)
     
     elif isinstance(command, GetCurrentTime):
         # If the task is to get the current time, call the tool directly
         # This is more efficient than running the full agent executor for a simple task
+        timer.path = "time"
         return get_current_time.run(command.timezone)
         
     else:
@@ -186,62 +492,508 @@ def supervise_output(original_query: str, generated_answer: str) -> str:
     logger.info(f"Supervising output for query: '{original_query}'")
     logger.info(f"Initial answer: '{generated_answer}'")
 
-    supervisor_prompt = f"""
-    You are a Quality Assurance Supervisor. Your task is to review an answer generated by an AI agent based on a user's original query.
+    supervisor_llm = AI_COMPONENTS["supervisor_llm"]
+    supervisor_feedback = supervisor_llm.invoke(_build_supervisor_prompt(original_query, generated_answer)).content
+    return _apply_supervisor_feedback(generated_answer, supervisor_feedback)
 
-    Original User Query: "{original_query}"
-    
-    Generated Answer to Review: "{generated_answer}"
 
-    Please evaluate the answer based on the following criteria:
-    1.  **Relevance:** Does the answer directly address the user's query?
-    2.  **Accuracy:** Is the information correct and consistent with the query?
-    3.  **Completeness:** Does it fully answer the user's question without leaving out key details?
-    4.  **Clarity:** Is the answer easy to understand?
+def _supervise_in_background(original_query: str, generated_answer: str, decision: SupervisionDecision) -> None:
+    """Review an already-sent answer and record the verdict for offline review."""
+    start = time.perf_counter()
+    try:
+        supervisor_llm = AI_COMPONENTS["supervisor_llm"]
+        feedback = supervisor_llm.invoke(_build_supervisor_prompt(original_query, generated_answer)).content
+        verdict_log.record(original_query, generated_answer, feedback, decision.reason)
+    except Exception as e:
+        logger.error(f"Background supervision failed: {e}", exc_info=True)
+    supervision_policy.record(decision, time.perf_counter() - start, supervisor_calls=1, background=True)
 
-    If the answer is satisfactory, respond ONLY with the word "APPROVED".
-    If the answer is unsatisfactory, DO NOT say it's wrong. Instead, provide a corrected and improved version of the answer directly, without any preamble.
+
+def supervise_with_policy(
+    original_query: str, command: BaseModel, generated_answer: str, retrieval_score: Optional[float] = None
+) -> str:
     """
+    Applies the configured supervision policy to an executed command.
     
-    supervisor_llm = AI_COMPONENTS["supervisor_llm"]
-    supervisor_feedback = supervisor_llm.invoke(supervisor_prompt).content
-    
-    if supervisor_feedback.strip().upper() == "APPROVED":
-        logger.info("Supervisor approved the original answer.")
-        return generated_answer
-    else:
-        logger.warning(f"Supervisor revised the answer. New answer: '{supervisor_feedback}'")
-        return supervisor_feedback
+    Args:
+        original_query (str): The user's original question
+        command (BaseModel): The executed command
+        generated_answer (str): The answer generated by the executor
+        retrieval_score (Optional[float]): Relevance score of the best chunk the answer is grounded in, if known
+        
+    Returns:
+        str: The answer to send to the user
+    """
+    start = time.perf_counter()
+    # The score comes from the retrieval that produced the answer; searching again would cost another round trip
+    score = retrieval_score if supervision_policy.needs_retrieval_score(command) else None
+    decision = supervision_policy.decide(command, score)
+    logger.info(f"Supervision decision: {decision.mode} ({decision.reason})")
+
+    if decision.mode == SYNC:
+        final_answer = supervise_output(original_query, generated_answer)
+        supervision_policy.record(decision, time.perf_counter() - start, supervisor_calls=1)
+        return final_answer
+
+    if decision.mode == ASYNC:
+        _BACKGROUND_SUPERVISOR.submit(_supervise_in_background, original_query, generated_answer, decision)
+    supervision_policy.record(decision, time.perf_counter() - start, supervisor_calls=0)
+    return generated_answer
 
 
-def process_query(user_input: str) -> str:
+def _cacheable(routed_command: Optional[BaseModel]) -> bool:
+    """Whether a request may be answered from (and stored in) the semantic cache, judging by its local route."""
+    return routed_command is None or isinstance(routed_command, SearchKnowledgeBase)
+
+
+def process_query(user_input: str, chat_id: Optional[str] = None) -> str:
     """
     Full end-to-end processing: initialize (if needed), parse, execute, and supervise.
     
-    This is the main entry point called by the Telegram bot.
+    This is the synchronous entry point, kept for scripts and thread-based callers.
     Implements lazy initialization and the Parse-Execute-Supervise pattern.
     
     Args:
         user_input (str): The user's natural language query
+        chat_id (Optional[str]): Conversation to remember the exchange in; None for a stateless query
         
     Returns:
         str: The agent's quality-assured response
     """
-    # LAZY INITIALIZATION: Check if components are loaded, if not, load them.
-    if not AI_COMPONENTS:
-        initialize_agent()
+    # LAZY INITIALIZATION: No-op once warm; otherwise waits for (or runs) the single initialization.
+    agent_initializer.ensure_ready()
         
+    timer = StageTimer()
     try:
+        with timer.stage("memory"):
+            history = _load_history(chat_id)
+
+        # Requests the router resolves to another tool (e.g. the current time) are never
+        # cached, so routing first saves their query embedding
+        with timer.stage("parse"):
+            routed_command = _route_locally(user_input, history)
+
+        # Step 0: Answer near-duplicate questions straight from the semantic cache. Follow-ups
+        # depend on the chat's earlier messages, so another chat's answer would be wrong for them.
+        query_embedding = None
+        if config.SEMANTIC_CACHE_ENABLED and not history and _cacheable(routed_command):
+            with timer.stage("cache"):
+                query_embedding = AI_COMPONENTS["embeddings"].embed_query(user_input)
+                cached_answer = semantic_cache.lookup(query_embedding)
+            if cached_answer is not None:
+                logger.info(f"Semantic cache hit for query: '{user_input}'")
+                timer.path = "cache"
+                _remember_in_background(chat_id, user_input, cached_answer)
+                return cached_answer
+
         # Step 1: Parse the user input into a structured command
-        parsed_command = parse_command(user_input)
+        with timer.stage("parse"):
+            parsed_command = routed_command
+            if parsed_command is None:
+                parsed_command = parse_command(user_input, history, route_locally=False)
         
         # Step 2: Execute the parsed command
-        initial_answer = execute_command(parsed_command)
+        initial_answer = execute_command(parsed_command, timer, history)
         
-        # Step 3: Supervise and quality-check the answer
-        final_answer = supervise_output(user_input, initial_answer)
+        # Step 3: Supervise and quality-check the answer according to the supervision policy
+        with timer.stage("supervise"):
+            final_answer = supervise_with_policy(user_input, parsed_command, initial_answer, timer.retrieval_score)
+
+        # Only knowledge base answers are cacheable; time lookups must stay fresh and
+        # answers that depended on earlier messages would be wrong for other chats
+        if query_embedding is not None and isinstance(parsed_command, SearchKnowledgeBase) and not history:
+            semantic_cache.store(user_input, query_embedding, final_answer)
+
+        # Recorded after the reply is returned; the per-chat lock in conversation_memory
+        # makes the chat's next message wait for a write in progress
+        _remember_in_background(chat_id, user_input, final_answer)
         
         return final_answer
     except Exception as e:
         logger.error(f"Error processing query: {e}", exc_info=True)
-        return "I'm sorry, an error occurred while processing your request."
\ No newline at end of file
+        return "I'm sorry, an error occurred while processing your request."
+    finally:
+        pipeline_metrics.record(timer)
+        logger.info(f"Stage timings: {timer.summary()}")
+
+
+# --- ASYNC AGENT LOGIC ---
+# Native asyncio counterparts of the pipeline steps. They use ainvoke() so the
+# underlying AsyncOpenAI clients never block a thread while waiting on the API.
+
+def _get_concurrency_limiter() -> asyncio.Semaphore:
+    """Get the semaphore bounding concurrent async pipeline runs."""
+    global _CONCURRENCY_LIMITER
+    if _CONCURRENCY_LIMITER is None:
+        _CONCURRENCY_LIMITER = asyncio.Semaphore(config.AGENT_MAX_CONCURRENCY)
+    return _CONCURRENCY_LIMITER
+
+
+async def aparse_command(
+    user_input: str, history: Optional[ChatHistory] = None, route_locally: bool = True
+) -> BaseModel:
+    """
+    Async version of parse_command.
+    
+    Args:
+        user_input (str): The user's natural language query
+        history (Optional[ChatHistory]): The chat's history, used to resolve follow-up questions
+        route_locally (bool): Try the intent router first; False if the caller already did
+        
+    Returns:
+        BaseModel: A structured command object based on the user's intent
+    """
+    logger.info(f"Parsing command for input: '{user_input}'")
+
+    # Fast path: resolve obvious requests locally without an LLM round trip
+    command = _route_locally(user_input, history) if route_locally else None
+    if command is not None:
+        return command
+    
+    parser_llm = AI_COMPONENTS["parser_llm"]
+    command = await parser_llm.ainvoke(_build_parser_prompt(user_input, history))
+    logger.info(f"Parsed command: {command.dict()}")
+    return command
+
+
+async def aanswer_directly(
+    query: str, timer: Optional[StageTimer] = None, history: Optional[ChatHistory] = None
+) -> Optional[str]:
+    """
+    Async version of answer_directly.
+    
+    Args:
+        query (str): The knowledge base question
+        timer (Optional[StageTimer]): Timer receiving the "retrieve" and "generate" stages and the retrieval score
+        history (Optional[ChatHistory]): The chat's history
+        
+    Returns:
+        Optional[str]: The answer, or None if nothing was retrieved and the agent should be used
+    """
+    timer = timer or StageTimer()
+    with timer.stage("retrieve"):
+        documents = await AI_COMPONENTS["retriever"].ainvoke(query)
+    timer.retrieval_score = _top_relevance_score(documents)
+    if not documents:
+        logger.info("Direct RAG retrieved no context; falling back to the agent executor.")
+        return None
+
+    with timer.stage("generate"):
+        response = await AI_COMPONENTS["executor_llm"].ainvoke(_build_direct_rag_prompt(query, documents, history))
+    return response.content or None
+
+
+async def aexecute_command(
+    command: BaseModel, timer: Optional[StageTimer] = None, history: Optional[ChatHistory] = None
+) -> str:
+    """
+    Async version of execute_command.
+    
+    Args:
+        command (BaseModel): A structured command object to execute
+        timer (Optional[StageTimer]): Timer receiving the execution stages and path
+        history (Optional[ChatHistory]): The chat's history
+        
+    Returns:
+        str: The result of executing the command
+    """
+    logger.info(f"Executing command: {command.dict()}")
+    timer = timer or StageTimer()
+    
+    if isinstance(command, SearchKnowledgeBase):
+        if config.EXECUTION_MODE == EXECUTION_DIRECT:
+            try:
+                answer = await aanswer_directly(command.query, timer, history)
+            except Exception as e:
+                logger.warning(f"Direct RAG failed ({e}); falling back to the agent executor.")
+                answer = None
+            if answer is not None:
+                timer.path = EXECUTION_DIRECT
+                return answer
+
+        timer.path = EXECUTION_AGENT
+        agent_executor = AI_COMPONENTS["agent_executor"]
+        with timer.stage("agent"):
+            result = await agent_executor.ainvoke(_agent_input(command.query, history))
+        return result.get("output", NO_SUMMARY_ANSWER)
+    
+    elif isinstance(command, GetCurrentTime):
+        # Pure local computation, cheap enough to run inline on the event loop
+        timer.path = "time"
+        return get_current_time.run(command.timezone)
+        
+    else:
+        logger.warning(f"Unknown command type: {type(command)}")
+        return "I'm not sure how to handle that request."
+
+
+async def asupervise_output(original_query: str, generated_answer: str) -> str:
+    """
+    Async version of supervise_output.
+    
+    Args:
+        original_query (str): The user's original question
+        generated_answer (str): The answer generated by the executor
+        
+    Returns:
+        str: Either the approved original answer or an improved version
+    """
+    logger.info(f"Supervising output for query: '{original_query}'")
+    logger.info(f"Initial answer: '{generated_answer}'")
+
+    supervisor_llm = AI_COMPONENTS["supervisor_llm"]
+    response = await supervisor_llm.ainvoke(_build_supervisor_prompt(original_query, generated_answer))
+    return _apply_supervisor_feedback(generated_answer, response.content)
+
+
+async def _asupervise_in_background(original_query: str, generated_answer: str, decision: SupervisionDecision) -> None:
+    """Async version of _supervise_in_background."""
+    start = time.perf_counter()
+    try:
+        supervisor_llm = AI_COMPONENTS["supervisor_llm"]
+        response = await supervisor_llm.ainvoke(_build_supervisor_prompt(original_query, generated_answer))
+        verdict_log.record(original_query, generated_answer, response.content, decision.reason)
+    except Exception as e:
+        logger.error(f"Background supervision failed: {e}", exc_info=True)
+    supervision_policy.record(decision, time.perf_counter() - start, supervisor_calls=1, background=True)
+
+
+async def asupervise_with_policy(
+    original_query: str, command: BaseModel, generated_answer: str, retrieval_score: Optional[float] = None
+) -> str:
+    """
+    Async version of supervise_with_policy.
+    
+    Args:
+        original_query (str): The user's original question
+        command (BaseModel): The executed command
+        generated_answer (str): The answer generated by the executor
+        retrieval_score (Optional[float]): Relevance score of the best chunk the answer is grounded in, if known
+        
+    Returns:
+        str: The answer to send to the user
+    """
+    start = time.perf_counter()
+    score = retrieval_score if supervision_policy.needs_retrieval_score(command) else None
+    decision = supervision_policy.decide(command, score)
+    logger.info(f"Supervision decision: {decision.mode} ({decision.reason})")
+
+    if decision.mode == SYNC:
+        final_answer = await asupervise_output(original_query, generated_answer)
+        supervision_policy.record(decision, time.perf_counter() - start, supervisor_calls=1)
+        return final_answer
+
+    if decision.mode == ASYNC:
+        task = asyncio.create_task(_asupervise_in_background(original_query, generated_answer, decision))
+        _BACKGROUND_TASKS.add(task)
+        task.add_done_callback(_BACKGROUND_TASKS.discard)
+    supervision_policy.record(decision, time.perf_counter() - start, supervisor_calls=0)
+    return generated_answer
+
+
+async def aprocess_query(user_input: str, chat_id: Optional[str] = None) -> str:
+    """
+    Async end-to-end processing: initialize (if needed), parse, execute, and supervise.
+    
+    This is the main entry point called by the Telegram bot. At most
+    config.AGENT_MAX_CONCURRENCY queries run through the pipeline at once;
+    the rest wait on the event loop without holding a thread.
+    
+    Args:
+        user_input (str): The user's natural language query
+        chat_id (Optional[str]): Conversation to remember the exchange in; None for a stateless query
+        
+    Returns:
+        str: The agent's quality-assured response
+    """
+    # LAZY INITIALIZATION: Component construction is blocking, so it runs off the event loop.
+    await agent_initializer.aensure_ready()
+
+    async with _get_concurrency_limiter():
+        timer = StageTimer()
+        try:
+            # Memory backends may do disk or network I/O, so they run off the event loop
+            with timer.stage("memory"):
+                history = await asyncio.to_thread(_load_history, chat_id)
+
+            # Route first so requests for other tools are not embedded (see process_query)
+            with timer.stage("parse"):
+                routed_command = _route_locally(user_input, history)
+
+            # Step 0: Answer near-duplicate questions straight from the semantic cache
+            # (not for follow-ups, see process_query)
+            query_embedding = None
+            if config.SEMANTIC_CACHE_ENABLED and not history and _cacheable(routed_command):
+                with timer.stage("cache"):
+                    query_embedding = await AI_COMPONENTS["embeddings"].aembed_query(user_input)
+                    cached_answer = semantic_cache.lookup(query_embedding)
+                if cached_answer is not None:
+                    logger.info(f"Semantic cache hit for query: '{user_input}'")
+                    timer.path = "cache"
+                    _aremember_in_background(chat_id, user_input, cached_answer)
+                    return cached_answer
+
+            # Step 1: Parse the user input into a structured command
+            with timer.stage("parse"):
+                parsed_command = routed_command
+                if parsed_command is None:
+                    parsed_command = await aparse_command(user_input, history, route_locally=False)
+
+            # Step 2: Execute the parsed command
+            initial_answer = await aexecute_command(parsed_command, timer, history)
+
+            # Step 3: Supervise and quality-check the answer according to the supervision policy
+            with timer.stage("supervise"):
+                final_answer = await asupervise_with_policy(
+                    user_input, parsed_command, initial_answer, timer.retrieval_score
+                )
+
+            # Only knowledge base answers are cacheable; time lookups must stay fresh and
+            # answers that depended on earlier messages would be wrong for other chats
+            if query_embedding is not None and isinstance(parsed_command, SearchKnowledgeBase) and not history:
+                semantic_cache.store(user_input, query_embedding, final_answer)
+
+            _aremember_in_background(chat_id, user_input, final_answer)
+
+            return final_answer
+        except Exception as e:
+            logger.error(f"Error processing query: {e}", exc_info=True)
+            return "I'm sorry, an error occurred while processing your request."
+        finally:
+            pipeline_metrics.record(timer)
+            logger.info(f"Stage timings: {timer.summary()}")
+
+
+# --- STREAMING AGENT LOGIC ---
+
+@dataclass
+class StreamEvent:
+    """
+    An event emitted by astream_query.
+    
+    kind is "token" for an incremental piece of the executor's answer and
+    "final" for the complete answer to display, which may differ from the
+    streamed text if the supervisor revised it.
+    """
+    kind: str
+    text: str
+
+
+async def astream_command(
+    command: BaseModel, timer: Optional[StageTimer] = None, history: Optional[ChatHistory] = None
+) -> AsyncIterator[str]:
+    """
+    Executes a parsed command, yielding the answer incrementally.
+    
+    Knowledge base searches stream the executor LLM's tokens as they arrive;
+    other commands yield their complete result at once.
+    
+    Args:
+        command (BaseModel): A structured command object to execute
+        timer (Optional[StageTimer]): Timer receiving the execution stages and path
+        history (Optional[ChatHistory]): The chat's history
+        
+    Yields:
+        str: Pieces of the answer in order
+    """
+    timer = timer or StageTimer()
+    if not isinstance(command, SearchKnowledgeBase):
+        yield await aexecute_command(command, timer, history)
+        return
+
+    logger.info(f"Streaming command: {command.dict()}")
+
+    if config.EXECUTION_MODE == EXECUTION_DIRECT:
+        documents: List[Document] = []
+        try:
+            with timer.stage("retrieve"):
+                documents = await AI_COMPONENTS["retriever"].ainvoke(command.query)
+        except Exception as e:
+            logger.warning(f"Direct RAG retrieval failed ({e}); falling back to the agent executor.")
+        if documents:
+            timer.path = EXECUTION_DIRECT
+            timer.retrieval_score = _top_relevance_score(documents)
+            with timer.stage("generate"):
+                prompt = _build_direct_rag_prompt(command.query, documents, history)
+                async for chunk in AI_COMPONENTS["executor_llm"].astream(prompt):
+                    if isinstance(chunk.content, str) and chunk.content:
+                        yield chunk.content
+            return
+        logger.info("Direct RAG retrieved no context; falling back to the agent executor.")
+
+    timer.path = EXECUTION_AGENT
+    agent_executor = AI_COMPONENTS["agent_executor"]
+    with timer.stage("agent"):
+        async for event in agent_executor.astream_events(_agent_input(command.query, history), version="v2"):
+            if event["event"] != "on_chat_model_stream":
+                continue
+            content = event["data"]["chunk"].content
+            if isinstance(content, str) and content:
+                yield content
+
+
+async def astream_query(user_input: str, chat_id: Optional[str] = None) -> AsyncIterator[StreamEvent]:
+    """
+    Streaming end-to-end processing for clients that render partial answers.
+    
+    Yields "token" events while the executor generates the answer, followed by
+    exactly one "final" event once the supervision policy has been applied.
+    
+    Args:
+        user_input (str): The user's natural language query
+        chat_id (Optional[str]): Conversation to remember the exchange in; None for a stateless query
+        
+    Yields:
+        StreamEvent: Token events followed by the final answer
+    """
+    await agent_initializer.aensure_ready()
+
+    async with _get_concurrency_limiter():
+        timer = StageTimer()
+        try:
+            with timer.stage("memory"):
+                history = await asyncio.to_thread(_load_history, chat_id)
+
+            with timer.stage("parse"):
+                routed_command = _route_locally(user_input, history)
+
+            query_embedding = None
+            if config.SEMANTIC_CACHE_ENABLED and not history and _cacheable(routed_command):
+                with timer.stage("cache"):
+                    query_embedding = await AI_COMPONENTS["embeddings"].aembed_query(user_input)
+                    cached_answer = semantic_cache.lookup(query_embedding)
+                if cached_answer is not None:
+                    logger.info(f"Semantic cache hit for query: '{user_input}'")
+                    timer.path = "cache"
+                    _aremember_in_background(chat_id, user_input, cached_answer)
+                    yield StreamEvent("final", cached_answer)
+                    return
+
+            with timer.stage("parse"):
+                parsed_command = routed_command
+                if parsed_command is None:
+                    parsed_command = await aparse_command(user_input, history, route_locally=False)
+
+            pieces = []
+            async for piece in astream_command(parsed_command, timer, history):
+                pieces.append(piece)
+                yield StreamEvent("token", piece)
+            initial_answer = "".join(pieces) or NO_SUMMARY_ANSWER
+
+            with timer.stage("supervise"):
+                final_answer = await asupervise_with_policy(
+                    user_input, parsed_command, initial_answer, timer.retrieval_score
+                )
+
+            if query_embedding is not None and isinstance(parsed_command, SearchKnowledgeBase) and not history:
+                semantic_cache.store(user_input, query_embedding, final_answer)
+
+            _aremember_in_background(chat_id, user_input, final_answer)
+
+            yield StreamEvent("final", final_answer)
+        except Exception as e:
+            logger.error(f"Error processing query: {e}", exc_info=True)
+            yield StreamEvent("final", "I'm sorry, an error occurred while processing your request.")
+        finally:
+            pipeline_metrics.record(timer)
+            logger.info(f"Stage timings: {timer.summary()}")
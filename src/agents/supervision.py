@@ -0,0 +1,179 @@
+"""
+Supervision policy for the Parse-Execute-Supervise pipeline.
+
+Running the supervisor LLM on every answer doubles LLM spend and latency.
+This module decides per request whether the supervisor runs synchronously,
+in the background after the reply has been sent, or not at all, and keeps
+per-mode counters so the savings are visible.
+"""
+
+import json
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+from src.core.config import config
+from src.core.models import SearchKnowledgeBase
+
+logger = logging.getLogger(__name__)
+
+# Supervision modes
+SKIP = "skip"
+SYNC = "sync"
+ASYNC = "async"
+
+# Policies selectable via config.SUPERVISION_POLICY
+POLICY_ALWAYS = "always"
+POLICY_NEVER = "never"
+POLICY_ADAPTIVE = "adaptive"
+
+
+@dataclass
+class SupervisionDecision:
+    """How (and why) a single answer should be supervised."""
+
+    mode: str
+    reason: str
+
+
+class SupervisionPolicy:
+    """
+    Decides how each answer is supervised and tracks per-mode counters.
+
+    Adaptive policy:
+    - Deterministic tools (e.g. get_current_time) are never supervised.
+    - Knowledge base answers with a low retrieval score are supervised synchronously.
+    - A sampled share of the remaining knowledge base answers is supervised in the background.
+    - Everything else is returned without supervision.
+    """
+
+    def __init__(
+        self,
+        policy: Optional[str] = None,
+        sample_rate: Optional[float] = None,
+        score_threshold: Optional[float] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        self.policy = (config.SUPERVISION_POLICY if policy is None else policy).lower()
+        self.sample_rate = config.SUPERVISION_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.score_threshold = config.SUPERVISION_SCORE_THRESHOLD if score_threshold is None else score_threshold
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def needs_retrieval_score(self, command: BaseModel) -> bool:
+        """Whether decide() needs the top retrieval score for this command."""
+        return self.policy == POLICY_ADAPTIVE and isinstance(command, SearchKnowledgeBase)
+
+    def decide(self, command: BaseModel, retrieval_score: Optional[float] = None) -> SupervisionDecision:
+        """
+        Choose the supervision mode for an executed command.
+
+        Args:
+            command (BaseModel): The executed command
+            retrieval_score (Optional[float]): Relevance score of the best retrieved chunk, if known
+
+        Returns:
+            SupervisionDecision: The chosen mode and the reason for it
+        """
+        if self.policy == POLICY_ALWAYS:
+            return SupervisionDecision(SYNC, "always")
+        if self.policy == POLICY_NEVER:
+            return SupervisionDecision(SKIP, "disabled")
+
+        if not isinstance(command, SearchKnowledgeBase):
+            return SupervisionDecision(SKIP, "deterministic_tool")
+        if retrieval_score is not None and retrieval_score < self.score_threshold:
+            return SupervisionDecision(SYNC, "low_retrieval_score")
+        if self._rng.random() < self.sample_rate:
+            return SupervisionDecision(ASYNC, "sampled")
+        return SupervisionDecision(SKIP, "not_sampled")
+
+    def record(self, decision: SupervisionDecision, seconds: float, supervisor_calls: int, background: bool = False) -> None:
+        """
+        Record latency and LLM usage for a supervision decision.
+
+        Args:
+            decision (SupervisionDecision): The decision that was applied
+            seconds (float): Time spent in the supervision stage
+            supervisor_calls (int): Number of supervisor LLM calls made
+            background (bool): Whether the time was spent after the reply was sent
+        """
+        with self._lock:
+            stats = self._stats.setdefault(decision.mode, {
+                "decisions": 0,
+                "supervisor_calls": 0,
+                "inline_seconds": 0.0,
+                "background_seconds": 0.0,
+                "reasons": {},
+            })
+            if background:
+                stats["background_seconds"] += seconds
+                stats["supervisor_calls"] += supervisor_calls
+                return
+            stats["decisions"] += 1
+            stats["supervisor_calls"] += supervisor_calls
+            stats["inline_seconds"] += seconds
+            stats["reasons"][decision.reason] = stats["reasons"].get(decision.reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get per-mode counters.
+
+        Returns:
+            Dict[str, Any]: Counters per mode plus the number of supervisor calls avoided
+        """
+        with self._lock:
+            modes = {mode: dict(values, reasons=dict(values["reasons"])) for mode, values in self._stats.items()}
+        decisions = sum(values["decisions"] for values in modes.values())
+        calls = sum(values["supervisor_calls"] for values in modes.values())
+        return {
+            "policy": self.policy,
+            "modes": modes,
+            "decisions": decisions,
+            "supervisor_calls": calls,
+            "supervisor_calls_saved": max(0, decisions - calls),
+        }
+
+
+class VerdictLog:
+    """Append-only JSONL log of supervisor verdicts for offline review."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = config.SUPERVISION_VERDICT_LOG if path is None else path
+        self._lock = threading.Lock()
+
+    def record(self, query: str, answer: str, feedback: str, reason: str) -> None:
+        """
+        Append a verdict.
+
+        Args:
+            query (str): The user's original question
+            answer (str): The answer that was sent to the user
+            feedback (str): Raw supervisor output ("APPROVED" or a revised answer)
+            reason (str): Why this answer was supervised
+        """
+        approved = feedback.strip().upper() == "APPROVED"
+        entry = {
+            "timestamp": time.time(),
+            "reason": reason,
+            "query": query,
+            "answer": answer,
+            "verdict": "approved" if approved else "revised",
+            "revision": None if approved else feedback,
+        }
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as log_file:
+                log_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error(f"Failed to record supervisor verdict: {e}")
+
+
+# Global supervision policy and verdict log instances
+supervision_policy = SupervisionPolicy()
+verdict_log = VerdictLog()
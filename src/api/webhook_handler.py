@@ -0,0 +1,128 @@
+"""
+ASGI webhook server for the Telegram bot.
+
+Telegram POSTs each update to TELEGRAM_WEBHOOK_PATH; the update is
+authenticated by its secret-token header, decoded and processed by the bot's
+handlers within the request, so concurrent
+updates are handled concurrently and Cloud Run sees (and scales on) the real
+request concurrency instead of a single instance busy with long polling.
+The same server answers the /health, /ready and /metrics probes.
+
+Run with: uvicorn src.api.webhook_handler:app
+"""
+
+import hmac
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+from telegram import Update
+from telegram.ext import Application
+
+from src.agents.main_agent import agent_initializer
+from src.bots.telegram_bot import build_application
+from src.core.config import config
+from src.core.metrics import pipeline_metrics
+from src.core.rate_limiter import rate_limiter
+from src.core.scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def create_app(
+    application: Optional[Application] = None, secret_token: Optional[str] = None, path: Optional[str] = None
+) -> Starlette:
+    """
+    Create the webhook server.
+
+    Args:
+        application (Optional[Application]): Bot application to dispatch updates to;
+                                             defaults to the Telegram bot in webhook mode
+        secret_token (Optional[str]): Expected X-Telegram-Bot-Api-Secret-Token header;
+                                      defaults to config.TELEGRAM_WEBHOOK_SECRET. Without one,
+                                      every update is rejected
+        path (Optional[str]): Path Telegram posts updates to; defaults to config.TELEGRAM_WEBHOOK_PATH
+
+    Returns:
+        Starlette: The ASGI application
+    """
+    if application is None:
+        application = build_application(polling=False)
+    secret_token = config.TELEGRAM_WEBHOOK_SECRET if secret_token is None else secret_token
+    path = "/" + (config.TELEGRAM_WEBHOOK_PATH if path is None else path).lstrip("/")
+    if not secret_token:
+        logger.error("TELEGRAM_WEBHOOK_SECRET is not set; all webhook updates will be rejected")
+    stats = {"updates": 0, "rejected": 0, "in_flight": 0}
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        await application.initialize()
+        await application.start()
+        # Warm the AI components while the first updates arrive, so the first user does not pay for it
+        if config.WARMUP_ON_START:
+            agent_initializer.start_background()
+        logger.info("Telegram webhook server is ready to receive updates")
+        yield
+        await application.stop()
+        await application.shutdown()
+
+    async def telegram_update(request: Request) -> Response:
+        # The secret header proves the sender is Telegram; the path is public and shows up in access logs
+        if not secret_token or not hmac.compare_digest(
+            request.headers.get(SECRET_TOKEN_HEADER, "").encode(), secret_token.encode()
+        ):
+            stats["rejected"] += 1
+            logger.warning("Rejected webhook request with a missing or wrong secret token")
+            return PlainTextResponse("Forbidden", status_code=403)
+
+        try:
+            update = Update.de_json(await request.json(), application.bot)
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Rejected malformed webhook update: {e}")
+            return PlainTextResponse("Bad Request", status_code=400)
+
+        stats["updates"] += 1
+        stats["in_flight"] += 1
+        try:
+            # Handler errors are logged by the application; Telegram must not redeliver the update
+            await application.process_update(update)
+        finally:
+            stats["in_flight"] -= 1
+        return Response(status_code=200)
+
+    async def health(request: Request) -> Response:
+        return PlainTextResponse("OK")
+
+    async def ready(request: Request) -> Response:
+        status = agent_initializer.status()
+        return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+    async def metrics(request: Request) -> Response:
+        return JSONResponse({
+            "webhook": dict(stats),
+            "pipeline": pipeline_metrics.stats(),
+            "scheduler": scheduler.stats(),
+            "initializer": agent_initializer.status(),
+            "rate_limited_users": rate_limiter.tracked_users(),
+        })
+
+    return Starlette(
+        routes=[
+            Route("/health", health, methods=["GET"]),
+            Route("/ready", ready, methods=["GET"]),
+            Route("/metrics", metrics, methods=["GET"]),
+            Route(path, telegram_update, methods=["POST"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+# Global ASGI application instance
+app = create_app()
@@ -0,0 +1,150 @@
+"""
+Progressive message rendering for streamed agent answers.
+
+This module renders a growing answer into one or more Telegram messages
+using throttled edit_message_text calls, so users see the reply while it
+is still being generated instead of waiting for the full pipeline.
+"""
+
+import time
+import asyncio
+import logging
+from typing import List, Optional
+
+from telegram import Bot
+from telegram.error import BadRequest, RetryAfter
+
+from src.core.config import config
+
+logger = logging.getLogger(__name__)
+
+# Shown at the end of the last message while the answer is still streaming
+STREAM_CURSOR = " ▌"
+
+
+def split_for_stream(text: str, max_length: int) -> List[str]:
+    """
+    Split text into message-sized pieces at whitespace where possible.
+
+    Unlike split_long_message, a piece only changes while it is the last one,
+    which keeps already-rendered messages stable as more text streams in.
+
+    Args:
+        text (str): The text to split
+        max_length (int): Maximum length per message
+
+    Returns:
+        List[str]: Message pieces in order
+    """
+    pieces = []
+    while len(text) > max_length:
+        cut = text.rfind(" ", 0, max_length + 1)
+        if cut <= 0:
+            cut = max_length
+        pieces.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text or not pieces:
+        pieces.append(text)
+    return pieces
+
+
+class TelegramStreamWriter:
+    """
+    Renders a streamed answer into Telegram messages.
+
+    Text is appended as tokens arrive and pushed with at most one edit per
+    edit interval. When the text outgrows the message length limit, the
+    writer rolls over into a new message.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        chat_id: int,
+        max_length: int = config.MESSAGE_MAX_LENGTH,
+        edit_interval: float = config.STREAM_EDIT_INTERVAL,
+    ):
+        self.bot = bot
+        self.chat_id = chat_id
+        # Leave room for the streaming cursor
+        self.max_length = max_length - len(STREAM_CURSOR)
+        self.edit_interval = edit_interval
+        self.text = ""
+        self._message_ids: List[int] = []
+        self._rendered: List[str] = []
+        self._last_flush = 0.0
+
+    @property
+    def message_count(self) -> int:
+        """Number of Telegram messages used so far."""
+        return len(self._message_ids)
+
+    async def append(self, text: str) -> None:
+        """
+        Append streamed text, flushing to Telegram if the edit interval has passed.
+
+        Args:
+            text (str): The next piece of the answer
+        """
+        self.text += text
+        if self.text.strip() and time.monotonic() - self._last_flush >= self.edit_interval:
+            await self._flush(streaming=True)
+
+    async def finish(self, final_text: Optional[str] = None) -> None:
+        """
+        Render the complete answer and remove the streaming cursor.
+
+        If the final text differs from what was streamed (e.g. the supervisor
+        revised the answer), the already-sent messages are edited in place.
+
+        Args:
+            final_text (Optional[str]): The final answer, or None to keep the streamed text
+        """
+        if final_text is not None and final_text != self.text:
+            if self.text:
+                logger.info("Replacing streamed answer with the final (supervised) answer")
+            self.text = final_text
+        await self._flush(streaming=False)
+
+    async def _flush(self, streaming: bool) -> None:
+        """Bring the Telegram messages in line with the current text."""
+        pieces = split_for_stream(self.text, self.max_length)
+        if streaming:
+            pieces[-1] = pieces[-1].rstrip() + STREAM_CURSOR
+
+        for index, piece in enumerate(pieces):
+            if not piece.strip():
+                continue
+            if index < len(self._message_ids):
+                if self._rendered[index] != piece:
+                    await self._call(self.bot.edit_message_text, chat_id=self.chat_id,
+                                     message_id=self._message_ids[index], text=piece)
+                    self._rendered[index] = piece
+            else:
+                message = await self._call(self.bot.send_message, chat_id=self.chat_id, text=piece)
+                if message is not None:
+                    self._message_ids.append(message.message_id)
+                    self._rendered.append(piece)
+
+        # A revised final answer may need fewer messages than were streamed
+        while len(self._message_ids) > len(pieces):
+            message_id = self._message_ids.pop()
+            self._rendered.pop()
+            await self._call(self.bot.delete_message, chat_id=self.chat_id, message_id=message_id)
+
+        self._last_flush = time.monotonic()
+
+    async def _call(self, method, **kwargs):
+        """Call a Bot API method, honouring Telegram's flood control."""
+        for _ in range(3):
+            try:
+                return await method(**kwargs)
+            except RetryAfter as e:
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                logger.warning(f"Telegram flood control, retrying in {retry_after}s")
+                await asyncio.sleep(retry_after)
+            except BadRequest as e:
+                if "not modified" in str(e).lower():
+                    return None
+                raise
+        return None
@@ -9,11 +9,15 @@ import os
 import logging
 import asyncio
 from telegram import Update
-from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes
+from telegram.ext import Application, ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes
 
 # Import the agent processing function
-from src.agents.main_agent import process_query
+from src.agents.main_agent import aprocess_query, astream_query
+from src.agents.intent_router import intent_router
+from src.bots.streaming import TelegramStreamWriter
 from src.core.rate_limiter import rate_limiter
+from src.core.scheduler import scheduler, SchedulerBusy, PRIORITY_HIGH, PRIORITY_NORMAL
+from src.core.models import GetCurrentTime
 from src.core.config import config
 
 # --- CONFIGURATION ---
@@ -83,6 +87,25 @@ def split_long_message(text: str, max_length: int = config.MESSAGE_MAX_LENGTH) -
     return chunks
 
 
+def request_priority(text: str) -> int:
+    """
+    Get the scheduling priority of a message.
+    
+    Current-time requests the intent router resolves locally are cheap, so they
+    skip ahead of knowledge base questions in the scheduler queue.
+    
+    Args:
+        text (str): The user's message
+        
+    Returns:
+        int: PRIORITY_HIGH or PRIORITY_NORMAL
+    """
+    match = intent_router.classify(text)
+    if match is not None and isinstance(match.command, GetCurrentTime) and match.confidence >= intent_router.threshold:
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL
+
+
 # --- TELEGRAM BOT HANDLERS ---
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles the /start command."""
@@ -103,8 +126,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"Received message from {user_name} (ID: {user_id}): '{user_message}'")
 
     # Check rate limit
-    if not rate_limiter.is_allowed(user_id):
-        reset_time = rate_limiter.get_reset_time(user_id)
+    allowed, reset_time = rate_limiter.acquire(user_id)
+    if not allowed:
         minutes = int(reset_time // 60)
         seconds = int(reset_time % 60)
         
@@ -121,13 +144,24 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Show a "typing..." action to the user
         await context.bot.send_chat_action(chat_id=chat_id, action="typing")
 
-        # Process the message using the agent executor in a non-blocking way
-        loop = asyncio.get_running_loop()
-        response_text = await loop.run_in_executor(
-            None,  # Use the default thread pool executor
-            process_query,
-            user_message
-        )
+        # Wait for a fair share of the pipeline; overload is answered at once instead of queueing forever
+        async with scheduler.slot(str(user_id), request_priority(user_message)) as waited:
+            if waited > 1.0:
+                logger.info(f"Request from {user_name} waited {waited:.2f}s in the scheduler queue")
+
+            if config.STREAMING_ENABLED:
+                # Stream the answer into progressively edited messages
+                writer = TelegramStreamWriter(context.bot, chat_id)
+                async for event in astream_query(user_message, chat_id=str(chat_id)):
+                    if event.kind == "token":
+                        await writer.append(event.text)
+                    else:
+                        await writer.finish(event.text)
+                logger.info(f"Streamed reply to {user_name} in {writer.message_count} part(s)")
+                return
+
+            # Process the message with the native asyncio pipeline (no thread per request)
+            response_text = await aprocess_query(user_message, chat_id=str(chat_id))
 
         # Split long responses to respect Telegram's message length limit
         message_chunks = split_long_message(response_text)
@@ -140,6 +174,12 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         logger.info(f"Sent reply to {user_name} in {len(message_chunks)} part(s)")
 
+    except SchedulerBusy as e:
+        logger.warning(f"Scheduler busy, turned away {user_name} (ID: {user_id}): {e}")
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text="⏳ I'm handling a lot of requests right now. Please try again in a moment."
+        )
     except Exception as e:
         error_message = f"An error occurred while processing the message: {e}"
         logger.error(error_message, exc_info=True)
@@ -149,15 +189,34 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
 
-def run():
-    """Runs the Telegram bot."""
-    application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+def build_application(polling: bool = True) -> Application:
+    """
+    Build the bot application with its handlers registered.
+    
+    Args:
+        polling (bool): Whether the application fetches updates itself by long polling;
+                        False for webhook mode, where updates are fed in by the web server
+        
+    Returns:
+        Application: The configured (not yet initialized) application
+    """
+    builder = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN)
+    if not polling:
+        builder = builder.updater(None)
+    # Handle updates concurrently so slow LLM calls for one user don't block others
+    application = builder.concurrent_updates(config.AGENT_MAX_CONCURRENCY).build()
     
     start_handler = CommandHandler("start", start)
     message_handler = MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message)
     
     application.add_handler(start_handler)
     application.add_handler(message_handler)
+    return application
+
+
+def run():
+    """Runs the Telegram bot with long polling (local development; Cloud Run uses src.api.webhook_handler)."""
+    application = build_application()
     
     logger.info("Telegram bot is running and polling for updates...")
     application.run_polling()
\ No newline at end of file
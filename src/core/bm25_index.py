@@ -0,0 +1,161 @@
+"""
+BM25 inverted index for lexical retrieval.
+
+The index is built at ingest time from the chunks stored in Chroma and
+persisted next to the vector store, so lexical lookups at query time need
+no tokenization of the corpus and no embedding call.
+"""
+
+import re
+import json
+import math
+import heapq
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+INDEX_FORMAT_VERSION = 1
+
+# Unicode-aware word tokens, so Polish words and code identifiers survive intact
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a text."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 index over a fixed set of chunks.
+
+    Documents are addressed by their position; ids, texts and metadata are
+    kept alongside the postings so results can be returned as Documents
+    without touching the vector store.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        doc_lengths: List[int],
+        postings: Dict[str, List[Tuple[int, int]]],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.doc_lengths = doc_lengths
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self.avg_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+        count = len(ids)
+        self.idf = {
+            term: math.log((count - len(entries) + 0.5) / (len(entries) + 0.5) + 1.0)
+            for term, entries in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids: List[str], texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> "BM25Index":
+        """
+        Build an index from chunk texts.
+
+        Args:
+            ids (List[str]): Chunk IDs
+            texts (List[str]): Chunk texts
+            metadatas (Optional[List[Dict[str, Any]]]): Chunk metadata
+
+        Returns:
+            BM25Index: The built index
+        """
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = []
+        for position, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                postings.setdefault(term, []).append((position, frequency))
+        return cls(list(ids), list(texts), list(metadatas or [{} for _ in texts]), doc_lengths, postings)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """
+        Rank documents for a query.
+
+        Args:
+            query (str): The search query
+            k (int): Number of results
+
+        Returns:
+            List[Tuple[int, float]]: (document position, BM25 score) pairs, best first
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entries = self.postings.get(term)
+            if not entries:
+                continue
+            idf = self.idf[term]
+            for position, frequency in entries:
+                norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[position] / (self.avg_length or 1.0))
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (self.k1 + 1.0) / (frequency + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def term_overlap(self, query: str, position: int, max_document_frequency: float = 0.5) -> float:
+        """
+        Share of the query's informative terms that occur in a document.
+
+        Terms found in more than max_document_frequency of all documents carry
+        no signal and are ignored; terms missing from the corpus count as unmatched.
+
+        Args:
+            query (str): The search query
+            position (int): Document position
+            max_document_frequency (float): Document frequency above which a term is ignored
+
+        Returns:
+            float: Overlap in [0, 1]; 0 if the query has no informative terms
+        """
+        limit = max_document_frequency * len(self.ids)
+        informative = [
+            term for term in set(tokenize(query))
+            if len(self.postings.get(term, ())) <= limit
+        ]
+        if not informative:
+            return 0.0
+        matched = sum(1 for term in informative if any(p == position for p, _ in self.postings.get(term, ())))
+        return matched / len(informative)
+
+    def document(self, position: int) -> Document:
+        """Get the stored chunk at a position as a Document."""
+        return Document(page_content=self.texts[position], metadata=dict(self.metadatas[position]), id=self.ids[position])
+
+    def save(self, path: str) -> None:
+        """Persist the index as JSON."""
+        data = {
+            "version": INDEX_FORMAT_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+        }
+        with open(path, "w", encoding="utf-8") as index_file:
+            json.dump(data, index_file, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load an index persisted with save()."""
+        with open(path, "r", encoding="utf-8") as index_file:
+            data = json.load(index_file)
+        if data.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index version: {data.get('version')}")
+        postings = {term: [tuple(entry) for entry in entries] for term, entries in data["postings"].items()}
+        return cls(data["ids"], data["texts"], data["metadatas"], data["doc_lengths"], postings, data["k1"], data["b"])
@@ -0,0 +1,374 @@
+"""
+Structure-aware, token-sized chunking of knowledge base sections.
+
+Each section of the folder2md dump (one embedded file) is parsed into
+blocks that must not be cut: fenced code blocks, tables, paragraphs and, in
+source files, top-level units (a definition and its indented body).
+Headings start new chunks and are tracked as a breadcrumb ("Setup > Docker")
+stored in the "headings" metadata. Blocks are then packed greedily into
+chunks of at most max_tokens tokens of the configured tiktoken encoding, so
+every retrieved chunk has a predictable prompt cost. Only a block larger
+than a whole chunk is split, along line boundaries, with fences and table
+headers repeated in every piece.
+
+Sections are independent, so split_sections spreads them over a process pool.
+"""
+
+import os
+import re
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import tiktoken
+from langchain_core.documents import Document
+
+from src.core.config import config
+from src.core.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER_ESTIMATE = "estimate"  # characters / 4, needs no tokenizer download
+
+# Sections whose file type is one of these are split as source code, not markdown
+CODE_FILE_TYPES = {
+    "py", "js", "jsx", "ts", "tsx", "java", "kt", "go", "rs", "c", "h", "cpp", "hpp", "cs", "rb",
+    "php", "swift", "scala", "sh", "bash", "ps1", "bat", "sql", "yaml", "yml", "toml", "ini",
+    "json", "xml", "html", "css", "scss", "dockerfile",
+}
+
+HEADINGS_SEPARATOR = " > "
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(`{3,}|~{3,})")
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-{3,}")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_SPACE_RUN = re.compile(r"(?<=\S)[ \t]{2,}")
+
+# Block kinds
+_HEADING_BLOCK = "heading"
+_FENCE_BLOCK = "fence"
+_TABLE_BLOCK = "table"
+_TEXT_BLOCK = "text"
+
+Block = Tuple[Tuple[str, ...], str, str]  # (heading breadcrumb, kind, text)
+TokenCounter = Callable[[str], int]
+
+
+@lru_cache(maxsize=None)
+def resolve_tokenizer(tokenizer: str) -> str:
+    """
+    The tokenizer chunking will actually use.
+
+    tiktoken downloads an encoding on first use; without network access or a
+    cached copy, chunking falls back to the character estimate. Ingest records
+    the resolved name, so a fallback changes the ingest settings instead of
+    silently producing different chunk IDs under the same settings.
+
+    Args:
+        tokenizer (str): tiktoken encoding name (e.g. "cl100k_base") or "estimate"
+
+    Returns:
+        str: The encoding name if it loads, otherwise "estimate"
+    """
+    if tokenizer == TOKENIZER_ESTIMATE:
+        return tokenizer
+    try:
+        tiktoken.get_encoding(tokenizer)
+    except Exception as e:
+        logger.warning(f"Tokenizer '{tokenizer}' unavailable ({e}); estimating tokens from characters")
+        return TOKENIZER_ESTIMATE
+    return tokenizer
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(tokenizer: str) -> TokenCounter:
+    """
+    Token counting function for a tiktoken encoding.
+
+    Unlike resolve_tokenizer this never falls back: chunk boundaries must match
+    the tokenizer recorded for the ingest, also in worker processes.
+
+    Args:
+        tokenizer (str): tiktoken encoding name (e.g. "cl100k_base") or "estimate"
+
+    Returns:
+        TokenCounter: Function returning the number of tokens in a text
+
+    Raises:
+        ValueError: If the encoding is unknown or cannot be loaded
+    """
+    if tokenizer == TOKENIZER_ESTIMATE:
+        return estimate_tokens
+    try:
+        encoding = tiktoken.get_encoding(tokenizer)
+    except Exception as e:
+        raise ValueError(f"Tokenizer '{tokenizer}' could not be loaded: {e}") from e
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _squeeze(line: str) -> str:
+    """Collapse runs of spaces after the indentation (e.g. table cell padding); they render the same."""
+    return _SPACE_RUN.sub(" ", line.rstrip())
+
+
+def _markdown_blocks(text: str) -> List[Block]:
+    """Parse markdown into headings, fenced code blocks, tables and paragraphs."""
+    blocks: List[Block] = []
+    path: List[Tuple[int, str]] = []  # (level, title) of the enclosing headings
+    lines = text.split("\n")
+    paragraph: List[str] = []
+
+    def breadcrumb() -> Tuple[str, ...]:
+        return tuple(title for _, title in path)
+
+    def end_paragraph():
+        if paragraph:
+            blocks.append((breadcrumb(), _TEXT_BLOCK, "\n".join(paragraph)))
+            paragraph.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        fence = _FENCE.match(line)
+        if fence:
+            end_paragraph()
+            marker = fence.group(1)
+            end = i + 1
+            while end < len(lines) and not lines[end].strip().startswith(marker):
+                end += 1
+            # A stray fence marker with nothing inside is not worth a chunk
+            if any(line.strip() for line in lines[i + 1:end]):
+                blocks.append((breadcrumb(), _FENCE_BLOCK, "\n".join(lines[i:end + 1])))
+            i = end + 1
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            end_paragraph()
+            level = len(heading.group(1))
+            while path and path[-1][0] >= level:
+                path.pop()
+            path.append((level, heading.group(2)))
+            blocks.append((breadcrumb(), _HEADING_BLOCK, line))
+        elif line.lstrip().startswith("|"):
+            end_paragraph()
+            end = i
+            while end < len(lines) and lines[end].lstrip().startswith("|"):
+                end += 1
+            blocks.append((breadcrumb(), _TABLE_BLOCK, "\n".join(_squeeze(row) for row in lines[i:end])))
+            i = end
+            continue
+        elif not line.strip():
+            end_paragraph()
+        else:
+            paragraph.append(_squeeze(line))
+        i += 1
+
+    end_paragraph()
+    return blocks
+
+
+def _code_blocks(text: str) -> List[Block]:
+    """Split source code into top-level units: a non-indented line after a blank line starts a new one."""
+    blocks: List[Block] = []
+    unit: List[str] = []
+    previous_blank = False
+    for line in text.split("\n"):
+        starts_unit = previous_blank and line.strip() and not line[0].isspace()
+        if starts_unit and any(existing.strip() for existing in unit):
+            blocks.append(((), _TEXT_BLOCK, "\n".join(unit).strip("\n")))
+            unit = []
+        unit.append(line)
+        previous_blank = not line.strip()
+    if any(line.strip() for line in unit):
+        blocks.append(((), _TEXT_BLOCK, "\n".join(unit).strip("\n")))
+    return blocks
+
+
+def _common_prefix(first: Tuple[str, ...], second: Tuple[str, ...]) -> Tuple[str, ...]:
+    prefix = []
+    for a, b in zip(first, second):
+        if a != b:
+            break
+        prefix.append(a)
+    return tuple(prefix)
+
+
+class MarkdownCodeSplitter:
+    """
+    Splits knowledge base sections into structure-preserving, token-sized chunks.
+
+    Holds only settings, so it can be sent to worker processes.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        min_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        tokenizer: Optional[str] = None,
+    ):
+        self.max_tokens = config.CHUNK_TOKENS if max_tokens is None else max_tokens
+        self.min_tokens = config.CHUNK_MIN_TOKENS if min_tokens is None else min_tokens
+        self.overlap_tokens = config.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        self.tokenizer = resolve_tokenizer(config.CHUNK_TOKENIZER) if tokenizer is None else tokenizer
+
+    def count_tokens(self, text: str) -> int:
+        """Number of tokens in a text."""
+        return get_token_counter(self.tokenizer)(text)
+
+    def split_text(self, text: str, code: bool = False) -> List[Tuple[str, Tuple[str, ...]]]:
+        """
+        Split a text into chunks.
+
+        Args:
+            text (str): Markdown or source code
+            code (bool): Treat the text as source code (no headings, split at top-level units)
+
+        Returns:
+            List[Tuple[str, Tuple[str, ...]]]: (chunk text, heading breadcrumb) pairs
+        """
+        chunks: List[Tuple[str, Tuple[str, ...]]] = []
+        current: List[str] = []
+        current_tokens = 0
+        current_path: Tuple[str, ...] = ()
+
+        def flush():
+            nonlocal current, current_tokens
+            if current:
+                chunks.append(("\n\n".join(current), current_path))
+            current, current_tokens = [], 0
+
+        for path, kind, block in (_code_blocks(text) if code else _markdown_blocks(text)):
+            tokens = self.count_tokens(block)
+            # A heading starts a new chunk, unless the current one is too small to stand alone
+            if kind == _HEADING_BLOCK and current_tokens >= self.min_tokens:
+                flush()
+            if tokens > self.max_tokens:
+                flush()
+                chunks.extend((piece, path) for piece in self._split_block(kind, block))
+                continue
+            if current:
+                # Count the joined text, so the separators are included
+                tokens = self.count_tokens("\n\n".join(current + [block]))
+                if tokens > self.max_tokens:
+                    flush()
+                    tokens = self.count_tokens(block)
+            current_path = _common_prefix(current_path, path) if current else path
+            current.append(block)
+            current_tokens = tokens
+        flush()
+        return chunks
+
+    def _split_block(self, kind: str, block: str) -> List[str]:
+        """Split a block larger than a chunk along line boundaries."""
+        lines = block.split("\n")
+        head: List[str] = []
+        tail: List[str] = []
+        if kind == _FENCE_BLOCK:
+            # Every piece is a complete code block in the same language
+            head = lines[:1]
+            tail = lines[-1:] if len(lines) > 1 and _FENCE.match(lines[-1]) else ["```"]
+            lines = lines[1:-1] if len(lines) > 1 and _FENCE.match(lines[-1]) else lines[1:]
+        elif kind == _TABLE_BLOCK and len(lines) > 2 and _TABLE_SEPARATOR.match(lines[1]):
+            head, lines = lines[:2], lines[2:]
+        # Leave room for the fence or table header and the line breaks around a line
+        budget = max(1, self.max_tokens - self.count_tokens("\n".join(head + ["", ""] + tail)))
+
+        # Lines longer than a whole piece are cut at sentence ends, then by length
+        units: List[str] = []
+        for line in lines:
+            if self.count_tokens(line) <= budget:
+                units.append(line)
+            else:
+                units.extend(self._hard_split(line, budget))
+
+        def render(lines: List[str]) -> str:
+            return "\n".join(head + lines + tail)
+
+        pieces: List[str] = []
+        piece: List[str] = []
+        for unit in units:
+            if piece and self.count_tokens(render(piece + [unit])) > self.max_tokens:
+                pieces.append(render(piece))
+                # Carry the last lines over so a piece does not start without context
+                overlap: List[str] = []
+                for previous in reversed(piece):
+                    if self.count_tokens("\n".join([previous] + overlap)) > self.overlap_tokens:
+                        break
+                    overlap.insert(0, previous)
+                while overlap and self.count_tokens(render(overlap + [unit])) > self.max_tokens:
+                    overlap.pop(0)
+                piece = overlap
+            piece.append(unit)
+        if piece:
+            pieces.append(render(piece))
+        return pieces
+
+    def _hard_split(self, text: str, budget: int) -> List[str]:
+        """Cut a single over-long line into parts of at most `budget` tokens."""
+        parts: List[str] = []
+        for sentence in _SENTENCE_END.split(text):
+            while self.count_tokens(sentence) > budget:
+                # Shrink a character cut proportionally until it fits
+                cut = max(1, len(sentence) * budget // self.count_tokens(sentence))
+                while cut > 1 and self.count_tokens(sentence[:cut]) > budget:
+                    cut = cut * 9 // 10
+                parts.append(sentence[:cut])
+                sentence = sentence[cut:]
+            if parts and self.count_tokens(f"{parts[-1]} {sentence}") <= budget:
+                parts[-1] = f"{parts[-1]} {sentence}"
+            elif sentence:
+                parts.append(sentence)
+        return parts
+
+    def split_document(self, document: Document) -> List[Document]:
+        """
+        Split one knowledge base section.
+
+        Args:
+            document (Document): Section with "section" and "file_type" metadata
+
+        Returns:
+            List[Document]: Chunks with the section's metadata plus "headings" and "tokens"
+        """
+        code = str(document.metadata.get("file_type", "")).lower() in CODE_FILE_TYPES
+        chunks = []
+        for text, path in self.split_text(document.page_content, code=code):
+            metadata = dict(document.metadata)
+            metadata["headings"] = HEADINGS_SEPARATOR.join(path)
+            metadata["tokens"] = self.count_tokens(text)
+            chunks.append(Document(page_content=text, metadata=metadata))
+        return chunks
+
+    def split_sections(self, sections: Iterable[Document], workers: Optional[int] = None) -> Iterator[List[Document]]:
+        """
+        Split sections in a process pool, keeping their order.
+
+        Sections are read from the iterable a window at a time, so a lazy
+        loader is never drained into memory at once.
+
+        Args:
+            sections (Iterable[Document]): Sections to split
+            workers (Optional[int]): Worker processes; 1 splits in this process, 0 uses one per CPU
+
+        Yields:
+            List[Document]: The chunks of each section
+        """
+        workers = config.CHUNK_WORKERS if workers is None else workers
+        workers = workers or os.cpu_count() or 1
+        sections = iter(sections)
+        if workers == 1:
+            for section in sections:
+                yield self.split_document(section)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                batch: Sequence[Document] = list(islice(sections, workers * 8))
+                if not batch:
+                    break
+                yield from pool.map(self.split_document, batch, chunksize=4)
@@ -6,7 +6,7 @@ making it easier to maintain and modify settings without changing code.
 """
 
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 
 class Config:
@@ -26,17 +26,118 @@ class Config:
     # Vector Store Configuration  
     VECTOR_STORE_DIR: str = os.getenv("VECTOR_STORE_DIR", "vector_store")
     RETRIEVAL_K: int = int(os.getenv("RETRIEVAL_K", "5"))
+    # Optional comma-separated list of knowledge base source files to search (empty = all)
+    RETRIEVAL_SECTIONS: List[str] = [s.strip() for s in os.getenv("RETRIEVAL_SECTIONS", "").split(",") if s.strip()]
+    # "mmr" diversifies the results (maximal marginal relevance; in hybrid mode over the fused
+    # BM25 + vector candidates) so near-identical chunks don't fill every slot; "similarity" returns the plain top-k
+    RETRIEVAL_SEARCH_TYPE: str = os.getenv("RETRIEVAL_SEARCH_TYPE", "mmr")
+    MMR_FETCH_K: int = int(os.getenv("MMR_FETCH_K", "20"))  # candidates re-ranked per query (per side in hybrid mode)
+    MMR_LAMBDA: float = float(os.getenv("MMR_LAMBDA", "0.7"))  # 1 = relevance only, 0 = diversity only
+    # Single-file, memory-mapped snapshot of the store, searched in-process instead of through Chroma
+    VECTOR_SNAPSHOT_DIR: str = os.getenv("VECTOR_SNAPSHOT_DIR", VECTOR_STORE_DIR)
+    VECTOR_SNAPSHOT_DTYPE: str = os.getenv("VECTOR_SNAPSHOT_DTYPE", "float16")  # "float16" or "int8"
     
-    # Text Processing
-    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "1000"))
-    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "100"))
+    # Retrieval Backend ("numpy" searches the snapshot, falling back to Chroma without one; "chroma")
+    RETRIEVAL_BACKEND: str = os.getenv("RETRIEVAL_BACKEND", "numpy")
+    VECTOR_INDEX: str = os.getenv("VECTOR_INDEX", "exact")  # "exact", "ivf" or "mmap" (exact, low memory)
+    IVF_LISTS: int = int(os.getenv("IVF_LISTS", "0"))  # 0 = about sqrt(chunks)
+    IVF_PROBES: int = int(os.getenv("IVF_PROBES", "8"))
+    
+    # Knowledge Base Sync with GCS (manifest-diffed, versioned uploads and downloads)
+    GCS_SYNC_WORKERS: int = int(os.getenv("GCS_SYNC_WORKERS", "8"))  # files transferred at once
+    GCS_SYNC_KEEP_VERSIONS: int = int(os.getenv("GCS_SYNC_KEEP_VERSIONS", "3"))  # older versions are deleted
+    
+    # Hybrid Retrieval ("hybrid", "vector" or "lexical")
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "hybrid")
+    BM25_INDEX_FILE: str = os.getenv("BM25_INDEX_FILE", "bm25_index.json")  # stored inside VECTOR_STORE_DIR
+    LEXICAL_ONLY_OVERLAP: float = float(os.getenv("LEXICAL_ONLY_OVERLAP", "1.0"))  # skip embedding above this term overlap
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+    
+    # Text Processing (chunk sizes are in tokens of CHUNK_TOKENIZER, a tiktoken encoding, or "estimate")
+    CHUNK_TOKENS: int = int(os.getenv("CHUNK_TOKENS", "256"))
+    CHUNK_MIN_TOKENS: int = int(os.getenv("CHUNK_MIN_TOKENS", "60"))  # smaller heading sections merge with the next
+    CHUNK_OVERLAP_TOKENS: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))  # only between pieces of an oversized block
+    CHUNK_TOKENIZER: str = os.getenv("CHUNK_TOKENIZER", "cl100k_base")
+    CHUNK_WORKERS: int = int(os.getenv("CHUNK_WORKERS", "0"))  # splitting processes; 0 = one per CPU
+    
+    # Near-Duplicate Removal (ingestion; MinHash over word shingles)
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.8"))  # estimated Jaccard similarity of shingles
+    DEDUP_NUM_PERM: int = int(os.getenv("DEDUP_NUM_PERM", "128"))
+    DEDUP_SHINGLE_SIZE: int = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))  # words per shingle
+    
+    # Embedding Pipeline (ingestion)
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_MAX_CONCURRENCY: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+    EMBEDDING_REQUESTS_PER_MINUTE: float = float(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "300"))
+    EMBEDDING_MAX_RETRIES: int = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+    EMBEDDING_CHECKPOINT_SIZE: int = int(os.getenv("EMBEDDING_CHECKPOINT_SIZE", "1024"))  # chunks per manifest checkpoint
+    
+    # Embedding Cache (shared by ingestion and queries)
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(".cache", "embeddings.sqlite3"))
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+    
+    # Agent Pipeline
+    AGENT_MAX_CONCURRENCY: int = int(os.getenv("AGENT_MAX_CONCURRENCY", "200"))
+    # "direct" = retrieve + one grounded completion, "agent" = tool-calling AgentExecutor
+    EXECUTION_MODE: str = os.getenv("EXECUTION_MODE", "direct")
+    # Initialize AI components in the background at boot instead of on the first request
+    WARMUP_ON_START: bool = os.getenv("WARMUP_ON_START", "true").lower() == "true"
+    
+    # Fair Scheduling (bounded, per-user round-robin queue in front of the agent pipeline)
+    SCHEDULER_CONCURRENCY: int = int(os.getenv("SCHEDULER_CONCURRENCY", "50"))  # queries processed at once
+    SCHEDULER_MAX_QUEUE: int = int(os.getenv("SCHEDULER_MAX_QUEUE", "100"))  # waiting queries before "busy"
+    SCHEDULER_MAX_QUEUE_PER_USER: int = int(os.getenv("SCHEDULER_MAX_QUEUE_PER_USER", "3"))
+    
+    # Conversation Memory ("memory", "sqlite" or "redis" backend)
+    MEMORY_ENABLED: bool = os.getenv("MEMORY_ENABLED", "true").lower() == "true"
+    MEMORY_BACKEND: str = os.getenv("MEMORY_BACKEND", "memory")
+    MEMORY_MAX_TURNS: int = int(os.getenv("MEMORY_MAX_TURNS", "12"))  # user + assistant messages kept verbatim
+    MEMORY_TOKEN_BUDGET: int = int(os.getenv("MEMORY_TOKEN_BUDGET", "800"))  # history tokens added to prompts
+    MEMORY_MAX_CHATS: int = int(os.getenv("MEMORY_MAX_CHATS", "10000"))
+    MEMORY_IDLE_TTL: int = int(os.getenv("MEMORY_IDLE_TTL", "86400"))  # seconds
+    MEMORY_SQLITE_PATH: str = os.getenv("MEMORY_SQLITE_PATH", os.path.join(".cache", "conversations.sqlite3"))
+    MEMORY_REDIS_URL: str = os.getenv("MEMORY_REDIS_URL", "redis://localhost:6379/0")
+    
+    # Prompt Registry (comma-separated name=version pins, e.g. "parser=v1,supervisor=v1"; default = latest)
+    PROMPT_VERSIONS: Dict[str, str] = dict(
+        pin.split("=", 1) for pin in os.getenv("PROMPT_VERSIONS", "").replace(" ", "").split(",") if "=" in pin
+    )
+    
+    # Local Intent Routing (skips the parser LLM for obvious requests)
+    INTENT_ROUTER_ENABLED: bool = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+    INTENT_ROUTER_THRESHOLD: float = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.85"))
+    INTENT_MODEL_PATH: str = os.getenv("INTENT_MODEL_PATH", "")  # optional pickled local classifier
+    
+    # Supervision Policy ("adaptive", "always" or "never")
+    SUPERVISION_POLICY: str = os.getenv("SUPERVISION_POLICY", "adaptive")
+    SUPERVISION_SAMPLE_RATE: float = float(os.getenv("SUPERVISION_SAMPLE_RATE", "0.1"))
+    SUPERVISION_SCORE_THRESHOLD: float = float(os.getenv("SUPERVISION_SCORE_THRESHOLD", "0.5"))
+    SUPERVISION_BACKGROUND_WORKERS: int = int(os.getenv("SUPERVISION_BACKGROUND_WORKERS", "2"))
+    SUPERVISION_VERDICT_LOG: str = os.getenv("SUPERVISION_VERDICT_LOG", "supervision_verdicts.jsonl")
+    
+    # Semantic Answer Cache
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+    SEMANTIC_CACHE_TTL: int = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))  # seconds
     
     # Telegram Configuration
     MESSAGE_MAX_LENGTH: int = int(os.getenv("MESSAGE_MAX_LENGTH", "4096"))
+    STREAMING_ENABLED: bool = os.getenv("STREAMING_ENABLED", "true").lower() == "true"
+    STREAM_EDIT_INTERVAL: float = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))  # seconds between edits
+    # Must match the secret_token passed to setWebhook; without it every webhook update is rejected
+    TELEGRAM_WEBHOOK_SECRET: str = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+    TELEGRAM_WEBHOOK_PATH: str = os.getenv("TELEGRAM_WEBHOOK_PATH", "/telegram")  # not a secret; ends up in access logs
     
     # Rate Limiting (requests per minute per user)
     RATE_LIMIT_PER_USER: int = int(os.getenv("RATE_LIMIT_PER_USER", "10"))
     RATE_LIMIT_WINDOW: int = int(os.getenv("RATE_LIMIT_WINDOW", "60"))  # seconds
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" or "redis" (shared by instances)
+    RATE_LIMIT_REDIS_URL: str = os.getenv("RATE_LIMIT_REDIS_URL", os.getenv("MEMORY_REDIS_URL", "redis://localhost:6379/0"))
+    RATE_LIMIT_SHARDS: int = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+    RATE_LIMIT_SWEEP_INTERVAL: float = float(os.getenv("RATE_LIMIT_SWEEP_INTERVAL", "60"))  # seconds between idle sweeps
     
     # API Timeouts (seconds)
     OPENAI_TIMEOUT: int = int(os.getenv("OPENAI_TIMEOUT", "30"))
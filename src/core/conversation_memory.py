@@ -0,0 +1,392 @@
+"""
+Per-chat conversation memory.
+
+This module keeps a short, bounded history for every chat so follow-up
+questions can be answered in context. Each chat holds a ring buffer of its
+most recent turns plus a running summary of older ones: once the turns exceed
+the token budget, the oldest are folded into the summary, so the context
+added to prompts never grows with the length of the conversation. Idle chats
+are evicted, keeping memory bounded under thousands of active chats.
+
+Storage is pluggable: in-process (default), SQLite, or any Redis-compatible
+server.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.core.config import config
+from src.core.tokens import CHARS_PER_TOKEN, estimate_tokens
+from src.prompts.templates import NO_HISTORY
+
+logger = logging.getLogger(__name__)
+
+# Storage backends selectable via config.MEMORY_BACKEND
+BACKEND_MEMORY = "memory"
+BACKEND_SQLITE = "sqlite"
+BACKEND_REDIS = "redis"
+
+Turn = Tuple[str, str]  # (role, text) with role "user" or "assistant"
+Summarizer = Callable[[str, List[Turn]], str]
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    """Keep at most max_tokens worth of text, preferring the end (the most recent part)."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= max_chars else text[-max_chars:]
+
+
+@dataclass
+class ChatHistory:
+    """The remembered context of one chat: a running summary plus the most recent turns."""
+
+    summary: str = ""
+    turns: Deque[Turn] = field(default_factory=deque)
+
+    def __bool__(self) -> bool:
+        return bool(self.summary or self.turns)
+
+    def tokens(self) -> int:
+        """Approximate token count of the rendered history."""
+        return estimate_tokens(self.summary) + sum(estimate_tokens(text) for _, text in self.turns)
+
+    def render(self) -> str:
+        """Render the history as plain text for prompt templates."""
+        lines = []
+        if self.summary:
+            lines.append(f"Summary of earlier conversation: {self.summary}")
+        lines.extend(f"{'User' if role == 'user' else 'Assistant'}: {text}" for role, text in self.turns)
+        return "\n".join(lines) or NO_HISTORY
+
+    def as_messages(self) -> List[Tuple[str, str]]:
+        """Render the history as (role, content) chat messages."""
+        messages = [("system", f"Summary of earlier conversation: {self.summary}")] if self.summary else []
+        messages.extend(self.turns)
+        return messages
+
+    def to_json(self) -> str:
+        return json.dumps({"summary": self.summary, "turns": list(self.turns)}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, data: str) -> "ChatHistory":
+        raw = json.loads(data)
+        return cls(raw.get("summary", ""), deque(tuple(turn) for turn in raw.get("turns", [])))
+
+
+# --- Storage backends ---
+
+class MemoryBackend(ABC):
+    """Storage for chat histories; implementations must be thread-safe."""
+
+    @abstractmethod
+    def load(self, chat_id: str) -> Optional[ChatHistory]:
+        """Get a chat's history, or None if unknown or expired."""
+
+    @abstractmethod
+    def save(self, chat_id: str, history: ChatHistory) -> None:
+        """Store a chat's history and mark the chat as recently used."""
+
+    @abstractmethod
+    def delete(self, chat_id: str) -> None:
+        """Forget a chat."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored chats."""
+
+
+class InMemoryBackend(MemoryBackend):
+    """Process-local LRU store bounded by chat count and idle time."""
+
+    def __init__(self, max_chats: Optional[int] = None, idle_ttl: Optional[float] = None):
+        self.max_chats = config.MEMORY_MAX_CHATS if max_chats is None else max_chats
+        self.idle_ttl = config.MEMORY_IDLE_TTL if idle_ttl is None else idle_ttl
+        self._lock = threading.Lock()
+        # Ordered from least to most recently used
+        self._chats: "OrderedDict[str, Tuple[float, ChatHistory]]" = OrderedDict()
+        self.evictions = 0
+
+    def load(self, chat_id: str) -> Optional[ChatHistory]:
+        with self._lock:
+            entry = self._chats.get(chat_id)
+            if entry is None:
+                return None
+            used_at, history = entry
+            if time.time() - used_at > self.idle_ttl:
+                del self._chats[chat_id]
+                self.evictions += 1
+                return None
+            return ChatHistory(history.summary, deque(history.turns))
+
+    def save(self, chat_id: str, history: ChatHistory) -> None:
+        now = time.time()
+        with self._lock:
+            self._chats[chat_id] = (now, ChatHistory(history.summary, deque(history.turns)))
+            self._chats.move_to_end(chat_id)
+            # LRU order is also idle order, so expired chats sit at the front
+            while self._chats:
+                oldest_id, (used_at, _) = next(iter(self._chats.items()))
+                if len(self._chats) <= self.max_chats and now - used_at <= self.idle_ttl:
+                    break
+                del self._chats[oldest_id]
+                self.evictions += 1
+
+    def delete(self, chat_id: str) -> None:
+        with self._lock:
+            self._chats.pop(chat_id, None)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._chats)
+
+
+class SQLiteBackend(MemoryBackend):
+    """SQLite store that survives restarts; bounded by chat count and idle time."""
+
+    def __init__(self, path: Optional[str] = None, max_chats: Optional[int] = None, idle_ttl: Optional[float] = None):
+        self.path = config.MEMORY_SQLITE_PATH if path is None else path
+        self.max_chats = config.MEMORY_MAX_CHATS if max_chats is None else max_chats
+        self.idle_ttl = config.MEMORY_IDLE_TTL if idle_ttl is None else idle_ttl
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "chat_id TEXT PRIMARY KEY, history TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_last_used ON conversations(last_used)")
+        self._conn.commit()
+
+    def load(self, chat_id: str) -> Optional[ChatHistory]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT history, last_used FROM conversations WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.idle_ttl:
+            return None
+        return ChatHistory.from_json(row[0])
+
+    def save(self, chat_id: str, history: ChatHistory) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversations (chat_id, history, last_used) VALUES (?, ?, ?)",
+                (chat_id, history.to_json(), now),
+            )
+            self._conn.execute("DELETE FROM conversations WHERE last_used < ?", (now - self.idle_ttl,))
+            overflow = self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0] - self.max_chats
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM conversations WHERE chat_id IN "
+                    "(SELECT chat_id FROM conversations ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,),
+                )
+            self._conn.commit()
+
+    def delete(self, chat_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM conversations WHERE chat_id = ?", (chat_id,))
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class RedisBackend(MemoryBackend):
+    """
+    Store for any Redis-compatible server, shared by all instances of the service.
+
+    Idle chats expire through key TTLs; the total size is bounded by the
+    server's maxmemory policy (e.g. allkeys-lru) rather than by a chat count.
+    """
+
+    def __init__(self, client: Any = None, url: Optional[str] = None, idle_ttl: Optional[float] = None, prefix: str = "chat-memory:"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("MEMORY_BACKEND=redis requires the 'redis' package (pip install redis)") from e
+            client = redis.Redis.from_url(config.MEMORY_REDIS_URL if url is None else url)
+        self.client = client
+        self.idle_ttl = config.MEMORY_IDLE_TTL if idle_ttl is None else idle_ttl
+        self.prefix = prefix
+
+    def load(self, chat_id: str) -> Optional[ChatHistory]:
+        data = self.client.get(self.prefix + chat_id)
+        if data is None:
+            return None
+        return ChatHistory.from_json(data.decode("utf-8") if isinstance(data, bytes) else data)
+
+    def save(self, chat_id: str, history: ChatHistory) -> None:
+        self.client.set(self.prefix + chat_id, history.to_json(), ex=int(self.idle_ttl))
+
+    def delete(self, chat_id: str) -> None:
+        self.client.delete(self.prefix + chat_id)
+
+    def count(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*"))
+
+
+def build_memory_backend(name: Optional[str] = None) -> MemoryBackend:
+    """
+    Create the storage backend selected in the configuration.
+
+    Args:
+        name (Optional[str]): "memory", "sqlite" or "redis"; defaults to config.MEMORY_BACKEND
+
+    Returns:
+        MemoryBackend: The backend
+    """
+    name = config.MEMORY_BACKEND if name is None else name
+    if name == BACKEND_SQLITE:
+        return SQLiteBackend()
+    if name == BACKEND_REDIS:
+        return RedisBackend()
+    if name != BACKEND_MEMORY:
+        logger.warning(f"Unknown MEMORY_BACKEND '{name}'; using in-process memory.")
+    return InMemoryBackend()
+
+
+# --- Conversation memory ---
+
+class ConversationMemory:
+    """
+    Bounded per-chat history with token-budgeted summarization.
+
+    The summarizer, if set, receives the current summary and the turns that
+    no longer fit and returns the new summary; without one, old turns are
+    simply dropped. The backend is created on first use.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[MemoryBackend] = None,
+        max_turns: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        summarizer: Optional[Summarizer] = None,
+    ):
+        self._backend = backend
+        self.max_turns = config.MEMORY_MAX_TURNS if max_turns is None else max_turns
+        self.token_budget = config.MEMORY_TOKEN_BUDGET if token_budget is None else token_budget
+        self.summarizer = summarizer
+        self._lock = threading.Lock()
+        # One lock per chat, so appends for the same chat don't overwrite each other's
+        # load-modify-save; entries disappear once no thread holds the lock
+        self._chat_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+        self._stats = {"appends": 0, "summarizations": 0, "dropped_turns": 0}
+
+    @property
+    def backend(self) -> MemoryBackend:
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = build_memory_backend()
+        return self._backend
+
+    def history(self, chat_id: str) -> ChatHistory:
+        """
+        Get the remembered context of a chat.
+
+        Args:
+            chat_id (str): Chat identifier (Telegram chat ID, WhatsApp sender, ...)
+
+        Returns:
+            ChatHistory: The chat's history; empty for new or expired chats
+        """
+        with self._chat_lock(chat_id):
+            return self.backend.load(chat_id) or ChatHistory()
+
+    def append(self, chat_id: str, user_text: str, assistant_text: str) -> None:
+        """
+        Record one exchange, compacting the history to the turn and token limits.
+
+        Args:
+            chat_id (str): Chat identifier
+            user_text (str): The user's message
+            assistant_text (str): The answer that was sent
+        """
+        with self._chat_lock(chat_id):
+            history = self.backend.load(chat_id) or ChatHistory()
+            # A single huge message must not blow the budget on its own
+            turn_limit = max(1, self.token_budget // 4)
+            history.turns.append(("user", _clip(user_text, turn_limit)))
+            history.turns.append(("assistant", _clip(assistant_text, turn_limit)))
+
+            overflow: List[Turn] = []
+            while history.turns and (
+                len(history.turns) > self.max_turns
+                or (history.tokens() > self.token_budget and len(history.turns) > 2)
+            ):
+                overflow.append(history.turns.popleft())
+
+            if overflow:
+                history.summary = _clip(self._summarize(history.summary, overflow), self.token_budget // 2)
+
+            self.backend.save(chat_id, history)
+        with self._lock:
+            self._stats["appends"] += 1
+
+    def clear(self, chat_id: str) -> None:
+        """Forget a chat's history."""
+        self.backend.delete(chat_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get memory counters.
+
+        Returns:
+            Dict[str, Any]: Append/summarization/dropped-turn counters and the number of stored chats
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        stats["chats"] = self.backend.count()
+        return stats
+
+    def _chat_lock(self, chat_id: str) -> threading.Lock:
+        """Get the lock serializing reads and writes of one chat's history in this process."""
+        with self._lock:
+            lock = self._chat_locks.get(chat_id)
+            if lock is None:
+                lock = self._chat_locks[chat_id] = threading.Lock()
+            return lock
+
+    def _summarize(self, summary: str, overflow: List[Turn]) -> str:
+        """Fold overflowing turns into the summary, keeping the old summary if that fails."""
+        if self.summarizer is None:
+            with self._lock:
+                self._stats["dropped_turns"] += len(overflow)
+            return summary
+        try:
+            new_summary = self.summarizer(summary, overflow)
+        except Exception as e:
+            logger.warning(f"Conversation summarization failed: {e}")
+            with self._lock:
+                self._stats["dropped_turns"] += len(overflow)
+            return summary
+        with self._lock:
+            self._stats["summarizations"] += 1
+        return new_summary.strip()
+
+
+# Global conversation memory instance
+conversation_memory = ConversationMemory()
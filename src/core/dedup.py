@@ -0,0 +1,151 @@
+"""
+Near-duplicate detection for knowledge base chunks.
+
+The folder2md dump concatenates exported research documents that repeat the
+same paragraphs, reference lists and boilerplate with small differences
+(citation markers, whitespace, a changed word). Exact duplicates already
+share a chunk ID; this module catches the near-identical ones.
+
+Each chunk is reduced to word 5-gram shingles of its normalized text and a
+MinHash signature, whose agreement between two chunks estimates the Jaccard
+similarity of their shingle sets. Locality-sensitive hashing over bands of
+the signature finds candidate pairs without comparing every chunk with every
+other one; candidates whose estimated similarity reaches the threshold are
+duplicates. The first chunk seen is kept.
+"""
+
+import re
+import zlib
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.core.config import config
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_CITATION = re.compile(r"\[\^[\w.-]+\]")  # footnote markers such as [^1_1]
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def shingles(text: str, size: int = 5) -> Set[str]:
+    """
+    Word n-grams of a normalized text.
+
+    Case, punctuation, whitespace and footnote markers are ignored. Texts
+    shorter than `size` words become a single shingle.
+
+    Args:
+        text (str): Chunk text
+        size (int): Words per shingle
+
+    Returns:
+        Set[str]: The shingles (empty for texts without words)
+    """
+    words = _NON_WORD.sub(" ", _CITATION.sub(" ", text.lower())).split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def lsh_parameters(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Pick LSH bands and rows per band for a similarity threshold.
+
+    Pairs at similarity (1 / bands) ** (1 / rows) become candidates with
+    probability ~0.5; it is kept a little below the threshold so true
+    duplicates are rarely missed (candidates are verified afterwards).
+
+    Args:
+        num_perm (int): Signature length
+        threshold (float): Jaccard similarity at which chunks count as duplicates
+
+    Returns:
+        Tuple[int, int]: (bands, rows per band)
+    """
+    target = max(threshold - 0.1, 0.05)
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - target))
+
+
+class MinHasher:
+    """Computes MinHash signatures with num_perm universal hash functions."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # 32-bit inputs and coefficients keep a * x + b below 2**64
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, features: Set[str]) -> Optional[np.ndarray]:
+        """MinHash signature of a shingle set, or None if it is empty."""
+        if not features:
+            return None
+        hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature in features), dtype=np.uint64, count=len(features))
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+
+class NearDuplicateIndex:
+    """
+    Incremental near-duplicate detector.
+
+    Chunks are added one by one; add() tells whether a chunk is a near
+    duplicate of one added before.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        num_perm: Optional[int] = None,
+        shingle_size: Optional[int] = None,
+    ):
+        self.threshold = config.DEDUP_THRESHOLD if threshold is None else threshold
+        num_perm = config.DEDUP_NUM_PERM if num_perm is None else num_perm
+        self.shingle_size = config.DEDUP_SHINGLE_SIZE if shingle_size is None else shingle_size
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = lsh_parameters(num_perm, self.threshold)
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self.duplicates: Dict[str, str] = {}  # dropped chunk key -> key of the chunk kept instead
+
+    def add(self, key: str, text: str) -> Optional[str]:
+        """
+        Check a chunk against the chunks added so far and remember it if it is new.
+
+        Args:
+            key (str): Chunk ID
+            text (str): Chunk text
+
+        Returns:
+            Optional[str]: Key of the earlier chunk it duplicates, or None if it is kept
+        """
+        if key in self._signatures or key in self.duplicates:
+            return self.duplicates.get(key)
+        signature = self.hasher.signature(shingles(text, self.shingle_size))
+        if signature is None:
+            return None
+
+        bands = [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        candidates: Set[str] = set()
+        for bucket, band in zip(self._buckets, bands):
+            candidates.update(bucket.get(band, ()))
+        for candidate in sorted(candidates):
+            if float(np.mean(self._signatures[candidate] == signature)) >= self.threshold:
+                self.duplicates[key] = candidate
+                return candidate
+
+        self._signatures[key] = signature
+        for bucket, band in zip(self._buckets, bands):
+            bucket.setdefault(band, []).append(key)
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get dedup counters.
+
+        Returns:
+            Dict[str, int]: Chunks kept and near duplicates dropped
+        """
+        return {"kept": len(self._signatures), "dropped": len(self.duplicates)}
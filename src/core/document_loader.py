@@ -0,0 +1,110 @@
+"""
+Streaming loader for the consolidated knowledge base file.
+
+knowledge_base/wiedza.md is a folder2md dump: a concatenation of
+"## <filename>" sections separated by "---" lines, where each embedded file
+is wrapped in a code fence and skipped binaries are replaced by a
+"Pominięto ten plik" placeholder. This module reads the dump line by line and
+yields one Document per embedded file, so memory use does not grow with the
+size of the knowledge base.
+"""
+
+import os
+import re
+from typing import Iterator, List, Optional
+
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+# Marker folder2md writes in place of files it did not embed (binaries, filtered files)
+PLACEHOLDER_MARKER = "Pominięto ten plik"
+SECTION_SEPARATOR = "---"
+SECTION_PREFIX = "## "
+_FENCE = re.compile(r"^\s*(`{3,}|~{3,})(.*)$")
+
+
+class KnowledgeBaseLoader(BaseLoader):
+    """
+    Lazily yields one Document per embedded file section of a folder2md dump.
+
+    Each document carries the dump path in "source" and the embedded file
+    name in "section" metadata. Placeholder sections are dropped and the code
+    fence wrapping each embedded file is removed.
+    """
+
+    def __init__(self, file_path: str, encoding: str = "utf-8"):
+        self.file_path = file_path
+        self.encoding = encoding
+
+    def lazy_load(self) -> Iterator[Document]:
+        """
+        Stream the sections of the dump.
+
+        Yields:
+            Document: One document per non-placeholder section
+        """
+        section: Optional[str] = None
+        lines: List[str] = []
+        # Lines seen since a "---" separator that may turn out to start a new section
+        pending: List[str] = []
+        # Open code fences. Embedded markdown nests fences inside the one folder2md wraps
+        # around each file: a fence with an info string (```python) opens, a bare one
+        # closes the innermost open fence (or opens one if none is open).
+        fence_depth = 0
+
+        with open(self.file_path, "r", encoding=self.encoding) as dump:
+            for raw_line in dump:
+                line = raw_line.rstrip("\r\n")
+
+                if pending:
+                    if not line.strip():
+                        pending.append(line)
+                        continue
+                    if line.startswith(SECTION_PREFIX):
+                        document = self._make_document(section, lines)
+                        if document is not None:
+                            yield document
+                        section, lines, pending = line[len(SECTION_PREFIX):].strip(), [], []
+                        fence_depth = 0
+                        continue
+                    lines.extend(pending)
+                    pending = []
+
+                # A "---" inside a fence is content of the embedded file, not a separator
+                if line.strip() == SECTION_SEPARATOR and fence_depth == 0:
+                    pending = [line]
+                    continue
+                lines.append(line)
+
+                fence = _FENCE.match(line)
+                if fence:
+                    fence_depth += -1 if fence_depth > 0 and not fence.group(2).strip() else 1
+
+        document = self._make_document(section, lines)
+        if document is not None:
+            yield document
+
+    def _make_document(self, section: Optional[str], lines: List[str]) -> Optional[Document]:
+        """Build a document for a finished section, or None if it should be skipped."""
+        # Text before the first section is only the dump's title
+        if section is None:
+            return None
+
+        while lines and not lines[0].strip():
+            lines.pop(0)
+        while lines and not lines[-1].strip():
+            lines.pop()
+        if not lines or PLACEHOLDER_MARKER in lines[0]:
+            return None
+
+        # Drop the code fence folder2md wraps around each embedded file
+        if lines[0].startswith("```") and len(lines) > 1 and lines[-1].strip() == "```":
+            lines = lines[1:-1]
+
+        content = "\n".join(lines).strip()
+        if not content:
+            return None
+        return Document(
+            page_content=content,
+            metadata={"source": self.file_path, "section": section, "file_type": os.path.splitext(section)[1].lstrip(".")},
+        )
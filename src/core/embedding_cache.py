@@ -0,0 +1,197 @@
+"""
+Persistent on-disk embedding cache.
+
+This module provides a drop-in Embeddings wrapper that stores vectors in a
+SQLite file keyed by (model name, query or document, text hash). Query
+embeddings that were computed before and re-ingested chunks are served from
+disk instead of the remote embedding API. Queries and documents are cached
+separately because models such as Vertex AI embed them differently
+(RETRIEVAL_QUERY vs RETRIEVAL_DOCUMENT). The cache is size-bounded: the least recently used
+vectors are evicted once it holds more than the configured number of entries.
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from src.core.config import config
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+# Kinds of embedding, part of the cache key
+KIND_DOCUMENT = "document"
+KIND_QUERY = "query"
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper backed by a SQLite cache.
+
+    Can be passed as the embedding_function of Chroma or wrapped around the
+    ingestion pipeline; only cache misses reach the underlying embeddings.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.path = config.EMBEDDING_CACHE_PATH if path is None else path
+        self.max_entries = config.EMBEDDING_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts, computing only those not found in the cache.
+
+        Args:
+            texts (List[str]): Texts to embed
+
+        Returns:
+            List[List[float]]: One embedding per text, in input order
+        """
+        keys = [self._key(text, KIND_DOCUMENT) for text in texts]
+        cached = self._get_many(keys)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._put_many(computed)
+            cached.update(computed)
+
+        with self._lock:
+            self._stats["hits"] += len(texts) - len(missing)
+            self._stats["misses"] += len(missing)
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, using the cached vector if available."""
+        key = self._key(text, KIND_QUERY)
+        cached = self._get_many([key])
+        if key in cached:
+            self._count("hits")
+            return list(cached[key])
+
+        vector = self.embeddings.embed_query(text)
+        self._put_many({key: vector})
+        self._count("misses")
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async version of embed_query; SQLite access runs off the event loop."""
+        key = self._key(text, KIND_QUERY)
+        cached = await asyncio.to_thread(self._get_many, [key])
+        if key in cached:
+            self._count("hits")
+            return list(cached[key])
+
+        vector = await self.embeddings.aembed_query(text)
+        await asyncio.to_thread(self._put_many, {key: vector})
+        self._count("misses")
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict[str, Any]: Hit/miss/eviction counters and the number of stored vectors
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats, size=self._size)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
+
+    # --- Internal helpers ---
+
+    def _key(self, text: str, kind: str) -> str:
+        """Cache key for a text embedded as a query or a document under the current model."""
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _get_many(self, keys: List[str]) -> Dict[str, array]:
+        """Fetch cached vectors and refresh their LRU timestamps."""
+        found: Dict[str, array] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique_keys), _SQL_BATCH):
+                batch = unique_keys[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _put_many(self, vectors: Dict[str, List[float]]) -> None:
+        """Store vectors and evict the least recently used ones beyond max_entries."""
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in vectors.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            overflow = self._size - self.max_entries
+            if self.max_entries > 0 and overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self._size -= overflow
+                self._stats["evictions"] += overflow
+            self._conn.commit()
@@ -0,0 +1,165 @@
+"""
+Batched, concurrent embedding pipeline for knowledge base ingestion.
+
+This module wraps an embeddings model with configurable batching, a bounded
+pool of concurrent requests, token-bucket rate limiting and exponential
+backoff, and records throughput metrics. It implements the LangChain
+Embeddings interface, so it can be passed anywhere an embedding function is
+expected (e.g. to Chroma).
+"""
+
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from langchain_core.embeddings import Embeddings
+
+from src.core.config import config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to stay within the embedding API quota.
+
+    Tokens refill continuously at `rate` per second up to `capacity`;
+    acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = max(1.0, capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens from the bucket, waiting until enough are available.
+
+        Args:
+            tokens (float): Number of tokens to take
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class EmbeddingPipeline(Embeddings):
+    """
+    Embeddings wrapper that embeds documents in concurrent, rate-limited batches.
+
+    Batches are retried with exponential backoff and jitter; results are
+    returned in input order.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.embeddings = embeddings
+        self.batch_size = max(1, config.EMBEDDING_BATCH_SIZE if batch_size is None else batch_size)
+        self.max_concurrency = max(1, config.EMBEDDING_MAX_CONCURRENCY if max_concurrency is None else max_concurrency)
+        self.max_retries = config.EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        rpm = config.EMBEDDING_REQUESTS_PER_MINUTE if requests_per_minute is None else requests_per_minute
+        self._bucket = TokenBucket(rate=rpm / 60.0, capacity=self.max_concurrency)
+
+        self._lock = threading.Lock()
+        self._stats = {"chunks": 0, "batches": 0, "retries": 0, "failures": 0, "seconds": 0.0, "throttled_seconds": 0.0}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts in concurrent batches.
+
+        Args:
+            texts (List[str]): Texts to embed
+
+        Returns:
+            List[List[float]]: One embedding per text, in input order
+        """
+        if not texts:
+            return []
+
+        start = time.perf_counter()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+            results = list(executor.map(self._embed_batch, batches))
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats["chunks"] += len(texts)
+            self._stats["batches"] += len(batches)
+            self._stats["seconds"] += elapsed
+        logger.info(f"Embedded {len(texts)} chunks in {len(batches)} batches ({len(texts) / elapsed:.1f} chunks/s)")
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query with rate limiting and retries."""
+        return self._with_retry(lambda: self.embeddings.embed_query(text))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get throughput counters.
+
+        Returns:
+            Dict[str, Any]: Chunk, batch, retry and failure counts plus chunks per second
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        stats["chunks_per_second"] = stats["chunks"] / stats["seconds"] if stats["seconds"] else 0.0
+        return stats
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        """Embed one batch; runs on a pool thread."""
+        return self._with_retry(lambda: self.embeddings.embed_documents(batch))
+
+    def _with_retry(self, call: Callable[[], T]) -> T:
+        """Run a rate-limited API call, retrying failures with exponential backoff and jitter."""
+        for attempt in range(self.max_retries + 1):
+            waited = self._bucket.acquire()
+            if waited:
+                with self._lock:
+                    self._stats["throttled_seconds"] += waited
+            try:
+                return call()
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    with self._lock:
+                        self._stats["failures"] += 1
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+                logger.warning(f"Embedding request failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                with self._lock:
+                    self._stats["retries"] += 1
+                time.sleep(delay)
+        raise RuntimeError("unreachable")
@@ -0,0 +1,390 @@
+"""
+Manifest-based sync of the vector store directory with a GCS bucket.
+
+Layout under the prefix (e.g. "vector_store/"):
+
+    objects/<sha256>                 file contents, content-addressed
+    versions/<version>/manifest.json relative path -> {"sha256", "size"} for one store version
+    CURRENT                          name of the current version
+
+An upload hashes the local files, uploads only the objects the bucket does
+not have yet (concurrently), writes the new version's manifest and only then
+replaces CURRENT. A single-object write is atomic, so readers always see
+either the old or the new complete version, never a partial store. Older
+versions are kept for a while so containers still downloading them are not
+broken, then garbage-collected.
+
+A download reads the same manifest, fetches only the files whose checksum
+differs from the local copy and verifies every file before moving it into
+place, so an interrupted upload or download simply resumes on the next run.
+
+Usage (container startup): python -m src.core.gcs_sync download <bucket> <directory>
+"""
+
+import os
+import sys
+import json
+import time
+import fnmatch
+import hashlib
+import logging
+import argparse
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from google.api_core import exceptions
+from google.cloud import storage
+
+from src.core.config import config
+
+logger = logging.getLogger(__name__)
+
+CURRENT_POINTER = "CURRENT"
+LOCAL_MANIFEST = ".sync_manifest.json"  # what the last download put into the local directory
+_HASH_BLOCK = 1024 * 1024
+
+Manifest = Dict[str, Dict[str, Any]]
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_manifest(directory: str, exclude: Sequence[str] = ()) -> Manifest:
+    """
+    Checksum every file of a directory.
+
+    Args:
+        directory (str): Directory to describe
+        exclude (Sequence[str]): fnmatch patterns of file names to leave out
+
+    Returns:
+        Manifest: Relative path (with "/" separators) -> {"sha256", "size"}
+    """
+    patterns = list(exclude) + [LOCAL_MANIFEST, "*.part", "*.tmp"]
+    manifest: Manifest = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                continue
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, directory).replace("\\", "/")
+            manifest[relative] = {"sha256": file_sha256(path), "size": os.path.getsize(path)}
+    return dict(sorted(manifest.items()))
+
+
+class Bucket(ABC):
+    """The few object-store operations the sync needs."""
+
+    @abstractmethod
+    def list_names(self, prefix: str) -> List[str]:
+        """Names of all objects under a prefix."""
+
+    @abstractmethod
+    def read_text(self, name: str) -> Optional[str]:
+        """Contents of a small object, or None if it does not exist."""
+
+    @abstractmethod
+    def write_text(self, name: str, text: str) -> None:
+        """Create or atomically replace a small object."""
+
+    @abstractmethod
+    def upload_file(self, name: str, path: str) -> None:
+        """Upload a local file as an object."""
+
+    @abstractmethod
+    def download_file(self, name: str, path: str) -> None:
+        """Download an object into a local file."""
+
+    @abstractmethod
+    def delete(self, names: Iterable[str]) -> None:
+        """Delete objects."""
+
+
+class GCSBucket(Bucket):
+    """Bucket backed by Google Cloud Storage."""
+
+    def __init__(self, bucket: storage.Bucket):
+        self.bucket = bucket
+
+    def list_names(self, prefix: str) -> List[str]:
+        return [blob.name for blob in self.bucket.list_blobs(prefix=prefix)]
+
+    def read_text(self, name: str) -> Optional[str]:
+        try:
+            return self.bucket.blob(name).download_as_text()
+        except exceptions.NotFound:
+            return None
+
+    def write_text(self, name: str, text: str) -> None:
+        self.bucket.blob(name).upload_from_string(text, content_type="application/json")
+
+    def upload_file(self, name: str, path: str) -> None:
+        # Large files are sent as resumable uploads by the client library
+        self.bucket.blob(name).upload_from_filename(path)
+
+    def download_file(self, name: str, path: str) -> None:
+        self.bucket.blob(name).download_to_filename(path)
+
+    def delete(self, names: Iterable[str]) -> None:
+        names = list(names)
+        if names:
+            self.bucket.delete_blobs(names)
+
+
+class LocalBucket(Bucket):
+    """Bucket stand-in backed by a local directory, for tests and local runs."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, *name.split("/"))
+
+    def list_names(self, prefix: str) -> List[str]:
+        names = []
+        for root, _, files in os.walk(self.root):
+            for file in files:
+                name = os.path.relpath(os.path.join(root, file), self.root).replace("\\", "/")
+                if name.startswith(prefix) and not name.endswith(".tmp"):
+                    names.append(name)
+        return sorted(names)
+
+    def read_text(self, name: str) -> Optional[str]:
+        try:
+            with open(self._path(name), "r", encoding="utf-8") as source:
+                return source.read()
+        except FileNotFoundError:
+            return None
+
+    def write_text(self, name: str, text: str) -> None:
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as target:
+            target.write(text)
+        os.replace(f"{path}.tmp", path)
+
+    def upload_file(self, name: str, path: str) -> None:
+        target = self._path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(path, "rb") as source, open(f"{target}.tmp", "wb") as destination:
+            for block in iter(lambda: source.read(_HASH_BLOCK), b""):
+                destination.write(block)
+        os.replace(f"{target}.tmp", target)
+
+    def download_file(self, name: str, path: str) -> None:
+        with open(self._path(name), "rb") as source, open(path, "wb") as destination:
+            for block in iter(lambda: source.read(_HASH_BLOCK), b""):
+                destination.write(block)
+
+    def delete(self, names: Iterable[str]) -> None:
+        for name in names:
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+
+
+class StoreSync:
+    """Uploads and downloads versions of a directory under a bucket prefix."""
+
+    def __init__(
+        self,
+        bucket: Bucket,
+        prefix: str,
+        workers: Optional[int] = None,
+        keep_versions: Optional[int] = None,
+    ):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.workers = config.GCS_SYNC_WORKERS if workers is None else workers
+        self.keep_versions = config.GCS_SYNC_KEEP_VERSIONS if keep_versions is None else keep_versions
+
+    def _object(self, sha256: str) -> str:
+        return f"{self.prefix}/objects/{sha256}"
+
+    def _manifest_name(self, version: str) -> str:
+        return f"{self.prefix}/versions/{version}/manifest.json"
+
+    def current_version(self) -> Optional[str]:
+        """Name of the current version, or None if nothing was uploaded yet."""
+        version = self.bucket.read_text(f"{self.prefix}/{CURRENT_POINTER}")
+        return version.strip() if version else None
+
+    def read_manifest(self, version: str) -> Manifest:
+        """Files of a version."""
+        text = self.bucket.read_text(self._manifest_name(version))
+        if text is None:
+            raise FileNotFoundError(f"Manifest of version '{version}' is missing under '{self.prefix}/'")
+        return json.loads(text)["files"]
+
+    def upload(self, directory: str, exclude: Sequence[str] = ()) -> Dict[str, Any]:
+        """
+        Publish a directory as the new current version.
+
+        Args:
+            directory (str): Local directory to upload
+            exclude (Sequence[str]): fnmatch patterns of file names to leave out
+
+        Returns:
+            Dict[str, Any]: The version and how many files and bytes were uploaded or skipped
+        """
+        manifest = build_manifest(directory, exclude)
+        current = self.current_version()
+        if current is not None and self.read_manifest(current) == manifest:
+            logger.info(f"Version '{current}' under '{self.prefix}/' is already up to date")
+            return {"version": current, "uploaded": 0, "skipped": len(manifest), "bytes": 0}
+
+        # Objects of earlier (possibly interrupted) uploads are not sent again
+        stored = {name.rsplit("/", 1)[-1] for name in self.bucket.list_names(f"{self.prefix}/objects/")}
+        missing: Dict[str, str] = {}
+        for relative, entry in manifest.items():
+            if entry["sha256"] not in stored:
+                missing.setdefault(entry["sha256"], relative)
+
+        def upload_one(item):
+            sha256, relative = item
+            self.bucket.upload_file(self._object(sha256), os.path.join(directory, *relative.split("/")))
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            list(pool.map(upload_one, missing.items()))
+        uploaded_bytes = sum(manifest[relative]["size"] for relative in missing.values())
+
+        # Names sort by creation time, which is how collect_garbage finds the newest versions
+        now = time.time()
+        digest = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()
+        version = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))}.{int(now % 1 * 1e6):06d}-{digest[:12]}"
+        self.bucket.write_text(self._manifest_name(version), json.dumps({"version": version, "files": manifest}, indent=2))
+        self.bucket.write_text(f"{self.prefix}/{CURRENT_POINTER}", version)
+        logger.info(f"Published version '{version}' under '{self.prefix}/': {len(missing)} files uploaded "
+                    f"({uploaded_bytes} bytes), {len(manifest) - len(missing)} unchanged")
+
+        self.collect_garbage()
+        return {
+            "version": version,
+            "uploaded": len(missing),
+            "skipped": len(manifest) - len(missing),
+            "bytes": uploaded_bytes,
+        }
+
+    def collect_garbage(self) -> List[str]:
+        """
+        Delete all but the newest keep_versions versions and the objects only they used.
+
+        Returns:
+            List[str]: Names of the deleted objects
+        """
+        current = self.current_version()
+        manifests = [name for name in self.bucket.list_names(f"{self.prefix}/versions/") if name.endswith("/manifest.json")]
+        versions = sorted({name.split("/")[-2] for name in manifests}, reverse=True)
+        kept = set(versions[:max(1, self.keep_versions)])
+        if current:
+            kept.add(current)
+
+        referenced = {entry["sha256"] for version in kept for entry in self.read_manifest(version).values()}
+        obsolete = [self._manifest_name(version) for version in versions if version not in kept]
+        obsolete += [
+            name for name in self.bucket.list_names(f"{self.prefix}/objects/")
+            if name.rsplit("/", 1)[-1] not in referenced
+        ]
+        self.bucket.delete(obsolete)
+        if obsolete:
+            logger.info(f"Deleted {len(obsolete)} objects of old versions under '{self.prefix}/'")
+        return obsolete
+
+    def download(self, directory: str) -> Dict[str, Any]:
+        """
+        Bring a local directory up to the current version.
+
+        Args:
+            directory (str): Local directory (created if needed)
+
+        Returns:
+            Dict[str, Any]: The version and how many files were downloaded, kept or removed
+
+        Raises:
+            FileNotFoundError: If no version was uploaded yet
+            ValueError: If a downloaded file does not match its checksum
+        """
+        version = self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No version has been uploaded under '{self.prefix}/'")
+        manifest = self.read_manifest(version)
+        os.makedirs(directory, exist_ok=True)
+
+        local_manifest_path = os.path.join(directory, LOCAL_MANIFEST)
+        try:
+            with open(local_manifest_path, "r", encoding="utf-8") as source:
+                previous: Manifest = json.load(source)["files"]
+        except (OSError, ValueError, KeyError):
+            previous = {}
+
+        def is_current(relative: str, entry: Dict[str, Any]) -> bool:
+            path = os.path.join(directory, *relative.split("/"))
+            if not os.path.isfile(path) or os.path.getsize(path) != entry["size"]:
+                return False
+            # Trust the record of the last download; hash files it does not vouch for
+            return previous.get(relative) == entry or file_sha256(path) == entry["sha256"]
+
+        def download_one(item):
+            relative, entry = item
+            path = os.path.join(directory, *relative.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.bucket.download_file(self._object(entry["sha256"]), f"{path}.part")
+            if file_sha256(f"{path}.part") != entry["sha256"]:
+                os.remove(f"{path}.part")
+                raise ValueError(f"Checksum mismatch for '{relative}' of version '{version}'")
+            os.replace(f"{path}.part", path)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            fresh = list(pool.map(lambda item: is_current(*item), manifest.items()))
+            stale = [item for item, up_to_date in zip(manifest.items(), fresh) if not up_to_date]
+            list(pool.map(download_one, stale))
+
+        # Remove files of the previous version that the new one dropped (never files we did not put there)
+        removed = [relative for relative in previous if relative not in manifest]
+        for relative in removed:
+            try:
+                os.remove(os.path.join(directory, *relative.split("/")))
+            except FileNotFoundError:
+                pass
+
+        with open(f"{local_manifest_path}.tmp", "w", encoding="utf-8") as target:
+            json.dump({"version": version, "files": manifest}, target)
+        os.replace(f"{local_manifest_path}.tmp", local_manifest_path)
+        logger.info(f"Directory '{directory}' is at version '{version}': {len(stale)} files downloaded, "
+                    f"{len(manifest) - len(stale)} unchanged, {len(removed)} removed")
+        return {"version": version, "downloaded": len(stale), "skipped": len(manifest) - len(stale), "removed": len(removed)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point used by startup.sh."""
+    parser = argparse.ArgumentParser(description="Sync the vector store directory with a GCS bucket.")
+    parser.add_argument("command", choices=["upload", "download"])
+    parser.add_argument("bucket", help="GCS bucket name")
+    parser.add_argument("directory", help="Local directory")
+    parser.add_argument("--prefix", default=None, help="Object prefix (defaults to the directory name)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    bucket = GCSBucket(storage.Client().bucket(args.bucket))
+    sync = StoreSync(bucket, args.prefix or os.path.basename(os.path.normpath(args.directory)))
+    try:
+        if args.command == "upload":
+            sync.upload(args.directory)
+        else:
+            sync.download(args.directory)
+    except (FileNotFoundError, ValueError) as e:
+        logger.error(str(e))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Hybrid lexical + vector retriever.
+
+This module combines the prebuilt BM25 index with the vector store retriever
+using reciprocal-rank fusion. When the best lexical match already covers all
+informative query terms, it answers from the BM25 index alone, which skips
+the query embedding call entirely. Optionally the final results are picked
+from the fused candidates with maximal marginal relevance, so lexical and
+vector near-duplicates do not fill every slot.
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import Field, PrivateAttr
+
+from src.core.bm25_index import BM25Index
+from src.core.vector_index import maximal_marginal_relevance
+from src.core.vector_snapshot import RELEVANCE_SCORE
+
+logger = logging.getLogger(__name__)
+
+# Retrieval modes selectable via config.RETRIEVAL_MODE
+MODE_HYBRID = "hybrid"
+MODE_VECTOR = "vector"
+MODE_LEXICAL = "lexical"
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    """
+    Fuse ranked result lists with reciprocal-rank fusion.
+
+    Documents are identified by their content, so the same chunk coming from
+    BM25 and from the vector store is merged, keeping the highest relevance
+    score any copy carries (BM25 copies carry none).
+
+    Args:
+        rankings (List[List[Document]]): Result lists, best first
+        k (int): Number of fused results
+        rrf_k (int): RRF damping constant
+
+    Returns:
+        List[Document]: Fused results, best first
+    """
+    return [document for document, _ in _fuse(rankings, rrf_k)[:k]]
+
+
+def _fuse(rankings: List[List[Document]], rrf_k: int) -> List[Tuple[Document, float]]:
+    """All fused (document, RRF score) pairs, best first."""
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking):
+            key = document.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            kept = documents.setdefault(key, document)
+            score = document.metadata.get(RELEVANCE_SCORE)
+            if score is not None and score > kept.metadata.get(RELEVANCE_SCORE, float("-inf")):
+                documents[key] = Document(
+                    page_content=kept.page_content, metadata={**kept.metadata, RELEVANCE_SCORE: score}, id=kept.id
+                )
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [(documents[key], scores[key]) for key in ordered]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever fusing BM25 and vector search results.
+
+    Modes:
+    - "hybrid": BM25 + vector results fused with RRF, or BM25 only when the
+      top lexical match covers the query's informative terms
+    - "vector": vector retriever only
+    - "lexical": BM25 only (never embeds the query)
+
+    With mmr_lambda set, the k results are picked from all fused candidates
+    with maximal marginal relevance: relevance is the fused rank, redundancy
+    the cosine similarity of the chunks' stored embeddings, looked up with
+    document_vectors (no embedding calls).
+    """
+
+    vector_retriever: BaseRetriever
+    bm25_index: BM25Index
+    k: int = 5
+    mode: str = MODE_HYBRID
+    lexical_only_overlap: float = 1.0
+    rrf_k: int = 60
+    candidate_multiplier: int = Field(default=2, description="Candidates fetched per side relative to k")
+    mmr_lambda: Optional[float] = Field(default=None, description="Diversify the fused results; None keeps the fused order")
+    fetch_k: int = Field(default=20, description="BM25 candidates fetched for MMR")
+    document_vectors: Optional[Callable[[Sequence[str]], Optional[np.ndarray]]] = None
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _stats: Dict[str, int] = PrivateAttr(default_factory=lambda: {"hybrid": 0, "vector": 0, "lexical": 0})
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        lexical, route = self._lexical_candidates(query)
+        if route == MODE_LEXICAL:
+            return self._select([lexical])
+        vector = self.vector_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        return self._combine(route, lexical, vector)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        lexical, route = self._lexical_candidates(query)
+        if route == MODE_LEXICAL:
+            return self._select([lexical])
+        vector = await self.vector_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+        return self._combine(route, lexical, vector)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get how many queries took each route.
+
+        Returns:
+            Dict[str, int]: Query counts per route ("hybrid", "vector", "lexical")
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _lexical_candidates(self, query: str) -> Tuple[List[Document], str]:
+        """Run BM25 and decide which route the query takes."""
+        if self.mode == MODE_VECTOR:
+            self._count(MODE_VECTOR)
+            return [], MODE_VECTOR
+
+        fetch = self.k * self.candidate_multiplier
+        if self.mmr_lambda is not None:
+            fetch = max(fetch, self.fetch_k)
+        hits = self.bm25_index.search(query, fetch)
+        documents = [self.bm25_index.document(position) for position, _ in hits]
+
+        if self.mode == MODE_LEXICAL or (
+            hits and self.bm25_index.term_overlap(query, hits[0][0]) >= self.lexical_only_overlap
+        ):
+            self._count(MODE_LEXICAL)
+            return documents, MODE_LEXICAL
+
+        self._count(MODE_HYBRID)
+        return documents, MODE_HYBRID
+
+    def _combine(self, route: str, lexical: List[Document], vector: List[Document]) -> List[Document]:
+        if route == MODE_VECTOR or not lexical:
+            return vector[:self.k]
+        return self._select([lexical, vector])
+
+    def _select(self, rankings: List[List[Document]]) -> List[Document]:
+        """Fuse the rankings and keep the top k, or an MMR pick of k when configured."""
+        fused = _fuse(rankings, self.rrf_k)
+        if self.mmr_lambda is None or self.document_vectors is None or len(fused) <= self.k:
+            return [document for document, _ in fused[:self.k]]
+        vectors = self.document_vectors([document.id for document, _ in fused])
+        if vectors is None:
+            logger.warning("Stored embeddings of the fused candidates are unavailable; skipping MMR.")
+            return [document for document, _ in fused[:self.k]]
+        # Min-max scale the fused scores so they weigh like the cosine redundancy
+        scores = np.array([score for _, score in fused], dtype=np.float32)
+        spread = scores.max() - scores.min()
+        relevance = (scores - scores.min()) / spread if spread else np.ones_like(scores)
+        picked = maximal_marginal_relevance(None, vectors, self.k, self.mmr_lambda, relevance=relevance)
+        return [fused[i][0] for i in picked]
+
+    def _count(self, route: str) -> None:
+        with self._lock:
+            self._stats[route] += 1
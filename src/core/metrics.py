@@ -0,0 +1,123 @@
+"""
+Per-stage latency metrics for the agent pipeline.
+
+Each query carries a StageTimer that records how long its pipeline stages
+(cache lookup, parse, retrieve, generate, agent, supervise) took and which
+execution path answered it. Finished timers are aggregated by PipelineMetrics
+over a sliding window, so the latency of the direct RAG path can be compared
+with the tool-calling agent path.
+"""
+
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+
+class StageTimer:
+    """
+    Collects the wall-clock duration of each pipeline stage of one query.
+
+    Also carries what the execution stages learned about the answer for the
+    stages after them: the path that answered it and the relevance score of
+    the best chunk it was grounded in, if retrieval reported one.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.path = "unknown"
+        self.retrieval_score: Optional[float] = None
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time a block of code as a named stage.
+
+        Durations of repeated stages with the same name are added up.
+
+        Args:
+            name (str): Stage name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def total(self) -> float:
+        """Seconds elapsed since the timer was created."""
+        return time.perf_counter() - self._start
+
+    def summary(self) -> str:
+        """One-line, log-friendly rendering of the stage durations."""
+        parts = [f"{name}={seconds:.3f}s" for name, seconds in self.stages.items()]
+        parts.append(f"total={self.total():.3f}s")
+        return f"[{self.path}] " + " ".join(parts)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[int(round(fraction * (len(ordered) - 1)))]
+
+
+class PipelineMetrics:
+    """
+    Thread-safe aggregation of StageTimer results.
+
+    Keeps the last `window` durations of each stage (plus the end-to-end
+    total) and a count of queries per execution path.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._paths: Dict[str, int] = {}
+
+    def record(self, timer: StageTimer) -> None:
+        """
+        Add a finished query's timings.
+
+        Args:
+            timer (StageTimer): The query's timer
+        """
+        durations = dict(timer.stages, total=timer.total())
+        with self._lock:
+            self._paths[timer.path] = self._paths.get(timer.path, 0) + 1
+            for name, seconds in durations.items():
+                self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get latency statistics.
+
+        Returns:
+            Dict[str, Any]: Query counts per path and count/mean/p50/p95/max seconds per stage
+        """
+        with self._lock:
+            paths = dict(self._paths)
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+
+        stages = {
+            name: {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": _percentile(values, 0.5),
+                "p95": _percentile(values, 0.95),
+                "max": values[-1],
+            }
+            for name, values in samples.items()
+        }
+        return {"paths": paths, "stages": stages}
+
+    def clear(self) -> None:
+        """Drop all recorded samples."""
+        with self._lock:
+            self._samples.clear()
+            self._paths.clear()
+
+
+# Global pipeline metrics instance
+pipeline_metrics = PipelineMetrics()
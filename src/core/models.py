@@ -10,6 +10,23 @@ from typing import Literal, Union
 import pytz
 
 
+# Common timezone aliases mapping
+TIMEZONE_ALIASES = {
+    'warsaw': 'Europe/Warsaw',
+    'poland': 'Europe/Warsaw', 
+    'new york': 'America/New_York',
+    'nyc': 'America/New_York',
+    'london': 'Europe/London',
+    'uk': 'Europe/London',
+    'paris': 'Europe/Paris',
+    'berlin': 'Europe/Berlin',
+    'tokyo': 'Asia/Tokyo',
+    'moscow': 'Europe/Moscow',
+    'utc': 'UTC',
+    'gmt': 'UTC',
+}
+
+
 class SearchKnowledgeBase(BaseModel):
     """
     Command model for searching the knowledge base.
@@ -53,26 +70,10 @@ class GetCurrentTime(BaseModel):
             pytz.timezone(v)
             return v
         except pytz.UnknownTimeZoneError:
-            # Common timezone aliases mapping
-            timezone_aliases = {
-                'warsaw': 'Europe/Warsaw',
-                'poland': 'Europe/Warsaw', 
-                'new york': 'America/New_York',
-                'nyc': 'America/New_York',
-                'london': 'Europe/London',
-                'uk': 'Europe/London',
-                'paris': 'Europe/Paris',
-                'berlin': 'Europe/Berlin',
-                'tokyo': 'Asia/Tokyo',
-                'moscow': 'Europe/Moscow',
-                'utc': 'UTC',
-                'gmt': 'UTC',
-            }
-            
             # Try to map common names to proper timezone
             normalized = v.lower().strip()
-            if normalized in timezone_aliases:
-                return timezone_aliases[normalized]
+            if normalized in TIMEZONE_ALIASES:
+                return TIMEZONE_ALIASES[normalized]
             
             # If still not found, fallback to UTC
             return "UTC"
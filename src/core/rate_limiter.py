@@ -1,75 +1,246 @@
 """
-Simple rate limiter for the Telegram bot.
+Rate limiter for the Telegram bot.
 
-This module provides a thread-safe rate limiter to prevent spam
-and ensure fair usage of the AI agent system.
+This module prevents spam and ensures fair usage of the AI agent system with
+the generic cell rate algorithm (GCRA): each user is a single float, the
+"theoretical arrival time" of their next request, instead of a list of
+timestamps. A user whose arrival time has passed is indistinguishable from
+one never seen, so such entries are swept out periodically and memory only
+grows with users active in the current window. State is split across
+independently locked shards, or kept in Redis so limits hold across
+instances of the service.
 """
 
 import time
+import logging
 import threading
-from collections import defaultdict, deque
-from typing import Dict
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
 from src.core.config import config
 
+logger = logging.getLogger(__name__)
+
+BACKEND_MEMORY = "memory"
+BACKEND_REDIS = "redis"
+
+
+class RateLimitBackend(ABC):
+    """Storage of per-user theoretical arrival times."""
+
+    @abstractmethod
+    def acquire(self, key: str, now: float, interval: float, window: float) -> Tuple[bool, float]:
+        """
+        Try to admit one request.
+
+        Args:
+            key (str): User key
+            now (float): Current time in seconds
+            interval (float): Seconds each request "costs" (window / limit)
+            window (float): Rate limit window in seconds (the burst tolerance)
+
+        Returns:
+            Tuple[bool, float]: Whether the request is admitted and, if not, seconds until it would be
+        """
+
+    @abstractmethod
+    def arrival_time(self, key: str) -> Optional[float]:
+        """Get the user's theoretical arrival time, or None if they have no state."""
+
+    def count(self) -> int:
+        """Number of users with state (may be approximate)."""
+        return 0
+
+
+class ShardedMemoryBackend(RateLimitBackend):
+    """In-process store split into independently locked shards, swept of idle users periodically."""
+
+    def __init__(self, shards: Optional[int] = None, sweep_interval: Optional[float] = None):
+        shards = config.RATE_LIMIT_SHARDS if shards is None else shards
+        self.sweep_interval = config.RATE_LIMIT_SWEEP_INTERVAL if sweep_interval is None else sweep_interval
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._shards: List[Dict[str, float]] = [{} for _ in range(shards)]
+        self._swept_at = [time.time()] * shards
+
+    def _shard(self, key: str) -> int:
+        # Shards only live in this process, so the built-in (per-process seeded) hash is stable enough
+        return hash(key) % len(self._shards)
+
+    def acquire(self, key: str, now: float, interval: float, window: float) -> Tuple[bool, float]:
+        index = self._shard(key)
+        with self._locks[index]:
+            shard = self._shards[index]
+            new_tat = max(shard.get(key, now), now) + interval
+            if new_tat - now > window:
+                return False, new_tat - now - window
+            shard[key] = new_tat
+            if now - self._swept_at[index] >= self.sweep_interval:
+                self._sweep(index, now)
+            return True, 0.0
+
+    def _sweep(self, index: int, now: float) -> None:
+        """Drop the shard's users whose arrival time has passed (caller holds the shard lock)."""
+        shard = self._shards[index]
+        for key in [key for key, tat in shard.items() if tat <= now]:
+            del shard[key]
+        self._swept_at[index] = now
+
+    def arrival_time(self, key: str) -> Optional[float]:
+        index = self._shard(key)
+        with self._locks[index]:
+            return self._shards[index].get(key)
+
+    def count(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+# Atomic GCRA step; floats are returned as strings because Redis truncates Lua numbers to integers
+_GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+if tat < now then tat = now end
+local new_tat = tat + interval
+if new_tat - now > window then
+    return {0, tostring(new_tat - now - window)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, '0'}
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Store for any Redis-compatible server, shared by all instances of the service.
+
+    Keys expire when the user's arrival time passes, so idle users need no
+    sweeping. If Redis is unreachable, requests are limited per instance by
+    a local fallback instead of failing.
+    """
+
+    def __init__(self, client: Any = None, url: Optional[str] = None, prefix: str = "rate-limit:"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("RATE_LIMIT_BACKEND=redis requires the 'redis' package (pip install redis)") from e
+            client = redis.Redis.from_url(config.RATE_LIMIT_REDIS_URL if url is None else url)
+        self.client = client
+        self.prefix = prefix
+        self.fallback = ShardedMemoryBackend()
+        self._script = client.register_script(_GCRA_SCRIPT)
+
+    def acquire(self, key: str, now: float, interval: float, window: float) -> Tuple[bool, float]:
+        try:
+            allowed, wait = self._script(keys=[self.prefix + key], args=[now, interval, window])
+        except Exception as e:
+            logger.warning(f"Redis rate limit check failed, limiting locally: {e}")
+            return self.fallback.acquire(key, now, interval, window)
+        return bool(int(allowed)), float(wait)
+
+    def arrival_time(self, key: str) -> Optional[float]:
+        try:
+            value = self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Redis rate limit lookup failed: {e}")
+            return self.fallback.arrival_time(key)
+        return None if value is None else float(value)
+
+
+def build_rate_limit_backend(name: Optional[str] = None) -> RateLimitBackend:
+    """
+    Create the storage backend selected in the configuration.
+
+    Args:
+        name (Optional[str]): "memory" or "redis"; defaults to config.RATE_LIMIT_BACKEND
+
+    Returns:
+        RateLimitBackend: The backend
+    """
+    name = config.RATE_LIMIT_BACKEND if name is None else name
+    if name == BACKEND_REDIS:
+        return RedisBackend()
+    if name != BACKEND_MEMORY:
+        logger.warning(f"Unknown RATE_LIMIT_BACKEND '{name}'; using in-process memory.")
+    return ShardedMemoryBackend()
+
 
 class RateLimiter:
     """
-    Thread-safe rate limiter using sliding window approach.
-    
-    Tracks requests per user ID and enforces limits based on configuration.
+    Thread-safe GCRA rate limiter.
+
+    Allows `limit` requests per `window` seconds per user, as a burst or
+    spread out. The backend is created on first use.
     """
-    
-    def __init__(self):
+
+    def __init__(
+        self,
+        limit: Optional[int] = None,
+        window: Optional[float] = None,
+        backend: Optional[RateLimitBackend] = None,
+    ):
+        self.limit = config.RATE_LIMIT_PER_USER if limit is None else limit
+        self.window = float(config.RATE_LIMIT_WINDOW if window is None else window)
+        self._backend = backend
         self._lock = threading.Lock()
-        self._user_requests: Dict[int, deque] = defaultdict(deque)
-    
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        """The storage backend, created on first use."""
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = build_rate_limit_backend()
+        return self._backend
+
+    @property
+    def interval(self) -> float:
+        """Seconds each request consumes from the window."""
+        return self.window / self.limit
+
+    def acquire(self, user_id: int) -> Tuple[bool, float]:
+        """
+        Check and record a request in one step.
+
+        Args:
+            user_id (int): Telegram user ID
+
+        Returns:
+            Tuple[bool, float]: Whether the request is allowed and, if not, seconds until it would be
+        """
+        return self.backend.acquire(str(user_id), time.time(), self.interval, self.window)
+
     def is_allowed(self, user_id: int) -> bool:
         """
         Check if user is allowed to make a request.
-        
+
         Args:
             user_id (int): Telegram user ID
-            
+
         Returns:
             bool: True if request is allowed, False if rate limited
         """
-        with self._lock:
-            now = time.time()
-            window_start = now - config.RATE_LIMIT_WINDOW
-            
-            # Get user's request history
-            user_queue = self._user_requests[user_id]
-            
-            # Remove old requests outside the time window
-            while user_queue and user_queue[0] < window_start:
-                user_queue.popleft()
-            
-            # Check if under limit
-            if len(user_queue) < config.RATE_LIMIT_PER_USER:
-                user_queue.append(now)
-                return True
-            
-            return False
-    
+        return self.acquire(user_id)[0]
+
     def get_reset_time(self, user_id: int) -> float:
         """
-        Get time until rate limit resets for user.
-        
+        Get time until the user may make another request.
+
         Args:
             user_id (int): Telegram user ID
-            
+
         Returns:
-            float: Seconds until oldest request expires
+            float: Seconds until the next request would be allowed (0 if it would be now)
         """
-        with self._lock:
-            user_queue = self._user_requests[user_id]
-            if not user_queue:
-                return 0.0
-            
-            oldest_request = user_queue[0]
-            reset_time = oldest_request + config.RATE_LIMIT_WINDOW
-            return max(0.0, reset_time - time.time())
+        tat = self.backend.arrival_time(str(user_id))
+        if tat is None:
+            return 0.0
+        return max(0.0, tat + self.interval - self.window - time.time())
+
+    def tracked_users(self) -> int:
+        """Number of users the backend currently keeps state for."""
+        return self.backend.count()
 
 
 # Global rate limiter instance
-rate_limiter = RateLimiter()
\ No newline at end of file
+rate_limiter = RateLimiter()
@@ -0,0 +1,159 @@
+"""
+Fair scheduler in front of the agent pipeline.
+
+Requests wait for one of a fixed number of execution slots in a bounded
+queue. Waiting requests are grouped per user and served round-robin across
+users, so a user with many queued messages cannot starve the others, and
+cheap requests (e.g. current-time lookups) are served before expensive
+ones. When the queue is full, or a user already has too many requests
+waiting, admission fails at once with SchedulerBusy so the bot can answer
+"busy, try again" instead of letting latency grow without bound.
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from src.core.config import config
+from src.core.metrics import _percentile
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+
+class SchedulerBusy(Exception):
+    """Raised when a request cannot be queued because the scheduler is overloaded."""
+
+
+class FairScheduler:
+    """
+    Bounded, per-user round-robin admission control for asyncio tasks.
+
+    Only used from the event loop, so its state needs no lock.
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_queue_per_user: Optional[int] = None,
+        window: int = 1000,
+    ):
+        self.concurrency = config.SCHEDULER_CONCURRENCY if concurrency is None else concurrency
+        self.max_queue = config.SCHEDULER_MAX_QUEUE if max_queue is None else max_queue
+        self.max_queue_per_user = config.SCHEDULER_MAX_QUEUE_PER_USER if max_queue_per_user is None else max_queue_per_user
+        self.running = 0
+        # One round-robin ring per priority: user -> their waiting requests, next user to serve first
+        self._queues: List["OrderedDict[str, Deque[asyncio.Future]]"] = [OrderedDict(), OrderedDict()]
+        self._queued = 0
+        self._waits: Deque[float] = deque(maxlen=window)
+        self._stats = {"admitted": 0, "rejected": 0, "high_priority": 0}
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, priority: int = PRIORITY_NORMAL) -> AsyncIterator[float]:
+        """
+        Wait for an execution slot and hold it for the duration of the block.
+
+        Args:
+            user_id (str): User the request belongs to
+            priority (int): PRIORITY_HIGH for cheap requests, PRIORITY_NORMAL otherwise
+
+        Yields:
+            float: Seconds the request waited in the queue
+
+        Raises:
+            SchedulerBusy: If the queue, or the user's share of it, is full
+        """
+        started = time.perf_counter()
+        if self.running < self.concurrency and self._queued == 0:
+            self.running += 1
+        else:
+            await self._wait_in_queue(user_id, priority)
+
+        waited = time.perf_counter() - started
+        self._waits.append(waited)
+        self._stats["admitted"] += 1
+        if priority == PRIORITY_HIGH:
+            self._stats["high_priority"] += 1
+        try:
+            yield waited
+        finally:
+            self._release()
+
+    async def _wait_in_queue(self, user_id: str, priority: int) -> None:
+        """Queue the request and wait until _release hands it a slot."""
+        ring = self._queues[priority]
+        waiting = ring.get(user_id)
+        user_waiting = sum(len(queue.get(user_id, ())) for queue in self._queues)
+        if self._queued >= self.max_queue or user_waiting >= self.max_queue_per_user:
+            self._stats["rejected"] += 1
+            raise SchedulerBusy(f"{self._queued} requests queued ({user_waiting} from this user)")
+
+        future = asyncio.get_running_loop().create_future()
+        if waiting is None:
+            waiting = ring[user_id] = deque()
+        waiting.append(future)
+        self._queued += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the request was cancelled; pass it on
+                self._release()
+            else:
+                self._remove(ring, user_id, future)
+            raise
+
+    def _remove(self, ring: "OrderedDict[str, Deque[asyncio.Future]]", user_id: str, future: asyncio.Future) -> None:
+        """Drop a cancelled request from the queue (a no-op if _release already skipped it)."""
+        waiting = ring.get(user_id)
+        if waiting is not None and future in waiting:
+            waiting.remove(future)
+            self._queued -= 1
+            if not waiting:
+                del ring[user_id]
+
+    def _release(self) -> None:
+        """Hand the freed slot to the next user in round-robin order, high priority first."""
+        for ring in self._queues:
+            while ring:
+                user_id, waiting = next(iter(ring.items()))
+                future = waiting.popleft()
+                self._queued -= 1
+                # Move the user to the back of the ring, or drop them if nothing else is waiting
+                del ring[user_id]
+                if waiting:
+                    ring[user_id] = waiting
+                if future.done():
+                    # Cancelled, but its task has not run the cleanup in _wait_in_queue yet
+                    continue
+                future.set_result(None)
+                return
+        self.running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get scheduler counters.
+
+        Returns:
+            Dict[str, Any]: Running and queued requests, admission counters and queue wait percentiles
+        """
+        waits = sorted(self._waits)
+        return dict(
+            self._stats,
+            running=self.running,
+            queue_depth=self._queued,
+            queued_users=len(set().union(*self._queues)),
+            wait_p50=_percentile(waits, 0.5) if waits else 0.0,
+            wait_p95=_percentile(waits, 0.95) if waits else 0.0,
+            wait_max=waits[-1] if waits else 0.0,
+        )
+
+
+# Global scheduler instance
+scheduler = FairScheduler()
@@ -0,0 +1,189 @@
+"""
+Semantic answer cache for the agent pipeline.
+
+This module provides a thread-safe cache that matches near-duplicate user
+queries by embedding similarity, so repeated knowledge base questions can be
+answered without running the Parse-Execute-Supervise pipeline again.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.config import config
+
+
+@dataclass
+class CacheEntry:
+    """A single cached answer together with the normalized query embedding."""
+
+    query: str
+    answer: str
+    embedding: np.ndarray
+    created_at: float
+
+
+class SemanticCache:
+    """
+    LRU + TTL cache keyed by query embeddings.
+
+    A lookup returns the cached answer of the most similar stored query when
+    its cosine similarity reaches the configured threshold. All entries are
+    dropped automatically when the vector store or its snapshot on disk changes.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        store_dir: Optional[str] = None,
+        snapshot_dir: Optional[str] = None,
+    ):
+        self.threshold = config.SEMANTIC_CACHE_THRESHOLD if threshold is None else threshold
+        self.max_entries = config.SEMANTIC_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl = config.SEMANTIC_CACHE_TTL if ttl is None else ttl
+        self.store_dir = config.VECTOR_STORE_DIR if store_dir is None else store_dir
+        # Queries are answered from the snapshot, which ingest may write to a directory of its own
+        if snapshot_dir is None:
+            snapshot_dir = config.VECTOR_SNAPSHOT_DIR if store_dir is None else store_dir
+        self.snapshot_dir = snapshot_dir
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._next_key = 0
+        self._store_version = self._read_store_version()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def lookup(self, embedding: Sequence[float]) -> Optional[str]:
+        """
+        Find a cached answer for a query embedding.
+
+        Args:
+            embedding (Sequence[float]): Embedding of the incoming query
+
+        Returns:
+            Optional[str]: The cached answer, or None on a cache miss
+        """
+        query_vector = self._normalize(embedding)
+        with self._lock:
+            self._check_store_version()
+            self._expire(time.time())
+
+            best_key, best_score = None, -1.0
+            for key, entry in self._entries.items():
+                score = float(np.dot(entry.embedding, query_vector))
+                if score > best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None or best_score < self.threshold:
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(best_key)
+            self._stats["hits"] += 1
+            return self._entries[best_key].answer
+
+    def store(self, query: str, embedding: Sequence[float], answer: str) -> None:
+        """
+        Store an answer for a query embedding, evicting the least recently used entry if full.
+
+        Args:
+            query (str): The original user query (kept for debugging)
+            embedding (Sequence[float]): Embedding of the query
+            answer (str): The final answer returned to the user
+        """
+        if self.max_entries <= 0:
+            return
+
+        entry = CacheEntry(query=query, answer=answer, embedding=self._normalize(embedding), created_at=time.time())
+        with self._lock:
+            self._check_store_version()
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict[str, Any]: Hit/miss/eviction counters, current size and hit rate
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    # --- Internal helpers (must be called with the lock held) ---
+
+    def _expire(self, now: float) -> None:
+        """Drop entries older than the TTL. Oldest entries sit at the front."""
+        if self.ttl <= 0:
+            return
+        expired: List[int] = []
+        for key, entry in self._entries.items():
+            if now - entry.created_at > self.ttl:
+                expired.append(key)
+        for key in expired:
+            del self._entries[key]
+        self._stats["expirations"] += len(expired)
+
+    def _check_store_version(self) -> None:
+        """Invalidate the cache when the vector store has been rebuilt."""
+        version = self._read_store_version()
+        if version != self._store_version:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._store_version = version
+
+    def _read_store_version(self) -> Tuple[Optional[Tuple[float, int]], ...]:
+        """
+        Build a cheap fingerprint of the vector store and snapshot directories.
+
+        Returns:
+            Tuple[Optional[Tuple[float, int]], ...]: Newest modification time and entry count of
+                each directory, or None for a missing one
+        """
+        directories = dict.fromkeys([self.store_dir, self.snapshot_dir])
+        return tuple(self._read_directory_version(directory) for directory in directories)
+
+    @staticmethod
+    def _read_directory_version(directory: str) -> Optional[Tuple[float, int]]:
+        """Newest modification time and entry count of a directory, or None if missing."""
+        try:
+            newest = os.stat(directory).st_mtime
+            count = 0
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    newest = max(newest, entry.stat().st_mtime)
+                    count += 1
+            return newest, count
+        except OSError:
+            return None
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 vector."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+# Global semantic cache instance
+semantic_cache = SemanticCache()
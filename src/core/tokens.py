@@ -0,0 +1,14 @@
+"""
+Tokenizer-free token estimates.
+
+Shared by conversation memory budgeting and the chunker's "estimate"
+tokenizer, so neither has to load a tokenizer for a rough count.
+"""
+
+# Rough token estimate; good enough for budgeting without loading a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of tokens in a text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
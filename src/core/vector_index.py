@@ -0,0 +1,306 @@
+"""
+In-process NumPy vector indexes.
+
+Retrieval backends behind SnapshotVectorStore. All of them take L2-normalized
+row vectors, answer cosine top-k queries and accept a batch of queries at
+once, so several queries cost one matrix product instead of several index
+round trips:
+
+- ExactIndex: brute-force search over a contiguous matrix. Exact, and for a
+  knowledge base of a few thousand chunks the fastest option. Over a
+  quantized, memory-mapped matrix ("mmap") it dequantizes block by block, so
+  the matrix is never copied into memory as a whole.
+- IVFIndex: inverted-file index for larger corpora. Rows are clustered with
+  spherical k-means and stored grouped by cluster; a query only scores the
+  rows of the n_probe clusters whose centroids are closest to it, trading a
+  little recall for far fewer dot products.
+"""
+
+import math
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKEND_NUMPY = "numpy"
+BACKEND_CHROMA = "chroma"
+
+INDEX_EXACT = "exact"
+INDEX_IVF = "ivf"
+INDEX_MMAP = "mmap"
+
+_SEARCH_BLOCK_ROWS = 8192  # rows scored at a time, bounding the temporary score and float32 copies
+_KMEANS_SAMPLE_PER_LIST = 256  # training rows per cluster; more barely moves the centroids
+
+Hits = List[Tuple[int, float]]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length (zero rows are left as they are)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def dequantize(vectors: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert a (possibly quantized) matrix to a contiguous float32 copy.
+
+    Args:
+        vectors (np.ndarray): float16, float32 or int8 matrix
+        scales (Optional[np.ndarray]): Per-row scales of an int8 matrix
+
+    Returns:
+        np.ndarray: float32 matrix
+    """
+    matrix = np.array(vectors, dtype=np.float32, order="C")
+    if scales is not None:
+        matrix *= np.asarray(scales, dtype=np.float32)[:, None]
+    return matrix
+
+
+def top_k(scores: np.ndarray, k: int) -> List[Hits]:
+    """
+    Best k entries of each row of a score matrix.
+
+    Args:
+        scores (np.ndarray): Scores, one row per query; -inf marks excluded entries
+        k (int): Number of results per query
+
+    Returns:
+        List[Hits]: (column, score) pairs per query, best first
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return [[] for _ in range(len(scores))]
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    best = np.take_along_axis(best, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    return [
+        [(int(column), float(score)) for column, score in zip(columns, row) if np.isfinite(score)]
+        for columns, row in zip(best, best_scores)
+    ]
+
+
+def maximal_marginal_relevance(
+    query: Optional[np.ndarray],
+    candidates: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+    relevance: Optional[np.ndarray] = None,
+) -> List[int]:
+    """
+    Pick a relevant but diverse subset of candidates.
+
+    Greedily adds the candidate maximizing
+    lambda_mult * sim(query, c) - (1 - lambda_mult) * max sim(c, selected),
+    so near-identical chunks do not fill every slot.
+
+    Args:
+        query (Optional[np.ndarray]): Query embedding; unused when relevance is given
+        candidates (np.ndarray): Candidate embeddings, one row each
+        k (int): Number of candidates to pick
+        lambda_mult (float): 1 ranks by relevance only, 0 by diversity only
+        relevance (Optional[np.ndarray]): Relevance of each candidate in [0, 1] to use instead of
+            its cosine similarity to the query, e.g. a fused lexical + vector ranking
+
+    Returns:
+        List[int]: Picked candidate rows, in selection order
+    """
+    candidates = normalize_rows(candidates)
+    if len(candidates) == 0 or k <= 0:
+        return []
+    if relevance is None:
+        relevance = candidates @ normalize_rows(query)
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarity = candidates @ candidates.T
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return selected
+
+
+class VectorIndex(ABC):
+    """Cosine top-k search over a fixed set of row vectors."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of indexed rows."""
+
+    @abstractmethod
+    def search_batch(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> List[Hits]:
+        """
+        Search for several queries at once.
+
+        Args:
+            queries (np.ndarray): Query embeddings, one row per query (normalized here)
+            k (int): Number of results per query
+            mask (Optional[np.ndarray]): Boolean row mask restricting the candidates
+
+        Returns:
+            List[Hits]: (row, cosine similarity) pairs per query, best first
+        """
+
+    def search(self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> Hits:
+        """Search for a single query; see search_batch."""
+        return self.search_batch(np.asarray(query, dtype=np.float32)[None, :], k, mask)[0]
+
+
+class ExactIndex(VectorIndex):
+    """
+    Brute-force cosine search.
+
+    The matrix may be float32, float16 or int8 with per-row scales; anything
+    but float32 is converted one block at a time, so a memory-mapped,
+    quantized matrix can be searched without loading it.
+    """
+
+    def __init__(self, vectors: np.ndarray, scales: Optional[np.ndarray] = None, block_rows: int = _SEARCH_BLOCK_ROWS):
+        self.vectors = vectors
+        self.scales = scales
+        self.block_rows = block_rows
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def search_batch(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> List[Hits]:
+        queries = normalize_rows(np.atleast_2d(queries))
+        if len(self) == 0 or k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        scores = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start in range(0, len(self), self.block_rows):
+            block = self.vectors[start:start + self.block_rows].astype(np.float32, copy=False)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+        return top_k(scores, k)
+
+
+def spherical_kmeans(matrix: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    Cluster unit vectors by cosine similarity.
+
+    Args:
+        matrix (np.ndarray): Normalized float32 rows
+        n_clusters (int): Number of clusters
+        iterations (int): Lloyd iterations
+        seed (int): Seed for the training sample and initial centroids
+
+    Returns:
+        np.ndarray: Normalized centroids, one row per cluster
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(matrix), n_clusters * _KMEANS_SAMPLE_PER_LIST)
+    sample = matrix[np.sort(rng.choice(len(matrix), sample_size, replace=False))]
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        # Restart empty clusters from random rows
+        empty = np.bincount(assignments, minlength=n_clusters) == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file (coarse-quantized) approximate cosine search.
+
+    Rows are stored in a contiguous float32 matrix ordered by cluster, so each
+    probed cluster is scored with one matrix product over a slice.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        scales: Optional[np.ndarray] = None,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        iterations: int = 10,
+        seed: int = 0,
+    ):
+        matrix = normalize_rows(dequantize(vectors, scales)) if len(vectors) else np.zeros((0, 0), dtype=np.float32)
+        self.n_lists = min(n_lists or max(1, round(math.sqrt(len(matrix)))), max(len(matrix), 1))
+        self.n_probe = max(1, min(n_probe, self.n_lists))
+
+        if len(matrix):
+            self.centroids = spherical_kmeans(matrix, self.n_lists, iterations, seed)
+            assignments = np.concatenate([
+                np.argmax(matrix[start:start + _SEARCH_BLOCK_ROWS] @ self.centroids.T, axis=1)
+                for start in range(0, len(matrix), _SEARCH_BLOCK_ROWS)
+            ])
+        else:
+            self.centroids = np.zeros((1, matrix.shape[1]), dtype=np.float32)
+            assignments = np.zeros(0, dtype=np.int64)
+
+        # Row positions grouped by cluster; bounds[i]:bounds[i + 1] is cluster i's slice
+        self.order = np.argsort(assignments, kind="stable")
+        self.matrix = np.ascontiguousarray(matrix[self.order])
+        self.bounds = np.zeros(self.n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=self.n_lists), out=self.bounds[1:])
+        logger.info(f"Built IVF index over {len(matrix)} rows ({self.n_lists} lists, {self.n_probe} probed per query)")
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def search_batch(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> List[Hits]:
+        queries = normalize_rows(np.atleast_2d(queries))
+        if len(self) == 0 or k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        probed = np.argpartition(-(queries @ self.centroids.T), self.n_probe - 1, axis=1)[:, :self.n_probe]
+        results = []
+        for query, lists in zip(queries, probed):
+            slices = [slice(self.bounds[i], self.bounds[i + 1]) for i in lists]
+            positions = np.concatenate([self.order[rows] for rows in slices])
+            scores = np.concatenate([self.matrix[rows] @ query for rows in slices])
+            if mask is not None:
+                scores[~mask[positions]] = -np.inf
+            results.append([(int(positions[i]), score) for i, score in top_k(scores[None, :], k)[0]])
+        return results
+
+
+def build_vector_index(
+    vectors: np.ndarray,
+    scales: Optional[np.ndarray] = None,
+    kind: str = INDEX_EXACT,
+    n_lists: Optional[int] = None,
+    n_probe: int = 8,
+) -> VectorIndex:
+    """
+    Build a vector index over a (possibly quantized) matrix.
+
+    Args:
+        vectors (np.ndarray): Normalized rows, float32, float16 or int8
+        scales (Optional[np.ndarray]): Per-row scales of an int8 matrix
+        kind (str): "exact" (in-memory float32), "ivf" or "mmap" (exact, searching the matrix in place)
+        n_lists (Optional[int]): IVF clusters; about sqrt(rows) if not set
+        n_probe (int): IVF clusters scored per query
+
+    Returns:
+        VectorIndex: The index
+    """
+    if kind == INDEX_MMAP:
+        return ExactIndex(vectors, scales)
+    if kind == INDEX_EXACT:
+        return ExactIndex(dequantize(vectors, scales))
+    if kind == INDEX_IVF:
+        return IVFIndex(vectors, scales, n_lists=n_lists, n_probe=n_probe)
+    raise ValueError(f"Unknown vector index: {kind}")
@@ -0,0 +1,492 @@
+"""
+Compact binary snapshot of the vector store.
+
+A snapshot is a single file holding the L2-normalized, float16 or int8
+quantized embedding matrix together with the chunk IDs, texts, metadata and
+the BM25 statistics, so the container downloads one object and memory-maps
+it instead of copying and opening the Chroma directory. The file is named
+after the SHA-256 of its payload, so an unchanged snapshot is recognized by
+name alone and never downloaded twice.
+
+Layout (all offsets relative to the start of the payload, 64-byte aligned):
+
+    magic "KBSNAP01" | uint32 header length | JSON header | padding | payload
+
+The header lists each payload region as [offset, length]: "vectors" (rows x dim),
+"scales" (float32 per row, int8 only), "text_offsets" (uint64, rows + 1),
+"texts" (UTF-8), "ids" and "metadatas" (JSON lists) and "bm25" (JSON, optional).
+"""
+
+import os
+import json
+import math
+import mmap
+import struct
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from src.core.bm25_index import BM25Index
+from src.core.vector_index import (
+    INDEX_MMAP, ExactIndex, Hits, VectorIndex, build_vector_index, dequantize, maximal_marginal_relevance,
+)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"KBSNAP01"
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_SUFFIX = ".kbsnap"
+POINTER_FILE = "LATEST_SNAPSHOT"  # name of the current snapshot file, next to it
+DTYPE_FLOAT16 = "float16"
+DTYPE_INT8 = "int8"
+RELEVANCE_SCORE = "relevance_score"  # metadata key holding a retrieved chunk's relevance to the query
+
+_ALIGN = 64
+
+
+def _pad(length: int) -> int:
+    """Bytes needed to align `length` to _ALIGN."""
+    return -length % _ALIGN
+
+
+def quantize(matrix: np.ndarray, dtype: str = DTYPE_FLOAT16) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Normalize rows to unit length and quantize them.
+
+    Args:
+        matrix (np.ndarray): Embeddings, one row per chunk
+        dtype (str): "float16" or "int8" (symmetric, one float32 scale per row)
+
+    Returns:
+        Tuple[np.ndarray, Optional[np.ndarray]]: Quantized matrix and per-row scales (int8 only)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix / np.where(norms == 0, 1.0, norms)
+    if dtype == DTYPE_FLOAT16:
+        return matrix.astype(np.float16), None
+    if dtype == DTYPE_INT8:
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+        return np.round(matrix / scales[:, None]).astype(np.int8), scales
+    raise ValueError(f"Unsupported snapshot dtype: {dtype}")
+
+
+def write_snapshot(
+    directory: str,
+    ids: Sequence[str],
+    texts: Sequence[str],
+    metadatas: Sequence[Dict[str, Any]],
+    embeddings: Any,
+    dtype: str = DTYPE_FLOAT16,
+    bm25_index: Optional[BM25Index] = None,
+    model: str = "",
+) -> str:
+    """
+    Write a snapshot into a directory and point the directory's pointer file at it.
+
+    Args:
+        directory (str): Destination directory
+        ids (Sequence[str]): Chunk IDs
+        texts (Sequence[str]): Chunk texts
+        metadatas (Sequence[Dict[str, Any]]): Chunk metadata
+        embeddings (Any): Embedding matrix (rows x dim), e.g. a list of lists
+        dtype (str): "float16" or "int8"
+        bm25_index (Optional[BM25Index]): Lexical index over the same chunks, stored without its texts
+        model (str): Name of the embedding model, recorded in the header
+
+    Returns:
+        str: Path of the written snapshot file
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(ids), -1) if len(ids) else matrix.reshape(0, 0)
+    vectors, scales = quantize(matrix, dtype)
+
+    encoded = [text.encode("utf-8") for text in texts]
+    text_offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(text) for text in encoded], out=text_offsets[1:])
+
+    regions: Dict[str, bytes] = {
+        "vectors": vectors.tobytes(),
+        "text_offsets": text_offsets.tobytes(),
+        "texts": b"".join(encoded),
+        "ids": json.dumps(list(ids)).encode("utf-8"),
+        "metadatas": json.dumps([dict(metadata or {}) for metadata in metadatas], ensure_ascii=False).encode("utf-8"),
+    }
+    if scales is not None:
+        regions["scales"] = scales.tobytes()
+    if bm25_index is not None:
+        regions["bm25"] = json.dumps({
+            "k1": bm25_index.k1,
+            "b": bm25_index.b,
+            "doc_lengths": bm25_index.doc_lengths,
+            "postings": bm25_index.postings,
+        }, ensure_ascii=False).encode("utf-8")
+
+    # Lay out the payload and hash it; the hash names the file
+    payload: List[bytes] = []
+    layout: Dict[str, List[int]] = {}
+    offset = 0
+    digest = hashlib.sha256()
+    for name, data in regions.items():
+        layout[name] = [offset, len(data)]
+        padded = data + b"\0" * _pad(len(data))
+        payload.append(padded)
+        digest.update(padded)
+        offset += len(padded)
+    content_hash = digest.hexdigest()
+
+    header = json.dumps({
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "rows": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "dtype": dtype,
+        "model": model,
+        "sha256": content_hash,
+        "regions": layout,
+    }).encode("utf-8")
+    prefix = SNAPSHOT_MAGIC + struct.pack("<I", len(header)) + header
+    prefix += b"\0" * _pad(len(prefix))
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, content_hash[:16] + SNAPSHOT_SUFFIX)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as snapshot_file:
+        snapshot_file.write(prefix)
+        for data in payload:
+            snapshot_file.write(data)
+    os.replace(tmp_path, path)
+
+    pointer_path = os.path.join(directory, POINTER_FILE)
+    with open(f"{pointer_path}.tmp", "w", encoding="utf-8") as pointer_file:
+        pointer_file.write(os.path.basename(path))
+    os.replace(f"{pointer_path}.tmp", pointer_path)
+
+    # Keep only the current snapshot
+    for name in os.listdir(directory):
+        if name.endswith(SNAPSHOT_SUFFIX) and name != os.path.basename(path):
+            os.remove(os.path.join(directory, name))
+    logger.info(f"Wrote {dtype} snapshot of {len(ids)} chunks to '{path}' ({len(prefix) + offset} bytes)")
+    return path
+
+
+def resolve_snapshot_path(directory: str) -> Optional[str]:
+    """
+    Find the current snapshot in a directory.
+
+    Args:
+        directory (str): Directory holding snapshots and the pointer file
+
+    Returns:
+        Optional[str]: Path of the current snapshot, or None if there is none
+    """
+    try:
+        with open(os.path.join(directory, POINTER_FILE), "r", encoding="utf-8") as pointer_file:
+            name = pointer_file.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(directory, name)
+    return path if name and os.path.exists(path) else None
+
+
+class VectorSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+
+    The embedding matrix and texts are never copied into memory as a whole;
+    pages are read on demand by the OS and shared between processes.
+    """
+
+    def __init__(self, path: str, verify: bool = False):
+        self.path = path
+        with open(path, "rb") as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"'{path}' is not a knowledge base snapshot")
+        (header_length,) = struct.unpack_from("<I", self._mmap, len(SNAPSHOT_MAGIC))
+        header_start = len(SNAPSHOT_MAGIC) + 4
+        header = json.loads(self._mmap[header_start:header_start + header_length])
+        if header.get("version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {header.get('version')}")
+
+        self.rows: int = header["rows"]
+        self.dim: int = header["dim"]
+        self.dtype: str = header["dtype"]
+        self.model: str = header["model"]
+        self.content_hash: str = header["sha256"]
+        self._data_start = header_start + header_length + _pad(header_start + header_length)
+        self._regions: Dict[str, List[int]] = header["regions"]
+
+        if verify:
+            digest = hashlib.sha256(memoryview(self._mmap)[self._data_start:])
+            if digest.hexdigest() != self.content_hash:
+                raise ValueError(f"Snapshot '{path}' is corrupt (content hash mismatch)")
+
+        self.vectors = self._array("vectors", np.int8 if self.dtype == DTYPE_INT8 else np.float16)
+        self.vectors = self.vectors.reshape(self.rows, self.dim)
+        self.scales = self._array("scales", np.float32) if "scales" in self._regions else None
+        self._text_offsets = self._array("text_offsets", np.uint64)
+        self.ids: List[str] = json.loads(self._bytes("ids"))
+        self.metadatas: List[Dict[str, Any]] = json.loads(self._bytes("metadatas"))
+
+    def _array(self, region: str, dtype: Any) -> np.ndarray:
+        """Zero-copy NumPy view of a payload region."""
+        offset, length = self._regions[region]
+        return np.frombuffer(self._mmap, dtype=dtype, count=length // np.dtype(dtype).itemsize,
+                             offset=self._data_start + offset)
+
+    def _bytes(self, region: str) -> bytes:
+        offset, length = self._regions[region]
+        return self._mmap[self._data_start + offset:self._data_start + offset + length]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def text(self, position: int) -> str:
+        """Get the text of the chunk at a position."""
+        start = self._data_start + self._regions["texts"][0]
+        begin, end = int(self._text_offsets[position]), int(self._text_offsets[position + 1])
+        return self._mmap[start + begin:start + end].decode("utf-8")
+
+    def document(self, position: int) -> Document:
+        """Get the chunk at a position as a Document."""
+        return Document(page_content=self.text(position), metadata=dict(self.metadatas[position]), id=self.ids[position])
+
+    def bm25_index(self) -> Optional[BM25Index]:
+        """Rebuild the stored BM25 index around the snapshot's chunks, or None if none was stored."""
+        if "bm25" not in self._regions:
+            return None
+        data = json.loads(self._bytes("bm25"))
+        postings = {term: [tuple(entry) for entry in entries] for term, entries in data["postings"].items()}
+        texts = [self.text(position) for position in range(self.rows)]
+        return BM25Index(self.ids, texts, self.metadatas, data["doc_lengths"], postings, data["k1"], data["b"])
+
+    def search(self, query: Sequence[float], k: int, mask: Optional[np.ndarray] = None) -> Hits:
+        """
+        Exact cosine similarity search over the mapped matrix.
+
+        Args:
+            query (Sequence[float]): Query embedding
+            k (int): Number of results
+            mask (Optional[np.ndarray]): Boolean row mask restricting the candidates
+
+        Returns:
+            Hits: (position, cosine similarity) pairs, best first
+        """
+        return ExactIndex(self.vectors, self.scales).search(np.asarray(query, dtype=np.float32), k, mask)
+
+    def close(self) -> None:
+        """Release the memory map (views handed out before must no longer be used)."""
+        self.vectors = self.scales = self._text_offsets = None
+        self._mmap.close()
+
+
+def _metadata_mask(metadatas: List[Dict[str, Any]], where: Dict[str, Any]) -> np.ndarray:
+    """Row mask for a Chroma-style equality / "$in" metadata filter."""
+    def matches(metadata: Dict[str, Any]) -> bool:
+        for key, condition in where.items():
+            if isinstance(condition, dict) and "$in" in condition:
+                if metadata.get(key) not in condition["$in"]:
+                    return False
+            elif metadata.get(key) != condition:
+                return False
+        return True
+
+    return np.fromiter((matches(metadata) for metadata in metadatas), dtype=bool, count=len(metadatas))
+
+
+class SnapshotVectorStore(VectorStore):
+    """
+    Read-only LangChain vector store over a VectorSnapshot.
+
+    A drop-in replacement for the Chroma store at query time: as_retriever()
+    (also with search_type="mmr") and the relevance-score searches behave the
+    same, including the {"section": {"$in": [...]}} filter. Searches go
+    through a VectorIndex built over the snapshot's matrix (see
+    src.core.vector_index). Retrieved documents carry their relevance score
+    in metadata[RELEVANCE_SCORE], so callers need no second scored search.
+    """
+
+    def __init__(self, snapshot: VectorSnapshot, embedding: Embeddings, index: Optional[VectorIndex] = None):
+        self.snapshot = snapshot
+        self.index = index if index is not None else ExactIndex(snapshot.vectors, snapshot.scales)
+        self._embedding = embedding
+        self._masks: Dict[str, np.ndarray] = {}
+        self._positions: Optional[Dict[str, int]] = None
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        embedding: Embeddings,
+        verify: bool = False,
+        index: str = INDEX_MMAP,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+    ) -> "SnapshotVectorStore":
+        """
+        Memory-map a snapshot file and index its matrix.
+
+        Args:
+            path (str): Snapshot file
+            embedding (Embeddings): Embeddings used for queries
+            verify (bool): Check the content hash before use
+            index (str): "mmap", "exact" or "ivf"; see build_vector_index
+            n_lists (Optional[int]): IVF clusters
+            n_probe (int): IVF clusters scored per query
+
+        Returns:
+            SnapshotVectorStore: The store
+        """
+        snapshot = VectorSnapshot(path, verify=verify)
+        return cls(snapshot, embedding, build_vector_index(snapshot.vectors, snapshot.scales, index, n_lists, n_probe))
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("Snapshots are read-only; re-run ingest.py to update the knowledge base")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, **kwargs: Any):
+        raise NotImplementedError("Snapshots are written by ingest.py; use SnapshotVectorStore.load()")
+
+    def document_vectors(self, ids: Sequence[str]) -> Optional[np.ndarray]:
+        """
+        Stored embeddings of chunks, e.g. to diversify results found by BM25.
+
+        Args:
+            ids (Sequence[str]): Chunk ids
+
+        Returns:
+            Optional[np.ndarray]: float32 matrix, one row per id, or None if an id is not in the snapshot
+        """
+        if self._positions is None:
+            self._positions = {chunk_id: position for position, chunk_id in enumerate(self.snapshot.ids)}
+        if any(chunk_id not in self._positions for chunk_id in ids):
+            return None
+        positions = np.array([self._positions[chunk_id] for chunk_id in ids], dtype=np.int64)
+        scales = self.snapshot.scales[positions] if self.snapshot.scales is not None else None
+        return dequantize(self.snapshot.vectors[positions], scales)
+
+    def _mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Cached row mask for a metadata filter."""
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True)
+        if key not in self._masks:
+            self._masks[key] = _metadata_mask(self.snapshot.metadatas, where)
+        return self._masks[key]
+
+    def _scored_document(self, position: int, score: float) -> Document:
+        """The chunk at a position, with its relevance score for the query in the metadata."""
+        document = self.snapshot.document(position)
+        document.metadata[RELEVANCE_SCORE] = float(self._select_relevance_score_fn()(score))
+        return document
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """Search by embedding; scores are cosine similarities."""
+        hits = self.index.search(np.asarray(embedding, dtype=np.float32), k, self._mask(filter))
+        return [(self._scored_document(position, score), score) for position, score in hits]
+
+    def similarity_search_batch_by_vector_with_score(
+        self, embeddings: Sequence[Sequence[float]], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Search for several query embeddings with one index pass.
+
+        Args:
+            embeddings (Sequence[Sequence[float]]): Query embeddings
+            k (int): Number of results per query
+            filter (Optional[Dict[str, Any]]): Metadata filter applied to every query
+
+        Returns:
+            List[List[Tuple[Document, float]]]: (document, cosine similarity) pairs per query, best first
+        """
+        if not len(embeddings):
+            return []
+        hits = self.index.search_batch(np.asarray(embeddings, dtype=np.float32), k, self._mask(filter))
+        return [[(self._scored_document(position, score), score) for position, score in query_hits] for query_hits in hits]
+
+    def similarity_search_batch_with_score(
+        self, queries: Sequence[str], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """Embed several queries and search for them with one index pass."""
+        embeddings = [self._embedding.embed_query(query) for query in queries]
+        return self.similarity_search_batch_by_vector_with_score(embeddings, k, filter)
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [document for document, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """
+        Diversified search: fetch_k nearest chunks, re-ranked with maximal marginal relevance.
+
+        Args:
+            embedding (List[float]): Query embedding
+            k (int): Number of results
+            fetch_k (int): Candidates fetched from the index
+            lambda_mult (float): 1 ranks by relevance only, 0 by diversity only
+            filter (Optional[Dict[str, Any]]): Metadata filter
+
+        Returns:
+            List[Document]: Selected documents
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        hits = self.index.search(query, max(fetch_k, k), self._mask(filter))
+        if not hits:
+            return []
+        positions = np.array([position for position, _ in hits])
+        scales = self.snapshot.scales[positions] if self.snapshot.scales is not None else None
+        candidates = dequantize(self.snapshot.vectors[positions], scales)
+        picked = maximal_marginal_relevance(query, candidates, k, lambda_mult)
+        return [self._scored_document(int(positions[i]), hits[i][1]) for i in picked]
+
+    def max_marginal_relevance_search(
+        self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self._embedding.embed_query(query), k, fetch_k, lambda_mult, filter
+        )
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Chroma reports the squared L2 distance (2 - 2 * cosine for unit vectors), which LangChain
+        # maps through its euclidean relevance function; matching that keeps score thresholds
+        # such as SUPERVISION_SCORE_THRESHOLD meaning the same with either store
+        return lambda score: 1.0 - (2.0 - 2.0 * score) / math.sqrt(2)
@@ -6,82 +6,246 @@ from documents in the knowledge base directory.
 """
 
 import os
+import sys
+import json
 import shutil
+import hashlib
 import logging
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from typing import Any, Dict, Optional, Set
 from langchain_google_vertexai import VertexAIEmbeddings
 from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
 from src.core.config import config
+from src.core.bm25_index import BM25Index
+from src.core.document_loader import KnowledgeBaseLoader
+from src.core.chunker import MarkdownCodeSplitter, resolve_tokenizer
+from src.core.dedup import NearDuplicateIndex
+from src.core.embedding_pipeline import EmbeddingPipeline
+from src.core.embedding_cache import CachedEmbeddings
+from src.core.vector_snapshot import write_snapshot, resolve_snapshot_path
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 # Constants - using configuration
 KNOWLEDGE_BASE_DIR = "knowledge_base"  # This remains hardcoded as it's the source directory
+KNOWLEDGE_BASE_FILE = os.path.join(KNOWLEDGE_BASE_DIR, "wiedza.md")  # Consolidated folder2md dump
+VECTOR_STORE_DIR = config.VECTOR_STORE_DIR
+MANIFEST_FILE = "ingest_manifest.json"  # Chunk IDs already embedded, stored inside the vector store
 
 
-def create_vector_store():
+def _chunk_id(doc: Document) -> str:
+    """Content hash identifying a chunk; also used as its ID in Chroma."""
+    section = str(doc.metadata.get("section", ""))
+    return hashlib.sha256(f"{section}\0{doc.page_content}".encode("utf-8")).hexdigest()
+
+
+def _ingest_settings() -> Dict[str, Any]:
+    """Settings that invalidate every stored embedding when they change."""
+    return {
+        "loader": "sections-v1",
+        "chunker": "markdown-code-v1",
+        "embedding_model": config.EMBEDDING_MODEL,
+        "chunk_tokens": config.CHUNK_TOKENS,
+        "chunk_min_tokens": config.CHUNK_MIN_TOKENS,
+        "chunk_overlap_tokens": config.CHUNK_OVERLAP_TOKENS,
+        # The tokenizer actually used, which differs from the configured one if it cannot be loaded
+        "chunk_tokenizer": resolve_tokenizer(config.CHUNK_TOKENIZER),
+    }
+
+
+def _load_manifest(path: str) -> Optional[Dict[str, Any]]:
+    """Load the ingest manifest, or None if it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_manifest(path: str, manifest: Dict[str, Any]) -> None:
+    """Atomically write the ingest manifest."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(tmp_path, path)
+
+
+def build_bm25_index(db: Chroma, path: str) -> BM25Index:
     """
-    Creates a vector store from documents in the knowledge_base directory.
+    Builds the BM25 inverted index from all chunks in the vector store and persists it.
     
-    This function loads documents from the knowledge base, splits them into chunks,
-    creates embeddings using Vertex AI, and persists them in a ChromaDB vector store.
+    Args:
+        db (Chroma): The vector store to index
+        path (str): Where to write the index
+        
+    Returns:
+        BM25Index: The built index
     """
-    if not os.path.exists(KNOWLEDGE_BASE_DIR):
-        logging.warning(f"Knowledge base directory '{KNOWLEDGE_BASE_DIR}' not found. Skipping vector store creation.")
-        return
+    logging.info("Building BM25 index...")
+    contents = db.get(include=["documents", "metadatas"])
+    index = BM25Index.build(contents["ids"], contents["documents"], contents["metadatas"])
+    index.save(path)
+    logging.info(f"BM25 index with {len(index)} chunks and {len(index.postings)} terms saved to '{path}'.")
+    return index
 
-    # Remove old vector store if it exists
-    if os.path.exists(config.VECTOR_STORE_DIR):
-        logging.info(f"Removing existing vector store at '{config.VECTOR_STORE_DIR}'")
-        shutil.rmtree(config.VECTOR_STORE_DIR)
 
-    # Load documents
-    logging.info(f"Loading documents from '{KNOWLEDGE_BASE_DIR}'...")
+def build_snapshot(db: Chroma, bm25_index: BM25Index, directory: str) -> str:
+    """
+    Writes the single-file, memory-mappable snapshot of the vector store used at query time.
     
-    # Load the single consolidated knowledge base file
-    loader = DirectoryLoader(
-        "knowledge_base",
-        glob="wiedza.md",
-        loader_cls=TextLoader,
-        loader_kwargs={"encoding": "utf-8"}
+    Args:
+        db (Chroma): The vector store to snapshot
+        bm25_index (BM25Index): The BM25 index over the same chunks, stored in the snapshot
+        directory (str): Where to write the snapshot
+        
+    Returns:
+        str: Path of the snapshot file
+    """
+    logging.info(f"Writing {config.VECTOR_SNAPSHOT_DTYPE} vector snapshot...")
+    contents = db.get(include=["embeddings", "documents", "metadatas"])
+    # Rows must line up with the BM25 index positions
+    row_of = {chunk_id: row for row, chunk_id in enumerate(contents["ids"])}
+    rows = [row_of[chunk_id] for chunk_id in bm25_index.ids]
+    path = write_snapshot(
+        directory,
+        bm25_index.ids,
+        [contents["documents"][row] for row in rows],
+        [contents["metadatas"][row] for row in rows],
+        [contents["embeddings"][row] for row in rows],
+        dtype=config.VECTOR_SNAPSHOT_DTYPE,
+        bm25_index=bm25_index,
+        model=config.EMBEDDING_MODEL,
     )
+    logging.info(f"Vector snapshot saved to '{path}'.")
+    return path
 
+
+def create_vector_store(full_rebuild: bool = False):
+    """
+    Creates or incrementally updates the vector store from the knowledge_base directory.
+    
+    Chunks are keyed by a content hash. A manifest stored next to the Chroma
+    files records which chunks are already embedded, so only added or changed
+    chunks are embedded and chunks that disappeared are deleted. The store is
+    rebuilt from scratch when requested, when the manifest is missing, or when
+    the embedding model or chunking settings changed.
+    
+    Args:
+        full_rebuild (bool): Ignore the manifest and re-embed everything
+    """
+    if not os.path.exists(KNOWLEDGE_BASE_FILE):
+        logging.warning(f"Knowledge base file '{KNOWLEDGE_BASE_FILE}' not found. Skipping vector store creation.")
+        return
+
+    # Decide between an incremental update and a full rebuild
+    manifest_path = os.path.join(config.VECTOR_STORE_DIR, MANIFEST_FILE)
+    manifest = None if full_rebuild else _load_manifest(manifest_path)
+    if manifest is None or manifest.get("settings") != _ingest_settings():
+        if os.path.exists(config.VECTOR_STORE_DIR):
+            logging.info(f"Removing existing vector store at '{config.VECTOR_STORE_DIR}' for a full rebuild")
+            shutil.rmtree(config.VECTOR_STORE_DIR)
+        manifest = {"settings": _ingest_settings(), "chunks": {}}
+
+    # Stream the consolidated knowledge base file one embedded-file section at a
+    # time and split the sections in a process pool along headings, code fences
+    # and tables into token-sized chunks, so only chunk IDs and chunks that
+    # still need embedding are held in memory. Near duplicates of an earlier
+    # chunk are dropped before embedding; the first copy is kept.
+    logging.info(f"Loading documents from '{KNOWLEDGE_BASE_FILE}'...")
+    loader = KnowledgeBaseLoader(KNOWLEDGE_BASE_FILE)
+    text_splitter = MarkdownCodeSplitter()
+    dedup = NearDuplicateIndex() if config.DEDUP_ENABLED else None
+
+    seen: Set[str] = set()
+    pending: Dict[str, Document] = {}  # Identical chunks share an ID, so one copy of each
+    section_count = 0
     try:
-        docs = loader.load()
-        if not docs:
-            logging.warning("No documents found in the knowledge base.")
-            return
-        logging.info(f"Loaded {len(docs)} documents.")
+        for chunks in text_splitter.split_sections(loader.lazy_load()):
+            section_count += 1
+            for chunk in chunks:
+                chunk_id = _chunk_id(chunk)
+                if dedup is not None and dedup.add(chunk_id, chunk.page_content) is not None:
+                    continue
+                seen.add(chunk_id)
+                if chunk_id not in manifest["chunks"]:
+                    pending.setdefault(chunk_id, chunk)
     except Exception as e:
         logging.error(f"Failed to load documents: {e}")
         return
 
-    # Split documents into chunks using configurable parameters
-    logging.info("Splitting documents into chunks...")
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=config.CHUNK_SIZE,
-        chunk_overlap=config.CHUNK_OVERLAP
+    if not section_count:
+        logging.warning("No documents found in the knowledge base.")
+        return
+    logging.info(f"Loaded {section_count} sections, split into {len(seen)} unique chunks.")
+    if dedup is not None:
+        dropped = dedup.stats()["dropped"]
+        logging.info(
+            f"Dropped {dropped} near-duplicate chunks "
+            f"({dropped / max(dropped + len(seen), 1):.1%}, threshold {dedup.threshold})."
+        )
+
+    added = list(pending)
+    removed = [chunk_id for chunk_id in manifest["chunks"] if chunk_id not in seen]
+    logging.info(
+        f"{len(seen) - len(added)} chunks unchanged, {len(added)} to embed, {len(removed)} to delete."
     )
-    docs = text_splitter.split_documents(docs)
-    logging.info(f"Split into {len(docs)} chunks.")
+    bm25_path = os.path.join(config.VECTOR_STORE_DIR, config.BM25_INDEX_FILE)
+    if not added and not removed:
+        logging.info("Vector store is already up to date.")
+        if not os.path.exists(bm25_path) or resolve_snapshot_path(config.VECTOR_STORE_DIR) is None:
+            db = Chroma(persist_directory=config.VECTOR_STORE_DIR)
+            build_snapshot(db, build_bm25_index(db, bm25_path), config.VECTOR_STORE_DIR)
+        return
 
-    # Initialize the embedding model with configuration
+    # Initialize the embedding model with configuration, wrapped in a batched,
+    # concurrent and rate-limited pipeline. The on-disk cache in front of it
+    # skips the API for chunks that were embedded before (e.g. on full rebuilds).
     logging.info("Initializing embedding model...")
-    embeddings = VertexAIEmbeddings(
+    pipeline = EmbeddingPipeline(VertexAIEmbeddings(
         model_name=config.EMBEDDING_MODEL,
         **config.get_vertex_ai_config()
-    )
+    ))
+    embeddings = pipeline
+    if config.EMBEDDING_CACHE_ENABLED:
+        embeddings = CachedEmbeddings(pipeline, model_name=config.EMBEDDING_MODEL)
 
-    # Create and persist the vector store
-    logging.info(f"Creating and persisting vector store at '{config.VECTOR_STORE_DIR}'...")
+    # Apply the changes, checkpointing the manifest after every slice so an
+    # interrupted run resumes where it stopped instead of starting over.
+    # Each slice is embedded by the pipeline in concurrent batches.
+    logging.info(f"Updating vector store at '{config.VECTOR_STORE_DIR}'...")
     try:
-        db = Chroma.from_documents(docs, embeddings, persist_directory=config.VECTOR_STORE_DIR)
-        logging.info("Vector store created successfully.")
+        db = Chroma(persist_directory=config.VECTOR_STORE_DIR, embedding_function=embeddings)
+
+        if removed:
+            db.delete(ids=removed)
+            for chunk_id in removed:
+                del manifest["chunks"][chunk_id]
+            _save_manifest(manifest_path, manifest)
+
+        checkpoint_size = config.EMBEDDING_CHECKPOINT_SIZE
+        for start in range(0, len(added), checkpoint_size):
+            batch_ids = added[start:start + checkpoint_size]
+            db.add_documents([pending[chunk_id] for chunk_id in batch_ids], ids=batch_ids)
+            for chunk_id in batch_ids:
+                manifest["chunks"][chunk_id] = pending[chunk_id].metadata.get("section", "")
+            _save_manifest(manifest_path, manifest)
+            logging.info(f"Embedded {min(start + checkpoint_size, len(added))}/{len(added)} new chunks.")
+
+        stats = pipeline.stats()
+        logging.info(
+            f"Vector store updated successfully: {stats['chunks']} chunks embedded at "
+            f"{stats['chunks_per_second']:.1f} chunks/s ({stats['retries']} retries, "
+            f"{stats['throttled_seconds']:.1f}s rate limited)."
+        )
+
+        # Rebuild the lexical index and the snapshot from the final contents of the store
+        build_snapshot(db, build_bm25_index(db, bm25_path), config.VECTOR_STORE_DIR)
     except Exception as e:
-        logging.error(f"Failed to create vector store: {e}")
+        # Progress up to the last checkpoint is kept; re-running resumes from there
+        logging.error(f"Failed to update vector store: {e}")
+        raise
 
 
 if __name__ == "__main__":
-    create_vector_store()
\ No newline at end of file
+    create_vector_store(full_rebuild="--full-rebuild" in sys.argv)
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Local prompt registry.
+
+This module compiles the versioned templates from src.prompts.templates once
+at import time and serves them by name, so building a prompt at request time
+costs no parsing and no network I/O.
+"""
+
+import logging
+from typing import Dict, List, Optional, Union
+
+from langchain_core.prompts import BasePromptTemplate, PromptTemplate
+
+from src.core.config import config
+from src.prompts import templates
+
+logger = logging.getLogger(__name__)
+
+# Names of the built-in prompts
+PARSER = "parser"
+SUPERVISOR = "supervisor"
+DIRECT_RAG = "direct_rag"
+EXECUTOR = "executor"
+SUMMARIZER = "summarizer"
+
+
+class PromptRegistry:
+    """
+    Versioned collection of compiled prompt templates.
+
+    get() returns the most recently registered version of a prompt unless a
+    version is requested explicitly or pinned in the registry's configuration.
+    """
+
+    def __init__(self, pinned: Optional[Dict[str, str]] = None):
+        self._prompts: Dict[str, Dict[str, BasePromptTemplate]] = {}
+        self._pinned = dict(config.PROMPT_VERSIONS if pinned is None else pinned)
+
+    def register(self, name: str, version: str, template: Union[str, BasePromptTemplate]) -> None:
+        """
+        Compile and add a prompt version.
+
+        Args:
+            name (str): Prompt name
+            version (str): Version label, e.g. "v1"
+            template (Union[str, BasePromptTemplate]): Template text with {variables}, or a prebuilt template
+        """
+        if isinstance(template, str):
+            template = PromptTemplate.from_template(template.strip())
+        versions = self._prompts.setdefault(name, {})
+        if version in versions:
+            raise ValueError(f"Prompt '{name}' version '{version}' is already registered")
+        versions[version] = template
+
+    def get(self, name: str, version: Optional[str] = None) -> BasePromptTemplate:
+        """
+        Get a compiled prompt.
+
+        Args:
+            name (str): Prompt name
+            version (Optional[str]): Version label; defaults to the pinned or latest version
+
+        Returns:
+            BasePromptTemplate: The compiled template
+
+        Raises:
+            KeyError: If the prompt or version is not registered
+        """
+        if name not in self._prompts:
+            raise KeyError(f"Unknown prompt '{name}'")
+        versions = self._prompts[name]
+        version = version or self._pinned.get(name) or next(reversed(versions))
+        if version not in versions:
+            raise KeyError(f"Unknown version '{version}' of prompt '{name}'")
+        return versions[version]
+
+    def render(self, name: str, /, **variables) -> str:
+        """
+        Format a text prompt with the given variables.
+
+        Args:
+            name (str): Prompt name
+            **variables: Template variables
+
+        Returns:
+            str: The rendered prompt
+        """
+        return self.get(name).format(**variables)
+
+    def versions(self, name: str) -> List[str]:
+        """Get the registered versions of a prompt, oldest first."""
+        return list(self._prompts.get(name, {}))
+
+
+def _with_optional_history(template: str) -> PromptTemplate:
+    """Compile a template whose {history} defaults to templates.NO_HISTORY."""
+    return PromptTemplate.from_template(template.strip(), partial_variables={"history": templates.NO_HISTORY})
+
+
+def build_default_registry() -> PromptRegistry:
+    """
+    Create a registry holding the built-in prompts.
+
+    Returns:
+        PromptRegistry: The populated registry
+    """
+    registry = PromptRegistry()
+    registry.register(PARSER, "v1", templates.PARSER_V1)
+    # {history} is optional, so callers without a conversation render v2 like v1
+    registry.register(PARSER, "v2", _with_optional_history(templates.PARSER_V2))
+    registry.register(SUPERVISOR, "v1", templates.SUPERVISOR_V1)
+    registry.register(DIRECT_RAG, "v1", templates.DIRECT_RAG_V1)
+    registry.register(DIRECT_RAG, "v2", _with_optional_history(templates.DIRECT_RAG_V2))
+    registry.register(EXECUTOR, "v1", templates.EXECUTOR_V1)
+    registry.register(SUMMARIZER, "v1", templates.SUMMARIZER_V1)
+    return registry
+
+
+# Global prompt registry instance
+prompt_registry = build_default_registry()
@@ -0,0 +1,118 @@
+"""
+Versioned prompt templates for the agent pipeline.
+
+Templates are stored here verbatim, so the application never fetches prompts
+over the network. Add a new version next to an existing one instead of
+editing it in place; the registry serves the latest version unless
+config.PROMPT_VERSIONS pins another one.
+"""
+
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+# Filled into {history} for chats without earlier messages
+NO_HISTORY = "(no previous messages)"
+
+# --- Parser ---
+
+PARSER_V1 = """
+Given the user's request, determine the appropriate task and its parameters.
+
+Available tasks:
+1. 'search_knowledge_base': Use this when the user is asking a question or looking for information that might be in the provided documents. The 'query' should be the user's question.
+2. 'get_current_time': Use this when the user asks for the current time. The 'timezone' parameter is optional and defaults to UTC, but if the user specifies a city or timezone (e.g., "time in Warsaw", "what time is it in New York"), extract it.
+
+User Request: "{user_input}"
+
+Now, provide the output in the required JSON format.
+"""
+
+# v2: sees the chat history so follow-up questions become self-contained queries
+PARSER_V2 = """
+Given the user's request, determine the appropriate task and its parameters.
+
+Available tasks:
+1. 'search_knowledge_base': Use this when the user is asking a question or looking for information that might be in the provided documents. The 'query' should be the user's question, rewritten to be self-contained if it refers to the conversation so far (e.g. "and what about the second one?").
+2. 'get_current_time': Use this when the user asks for the current time. The 'timezone' parameter is optional and defaults to UTC, but if the user specifies a city or timezone (e.g., "time in Warsaw", "what time is it in New York"), extract it. Follow-ups such as "and in Tokyo?" after a time question are also time requests.
+
+Conversation so far:
+{history}
+
+User Request: "{user_input}"
+
+Now, provide the output in the required JSON format.
+"""
+
+# --- Supervisor ---
+
+SUPERVISOR_V1 = """
+You are a Quality Assurance Supervisor. Your task is to review an answer generated by an AI agent based on a user's original query.
+
+Original User Query: "{original_query}"
+
+Generated Answer to Review: "{generated_answer}"
+
+Please evaluate the answer based on the following criteria:
+1.  **Relevance:** Does the answer directly address the user's query?
+2.  **Accuracy:** Is the information correct and consistent with the query?
+3.  **Completeness:** Does it fully answer the user's question without leaving out key details?
+4.  **Clarity:** Is the answer easy to understand?
+
+If the answer is satisfactory, respond ONLY with the word "APPROVED".
+If the answer is unsatisfactory, DO NOT say it's wrong. Instead, provide a corrected and improved version of the answer directly, without any preamble.
+"""
+
+# --- Direct RAG ---
+
+DIRECT_RAG_V1 = """
+You are a helpful assistant answering questions using the user's knowledge base.
+
+Answer the question using only the context below. If the context does not contain
+the answer, say that you could not find it in the knowledge base.
+
+Context:
+{context}
+
+Question: "{query}"
+"""
+
+# v2: adds the chat history so answers stay consistent with earlier replies
+DIRECT_RAG_V2 = """
+You are a helpful assistant answering questions using the user's knowledge base.
+
+Answer the question using only the context below. If the context does not contain
+the answer, say that you could not find it in the knowledge base. Use the conversation
+so far only to understand what the question refers to.
+
+Conversation so far:
+{history}
+
+Context:
+{context}
+
+Question: "{query}"
+"""
+
+# --- Conversation summarizer ---
+
+SUMMARIZER_V1 = """
+You maintain a running summary of a chat between a user and an AI assistant.
+
+Current summary:
+{summary}
+
+Messages to fold into the summary:
+{messages}
+
+Write the updated summary in at most {max_words} words. Keep names, facts, numbers and
+open questions the user may refer back to; drop greetings and filler. Respond with the summary only.
+"""
+
+# --- Executor (tool-calling agent) ---
+
+# Same messages as the "hwchase17/openai-tools-agent" hub prompt the executor used to pull at startup
+EXECUTOR_V1 = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful assistant"),
+    MessagesPlaceholder("chat_history", optional=True),
+    ("human", "{input}"),
+    MessagesPlaceholder("agent_scratchpad"),
+])
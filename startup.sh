@@ -5,6 +5,9 @@ set -e
 PROJECT_ID=${GCP_PROJECT_ID:-$GOOGLE_CLOUD_PROJECT}
 BUCKET_NAME="${PROJECT_ID}-knowledge-base"
 VECTOR_STORE_DIR="vector_store"
+SNAPSHOT_PREFIX="kb_snapshot"
+# Point this at a mounted volume to keep the snapshot across container restarts
+SNAPSHOT_CACHE_DIR="${VECTOR_SNAPSHOT_CACHE_DIR:-.cache/snapshots}"
 
 echo "Container starting..."
 echo "Project ID: $PROJECT_ID"
@@ -15,15 +18,37 @@ if [ -z "$PROJECT_ID" ]; then
   exit 1
 fi
 
-if [ ! -d "$VECTOR_STORE_DIR" ]; then
-  echo "Vector store not found locally. Downloading from GCS..."
-  
-  # Using gsutil which is part of the base gcloud-sdk image is more reliable
-  gsutil -m cp -r "gs://${BUCKET_NAME}/${VECTOR_STORE_DIR}" .
-  
-  echo "Download complete."
+# Prefer the single-file snapshot: the pointer object names it by content hash,
+# so a cached copy with the same name is used without downloading anything
+SNAPSHOT_NAME=$(gsutil cat "gs://${BUCKET_NAME}/${SNAPSHOT_PREFIX}/LATEST_SNAPSHOT" 2>/dev/null || true)
+
+if [ -n "$SNAPSHOT_NAME" ]; then
+  mkdir -p "$SNAPSHOT_CACHE_DIR"
+  if [ -f "${SNAPSHOT_CACHE_DIR}/${SNAPSHOT_NAME}" ]; then
+    echo "Snapshot ${SNAPSHOT_NAME} already cached. Skipping download."
+  else
+    echo "Downloading snapshot ${SNAPSHOT_NAME} from GCS..."
+    gsutil cp "gs://${BUCKET_NAME}/${SNAPSHOT_PREFIX}/${SNAPSHOT_NAME}" "${SNAPSHOT_CACHE_DIR}/${SNAPSHOT_NAME}.tmp"
+    mv "${SNAPSHOT_CACHE_DIR}/${SNAPSHOT_NAME}.tmp" "${SNAPSHOT_CACHE_DIR}/${SNAPSHOT_NAME}"
+    # Drop snapshots that are no longer current
+    find "$SNAPSHOT_CACHE_DIR" -name '*.kbsnap' ! -name "$SNAPSHOT_NAME" -delete
+    echo "Download complete."
+  fi
+  printf '%s' "$SNAPSHOT_NAME" > "${SNAPSHOT_CACHE_DIR}/LATEST_SNAPSHOT"
+  export VECTOR_SNAPSHOT_DIR="$SNAPSHOT_CACHE_DIR"
 else
-  echo "Vector store already present. Skipping download."
+  echo "No snapshot published. Syncing the vector store from GCS..."
+  
+  # Downloads only files whose checksum differs from the local copy, from the
+  # version the CURRENT pointer names; a store baked into the image is kept if that fails
+  if python3 -m src.core.gcs_sync download "$BUCKET_NAME" "$VECTOR_STORE_DIR"; then
+    echo "Vector store is up to date."
+  elif [ -d "$VECTOR_STORE_DIR" ]; then
+    echo "Sync failed. Using the vector store already present."
+  else
+    echo "Error: vector store could not be downloaded."
+    exit 1
+  fi
 fi
 
 echo "Launching application on port ${PORT}..."
@@ -0,0 +1,117 @@
+"""
+Unit tests for the structure-aware, token-sized chunker.
+
+Tokens are estimated from characters, so no tokenizer download is needed.
+"""
+
+import pytest
+from langchain_core.documents import Document
+
+import src.core.vector_store as vector_store
+from src.core.chunker import MarkdownCodeSplitter, get_token_counter, resolve_tokenizer
+from src.core.config import config
+
+count = get_token_counter("estimate")
+
+MARKDOWN = """# Deployment
+
+Short intro.
+
+## Docker
+
+Build the image first.
+
+```bash
+docker build -t bot .
+docker run bot
+```
+
+## Costs
+
+| Service   | Monthly cost |
+|-----------|--------------|
+| Cloud Run | 5 USD        |
+
+### Storage
+
+Buckets are cheap."""
+
+
+def splitter(max_tokens=40, min_tokens=0, overlap_tokens=6):
+    return MarkdownCodeSplitter(max_tokens=max_tokens, min_tokens=min_tokens, overlap_tokens=overlap_tokens, tokenizer="estimate")
+
+
+def section(text, name="guide.md", file_type="md"):
+    return Document(page_content=text, metadata={"source": "kb.md", "section": name, "file_type": file_type})
+
+
+def test_headings_fences_and_tables_stay_whole_with_breadcrumbs():
+    chunks = splitter().split_document(section(MARKDOWN))
+    by_heading = {chunk.metadata["headings"]: chunk.page_content for chunk in chunks}
+
+    assert "```bash\ndocker build -t bot .\ndocker run bot\n```" in by_heading["Deployment > Docker"]
+    # Cell padding is squeezed; the table itself is kept in one piece
+    assert "| Service | Monthly cost |\n|-----------|--------------|\n| Cloud Run | 5 USD |" in by_heading["Deployment > Costs"]
+    assert by_heading["Deployment > Costs > Storage"] == "### Storage\n\nBuckets are cheap."
+    assert all(chunk.metadata["section"] == "guide.md" for chunk in chunks)
+    assert all(chunk.metadata["tokens"] == count(chunk.page_content) <= 40 for chunk in chunks)
+
+
+def test_small_heading_sections_are_merged_under_their_common_parent():
+    chunks = splitter(max_tokens=200, min_tokens=30).split_document(section(MARKDOWN))
+    # Docker and Costs are too small to stand alone; Storage is what is left at the end
+    assert [chunk.metadata["headings"] for chunk in chunks] == ["Deployment", "Deployment > Costs > Storage"]
+    assert "## Costs" in chunks[0].page_content
+    assert "".join(chunk.page_content for chunk in chunks).count("```") == 2
+
+
+def test_oversized_fences_and_tables_are_split_into_complete_blocks():
+    code = "```python\n" + "\n".join(f"value_{i} = compute({i})" for i in range(40)) + "\n```"
+    table = "| a | b |\n|---|---|\n" + "\n".join(f"| row {i} | {i * i} |" for i in range(40))
+    chunks = splitter().split_document(section(f"# Big\n\n{code}\n\n{table}"))
+
+    fences = [chunk.page_content for chunk in chunks if "value_" in chunk.page_content]
+    tables = [chunk.page_content for chunk in chunks if "| row" in chunk.page_content]
+    assert len(fences) > 1 and len(tables) > 1
+    assert all(piece.startswith("```python\n") and piece.endswith("\n```") for piece in fences)
+    assert all(piece.startswith("| a | b |\n|---|---|\n") for piece in tables)
+    assert all(count(chunk.page_content) <= 40 for chunk in chunks)
+    # Consecutive pieces overlap by a line, and no line is lost
+    assert fences[1].split("\n")[1] == fences[0].split("\n")[-2]
+    assert all(any(f"value_{i} =" in piece for piece in fences) for i in range(40))
+
+
+def test_long_lines_are_cut_at_sentences():
+    text = " ".join(f"Sentence number {i} explains one more detail." for i in range(30))
+    chunks = splitter().split_document(section(text))
+    assert len(chunks) > 1
+    assert all(count(chunk.page_content) <= 40 for chunk in chunks)
+    assert chunks[0].page_content.startswith("Sentence number 0") and chunks[0].page_content.endswith(".")
+
+
+def test_source_files_split_at_top_level_definitions():
+    code = "import os\n\n\n# A comment, not a heading\ndef first():\n    return 1\n\n    # still inside\n\n\nclass Second:\n    pass\n"
+    chunks = splitter(max_tokens=18).split_document(section(code, name="app.py", file_type="py"))
+    assert [chunk.page_content.split("\n")[0] for chunk in chunks] == ["import os", "# A comment, not a heading", "class Second:"]
+    assert "    # still inside" in chunks[1].page_content
+    assert all(chunk.metadata["headings"] == "" for chunk in chunks)
+
+
+def test_process_pool_keeps_section_order():
+    sections = [section(MARKDOWN.replace("Deployment", f"Guide {i}"), name=f"{i}.md") for i in range(12)]
+    sequential = list(splitter().split_sections(sections, workers=1))
+    parallel = list(splitter().split_sections(iter(sections), workers=2))
+    assert [[chunk.page_content for chunk in chunks] for chunks in parallel] == \
+        [[chunk.page_content for chunk in chunks] for chunks in sequential]
+    assert [chunks[0].metadata["section"] for chunks in parallel] == [f"{i}.md" for i in range(12)]
+
+
+def test_unavailable_tokenizer_is_recorded_as_the_estimate(monkeypatch):
+    assert resolve_tokenizer("estimate") == "estimate"
+    assert resolve_tokenizer("no-such-encoding") == "estimate"
+    with pytest.raises(ValueError):
+        get_token_counter("no-such-encoding")  # no silent fallback once resolved
+
+    monkeypatch.setattr(config, "CHUNK_TOKENIZER", "no-such-encoding")
+    assert vector_store._ingest_settings()["chunk_tokenizer"] == "estimate"
+    assert MarkdownCodeSplitter().tokenizer == "estimate"
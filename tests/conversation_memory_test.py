@@ -0,0 +1,179 @@
+"""
+Unit tests for the per-chat conversation memory.
+"""
+
+import time
+import asyncio
+import threading
+
+from src.core.conversation_memory import (
+    ConversationMemory, ChatHistory, InMemoryBackend, SQLiteBackend, RedisBackend, estimate_tokens,
+)
+from backend.conversation_memory import ConversationMemory as WhatsAppConversationMemory, SQLiteStore as WhatsAppSQLiteStore
+
+
+class DictRedis:
+    """Minimal stand-in exposing the subset of the redis client API the backend uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode("utf-8")
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        return [key for key in self.data if key.startswith(match.rstrip("*"))]
+
+
+def test_turns_are_kept_in_a_bounded_ring_buffer():
+    memory = ConversationMemory(InMemoryBackend(max_chats=10, idle_ttl=3600), max_turns=4, token_budget=10_000)
+    for i in range(5):
+        memory.append("chat", f"question {i}", f"answer {i}")
+
+    history = memory.history("chat")
+    assert [text for _, text in history.turns] == ["question 3", "answer 3", "question 4", "answer 4"]
+    assert memory.stats()["dropped_turns"] == 6
+
+
+def test_history_over_budget_is_summarized():
+    calls = []
+
+    def summarizer(summary, turns):
+        calls.append(list(turns))
+        return (summary + " " + " ".join(text for _, text in turns)).strip()[:40]
+
+    memory = ConversationMemory(
+        InMemoryBackend(max_chats=10, idle_ttl=3600), max_turns=100, token_budget=40, summarizer=summarizer,
+    )
+    for i in range(6):
+        memory.append("chat", "q" * 30 + str(i), "a" * 30 + str(i))
+
+    history = memory.history("chat")
+    assert calls
+    assert history.summary
+    assert history.tokens() <= 40 + estimate_tokens("a" * 31)
+    assert "Summary of earlier conversation" in history.render()
+    assert history.as_messages()[0][0] == "system"
+
+
+def test_idle_and_least_recently_used_chats_are_evicted():
+    backend = InMemoryBackend(max_chats=2, idle_ttl=3600)
+    memory = ConversationMemory(backend, max_turns=4, token_budget=1000)
+    memory.append("a", "hi", "hello")
+    memory.append("b", "hi", "hello")
+    memory.history("a")
+    memory.append("a", "again", "sure")
+    memory.append("c", "hi", "hello")
+
+    assert backend.count() == 2
+    assert not memory.history("b")
+    assert memory.history("a") and memory.history("c")
+
+    expired = InMemoryBackend(max_chats=10, idle_ttl=-1)
+    expired.save("x", ChatHistory(summary="old"))
+    assert expired.load("x") is None
+
+
+def test_sqlite_backend_persists_across_instances(tmp_path):
+    path = str(tmp_path / "conversations.sqlite3")
+    memory = ConversationMemory(SQLiteBackend(path, max_chats=2, idle_ttl=3600), max_turns=4, token_budget=1000)
+    memory.append("chat", "What is RAG?", "Retrieval-augmented generation.")
+    memory.backend.close()
+
+    reopened = SQLiteBackend(path, max_chats=2, idle_ttl=3600)
+    history = reopened.load("chat")
+    assert list(history.turns) == [("user", "What is RAG?"), ("assistant", "Retrieval-augmented generation.")]
+
+    reopened.save("b", ChatHistory())
+    reopened.save("c", ChatHistory())
+    assert reopened.count() == 2
+    assert reopened.load("chat") is None
+    reopened.close()
+
+
+def test_redis_backend_round_trips_through_a_compatible_client():
+    client = DictRedis()
+    memory = ConversationMemory(RedisBackend(client=client, idle_ttl=60), max_turns=4, token_budget=1000)
+    memory.append("chat", "Cześć", "Dzień dobry")
+
+    assert memory.history("chat").turns[0] == ("user", "Cześć")
+    assert memory.stats()["chats"] == 1
+    memory.clear("chat")
+    assert not memory.history("chat")
+
+
+def test_whatsapp_memory_caps_history_and_evicts_senders():
+    async def summarizer(summary, messages):
+        return f"{len(messages)} earlier messages"
+
+    memory = WhatsAppConversationMemory(max_turns=4, token_budget=1000, max_chats=2, idle_ttl=3600, summarizer=summarizer)
+
+    async def run():
+        for i in range(3):
+            await memory.append("whatsapp:+48123", f"q{i}", f"a{i}")
+        messages = memory.messages("whatsapp:+48123")
+        assert messages[0] == {"role": "system", "content": "Summary of earlier conversation: 2 earlier messages"}
+        assert [m["content"] for m in messages[1:]] == ["q1", "a1", "q2", "a2"]
+
+        await memory.append("whatsapp:+48124", "q", "a")
+        await memory.append("whatsapp:+48125", "q", "a")
+
+    asyncio.run(run())
+    assert len(memory) == 2
+    assert memory.messages("whatsapp:+48123") == []
+
+
+def test_whatsapp_sqlite_store_persists_across_restarts(tmp_path):
+    path = str(tmp_path / "conversations.sqlite3")
+
+    async def summarizer(summary, messages):
+        return "Asked about opening hours"
+
+    async def run():
+        memory = WhatsAppConversationMemory(
+            max_turns=2, token_budget=1000, summarizer=summarizer, store=WhatsAppSQLiteStore(path, max_chats=2, idle_ttl=3600)
+        )
+        await memory.append("whatsapp:+48123", "When are you open?", "Nine to five.")
+        await memory.append("whatsapp:+48123", "Zażółć?", "Gęślą jaźń.")
+        memory.store.close()
+
+    asyncio.run(run())
+    reopened = WhatsAppConversationMemory(store=WhatsAppSQLiteStore(path, max_chats=2, idle_ttl=3600))
+    assert reopened.messages("whatsapp:+48123") == [
+        {"role": "system", "content": "Summary of earlier conversation: Asked about opening hours"},
+        {"role": "user", "content": "Zażółć?"},
+        {"role": "assistant", "content": "Gęślą jaźń."},
+    ]
+
+    asyncio.run(reopened.append("whatsapp:+48124", "q", "a"))
+    asyncio.run(reopened.append("whatsapp:+48125", "q", "a"))
+    assert len(reopened) == 2
+    assert reopened.messages("whatsapp:+48123") == []
+    reopened.store.close()
+
+
+class SlowBackend(InMemoryBackend):
+    """Widens the gap between loading and saving a history."""
+
+    def load(self, chat_id):
+        history = super().load(chat_id)
+        time.sleep(0.05)
+        return history
+
+
+def test_concurrent_appends_to_one_chat_are_not_lost():
+    memory = ConversationMemory(SlowBackend(max_chats=10, idle_ttl=3600), max_turns=100, token_budget=10_000)
+    threads = [threading.Thread(target=memory.append, args=("chat", f"question {i}", f"answer {i}")) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    texts = [text for _, text in memory.history("chat").turns]
+    assert sorted(texts) == sorted([f"question {i}" for i in range(4)] + [f"answer {i}" for i in range(4)])
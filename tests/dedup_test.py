@@ -0,0 +1,77 @@
+"""
+Unit tests for near-duplicate chunk removal and MMR-diversified retrieval.
+"""
+
+import numpy as np
+
+from src.core.dedup import NearDuplicateIndex, lsh_parameters, shingles
+from src.core.vector_index import maximal_marginal_relevance
+from src.core.vector_snapshot import SnapshotVectorStore, write_snapshot
+from tests.vector_snapshot_test import KeywordEmbeddings
+
+PARAGRAPH = (
+    "Retrieval augmented generation grounds the answers of a language model in documents "
+    "fetched at query time, which reduces hallucinations and keeps the knowledge current "
+    "without retraining the model on every change of the underlying sources."
+)
+
+
+def test_shingles_ignore_case_punctuation_and_citation_markers():
+    assert shingles("Hello, World! [^1_2]", size=5) == {"hello world"}
+    assert shingles("One two three four five six", size=5) == {"one two three four five", "two three four five six"}
+    assert shingles("  ...  ") == set()
+
+
+def test_lsh_parameters_split_the_signature():
+    bands, rows = lsh_parameters(128, 0.8)
+    assert bands * rows == 128
+    assert (1 / bands) ** (1 / rows) < 0.8
+
+
+def test_near_duplicates_are_dropped_and_the_first_copy_kept():
+    index = NearDuplicateIndex(threshold=0.8, num_perm=128, shingle_size=5)
+    assert index.add("original", PARAGRAPH) is None
+    # Same paragraph exported again with citation markers and different formatting
+    copy = PARAGRAPH.replace("documents", "documents[^1_1]").replace(", which", " — which").upper()
+    assert index.add("copy", copy) == "original"
+    # Rewording changes every shingle spanning the edit, so an edited paragraph is kept
+    assert index.add("edited", PARAGRAPH.replace("hallucinations", "made-up facts")) is None
+    assert index.add("different", "Opening hours are nine to five on weekdays, closed on public holidays.") is None
+    assert index.add("original", PARAGRAPH) is None  # re-adding a kept chunk is not a duplicate
+    assert index.stats() == {"kept": 3, "dropped": 1}
+    assert index.duplicates == {"copy": "original"}
+
+
+def test_threshold_controls_what_counts_as_duplicate():
+    half = " ".join(PARAGRAPH.split()[:20]) + " and then something else entirely about cooking pasta at home tonight"
+    strict = NearDuplicateIndex(threshold=0.9)
+    loose = NearDuplicateIndex(threshold=0.2)
+    for index in (strict, loose):
+        index.add("original", PARAGRAPH)
+    assert strict.add("half", half) is None
+    assert loose.add("half", half) == "original"
+
+
+def test_mmr_skips_redundant_candidates():
+    query = np.array([1.0, 1.0, 0.0])
+    candidates = np.array([[1.0, 1.0, 0.0], [1.0, 1.0, 0.01], [0.0, 1.0, 0.0]])
+    assert maximal_marginal_relevance(query, candidates, 2, lambda_mult=1.0) == [0, 1]
+    assert maximal_marginal_relevance(query, candidates, 2, lambda_mult=0.3) == [0, 2]
+    assert maximal_marginal_relevance(query, candidates[:0], 2) == []
+
+
+def test_snapshot_store_supports_mmr_retrieval(tmp_path):
+    texts = ["Delivery hours are nine to five.", "Delivery hours: nine to five!", "Delivery takes two days."]
+    metadatas = [{"section": "shipping", "source": "kb.md"} for _ in texts]
+    path = write_snapshot(str(tmp_path), ["a", "b", "c"], texts, metadatas,
+                          KeywordEmbeddings().embed_documents(texts), model="keyword-test")
+    store = SnapshotVectorStore.load(path, KeywordEmbeddings())
+
+    plain = store.as_retriever(search_kwargs={"k": 2}).invoke("delivery hours")
+    assert [document.page_content for document in plain] == texts[:2]
+
+    diverse = store.as_retriever(
+        search_type="mmr", search_kwargs={"k": 2, "fetch_k": 3, "lambda_mult": 0.3}
+    ).invoke("delivery hours")
+    assert [document.page_content for document in diverse] == [texts[0], texts[2]]
+    assert store.max_marginal_relevance_search("delivery", k=2, filter={"section": "returns"}) == []
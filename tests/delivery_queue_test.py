@@ -0,0 +1,180 @@
+"""
+Unit tests for the WhatsApp backend's asynchronous delivery queue.
+
+The Twilio Messages API is stubbed with an httpx MockTransport.
+"""
+
+import json
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+
+from backend.delivery_queue import DeliveryQueue, DeliveryJob, DeadLetterStore, GenerationError, TwilioSender
+
+SENDER = "whatsapp:+48123456789"
+BOT = "whatsapp:+14155238886"
+
+
+class TwilioStub:
+    """Records sent messages and answers with the queued status codes, then 201."""
+
+    def __init__(self, *statuses: int):
+        self.statuses = list(statuses)
+        self.sent = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/2010-04-01/Accounts/AC123/Messages.json"
+        assert request.headers["authorization"].startswith("Basic ")
+        status = self.statuses.pop(0) if self.statuses else 201
+        if status != 201:
+            return httpx.Response(status, json={"message": "stub error"})
+        form = {key: values[0] for key, values in parse_qs(request.content.decode()).items()}
+        self.sent.append(form)
+        return httpx.Response(201, json={"sid": f"SM{len(self.sent)}"})
+
+
+async def echo(sender: str, body: str) -> str:
+    return f"echo: {body}"
+
+
+def make_queue(stub: TwilioStub, tmp_path, **kwargs) -> DeliveryQueue:
+    sender = TwilioSender("AC123", "secret", "https://twilio.test", transport=httpx.MockTransport(stub))
+    return DeliveryQueue(echo, sender, DeadLetterStore(str(tmp_path / "dead.jsonl")), backoff_base=0.001, **kwargs)
+
+
+def test_workers_deliver_queued_replies_and_retry_transient_errors(tmp_path):
+    stub = TwilioStub(503, 429)
+    queue = make_queue(stub, tmp_path, workers=2)
+
+    async def run():
+        await queue.start()
+        for i in range(3):
+            assert queue.enqueue(DeliveryJob(sender=SENDER, recipient=BOT, body=f"hi {i}"))
+        await queue.join()
+        metrics = queue.metrics()
+        await queue.stop()
+        return metrics
+
+    metrics = asyncio.run(run())
+
+    assert sorted(message["Body"] for message in stub.sent) == ["echo: hi 0", "echo: hi 1", "echo: hi 2"]
+    assert all(message["From"] == BOT and message["To"] == SENDER for message in stub.sent)
+    assert metrics["delivered"] == 3
+    assert metrics["retries"] == 2
+    assert metrics["dead_lettered"] == 0
+    assert not (tmp_path / "dead.jsonl").exists()
+
+
+def test_undeliverable_replies_are_dead_lettered(tmp_path):
+    stub = TwilioStub(500, 500, 500, 400)
+    queue = make_queue(stub, tmp_path, workers=1, max_retries=2)
+
+    async def run():
+        await queue.start()
+        queue.enqueue(DeliveryJob(sender=SENDER, recipient=BOT, body="exhausts retries"))
+        queue.enqueue(DeliveryJob(sender=SENDER, recipient=BOT, body="rejected"))
+        await queue.stop()
+        return queue.metrics()
+
+    metrics = asyncio.run(run())
+
+    dead = [json.loads(line) for line in (tmp_path / "dead.jsonl").read_text().splitlines()]
+    assert [(entry["body"], entry["attempts"]) for entry in dead] == [("exhausts retries", 3), ("rejected", 1)]
+    assert dead[0]["reply"] == "echo: exhausts retries"
+    assert "400" in dead[1]["error"]
+    assert metrics["dead_lettered"] == 2
+    assert metrics["delivered"] == 0
+    assert stub.sent == []
+
+
+def test_full_queue_rejects_new_messages(tmp_path):
+    queue = make_queue(TwilioStub(), tmp_path, max_size=1)
+
+    async def run():
+        assert queue.enqueue(DeliveryJob(sender=SENDER, recipient=BOT, body="first"))
+        assert not queue.enqueue(DeliveryJob(sender=SENDER, recipient=BOT, body="second"))
+        return queue.metrics()
+
+    metrics = asyncio.run(run())
+    assert metrics["enqueued"] == 1
+    assert metrics["rejected"] == 1
+    assert metrics["queue_depth"] == 1
+
+
+def test_rejected_messages_get_a_direct_reply(tmp_path):
+    stub = TwilioStub(503)
+    queue = make_queue(stub, tmp_path, max_size=1)
+
+    async def run():
+        assert queue.enqueue(DeliveryJob(sender=SENDER, recipient=BOT, body="first"))
+        rejected = DeliveryJob(sender=SENDER, recipient=BOT, body="second")
+        assert not queue.enqueue(rejected)
+        queue.reply_now(rejected, "busy, try again later")
+        await queue.stop(drain_timeout=0.01)
+        return queue.metrics()
+
+    metrics = asyncio.run(run())
+    assert [message["Body"] for message in stub.sent] == ["busy, try again later"]
+    assert stub.sent[0]["To"] == SENDER
+    assert (metrics["retries"], metrics["delivered"], metrics["rejected"]) == (1, 1, 1)
+
+
+def test_messages_from_one_sender_are_answered_in_order(tmp_path):
+    stub = TwilioStub(503)
+    queue = make_queue(stub, tmp_path, workers=4)
+    history = []
+
+    async def remembering(sender: str, body: str) -> str:
+        # The first reply is slow to generate; later ones must still see it in the history
+        seen = len([entry for entry in history if entry[0] == sender])
+        await asyncio.sleep(0.05 if body == "first" else 0)
+        history.append((sender, body))
+        return f"{body} after {seen}"
+
+    queue.generate = remembering
+
+    async def run():
+        await queue.start()
+        for body in ("first", "second", "third"):
+            queue.enqueue(DeliveryJob(sender=SENDER, recipient=BOT, body=body))
+        queue.enqueue(DeliveryJob(sender="whatsapp:+48987654321", recipient=BOT, body="other"))
+        await queue.join()
+        await queue.stop()
+
+    asyncio.run(run())
+    assert [message["Body"] for message in stub.sent if message["To"] == SENDER] == [
+        "first after 0", "second after 1", "third after 2"
+    ]
+    assert stub.sent[0]["Body"] == "other after 0"  # other senders are not held up
+    assert queue._senders == {} and queue._pending == {}
+
+
+def test_failed_generations_are_retried_then_dead_lettered(tmp_path):
+    stub = TwilioStub()
+    queue = make_queue(stub, tmp_path, workers=1, max_retries=2)
+    failures = {"flaky": 1, "down": 10, "misconfigured": 10}
+
+    async def failing(sender: str, body: str) -> str:
+        if failures[body]:
+            failures[body] -= 1
+            raise GenerationError("OpenAI request failed", retryable=body != "misconfigured")
+        return f"echo: {body}"
+
+    queue.generate = failing
+
+    async def run():
+        await queue.start()
+        for body in failures:
+            queue.enqueue(DeliveryJob(sender=SENDER, recipient=BOT, body=body))
+        await queue.stop()
+        return queue.metrics()
+
+    metrics = asyncio.run(run())
+
+    assert [message["Body"] for message in stub.sent] == ["echo: flaky"]
+    dead = [json.loads(line) for line in (tmp_path / "dead.jsonl").read_text().splitlines()]
+    assert [(entry["body"], entry["attempts"], entry["reply"]) for entry in dead] == [
+        ("down", 3, None), ("misconfigured", 1, None)
+    ]
+    assert (metrics["delivered"], metrics["retries"], metrics["dead_lettered"]) == (1, 3, 2)
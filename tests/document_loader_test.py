@@ -0,0 +1,84 @@
+"""
+Unit tests for the section-aware knowledge base loader.
+"""
+
+from src.core.document_loader import KnowledgeBaseLoader
+
+DUMP = """# Zbiorczy zrzut plików: LLM
+<!-- Generated by folder2md -->
+
+---
+
+## Slides.pdf
+> *Pominięto ten plik (powód: binary or filtered).*
+
+---
+
+## Notes.md
+```md
+# Notes
+
+First paragraph.
+
+---
+
+Still part of the notes.
+```
+
+---
+
+## script.py
+```python
+print("hello")
+```
+"""
+
+
+def test_yields_one_document_per_embedded_file(tmp_path):
+    path = tmp_path / "wiedza.md"
+    path.write_text(DUMP, encoding="utf-8")
+
+    docs = list(KnowledgeBaseLoader(str(path)).lazy_load())
+
+    assert [doc.metadata["section"] for doc in docs] == ["Notes.md", "script.py"]
+    assert docs[0].page_content == "# Notes\n\nFirst paragraph.\n\n---\n\nStill part of the notes."
+    assert docs[1].page_content == 'print("hello")'
+    assert docs[1].metadata["file_type"] == "py"
+    assert all(doc.metadata["source"] == str(path) for doc in docs)
+
+
+def test_separator_and_heading_inside_a_fence_do_not_start_a_section(tmp_path):
+    dump = """# Zbiorczy zrzut plików: LLM
+
+---
+
+## Report.md
+```md
+# Report
+
+```python
+print("nested fence")
+```
+
+---
+
+## **Section 1: Findings**
+
+Findings text.
+```
+
+---
+
+## notes.txt
+```txt
+plain notes
+```
+"""
+    path = tmp_path / "wiedza.md"
+    path.write_text(dump, encoding="utf-8")
+
+    docs = list(KnowledgeBaseLoader(str(path)).lazy_load())
+
+    assert [doc.metadata["section"] for doc in docs] == ["Report.md", "notes.txt"]
+    assert "## **Section 1: Findings**\n\nFindings text." in docs[0].page_content
+    assert docs[1].page_content == "plain notes"
@@ -0,0 +1,80 @@
+"""
+Unit tests for the persistent embedding cache.
+"""
+
+import time
+import asyncio
+
+from langchain_core.embeddings import Embeddings
+
+from src.core.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    """Fake embeddings that record which texts reached the 'API'."""
+
+    def __init__(self):
+        self.seen = []
+
+    def embed_documents(self, texts):
+        self.seen.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        # Queries embed differently from documents, like Vertex AI's RETRIEVAL_QUERY task type
+        self.seen.append(text)
+        return [float(len(text)), -1.0]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+def test_only_misses_reach_the_api(tmp_path):
+    fake = CountingEmbeddings()
+    cache = CachedEmbeddings(fake, "model-a", path=str(tmp_path / "cache.sqlite3"))
+
+    assert cache.embed_documents(["a", "bb", "a"]) == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert cache.embed_documents(["bb", "ccc"]) == [[2.0, 1.0], [3.0, 1.0]]
+    assert fake.seen == ["a", "bb", "ccc"]
+    assert cache.stats()["size"] == 3
+
+
+def test_queries_and_documents_are_cached_separately(tmp_path):
+    fake = CountingEmbeddings()
+    cache = CachedEmbeddings(fake, "model-a", path=str(tmp_path / "cache.sqlite3"))
+
+    assert cache.embed_documents(["ccc"]) == [[3.0, 1.0]]
+    assert cache.embed_query("ccc") == [3.0, -1.0]
+    assert asyncio.run(cache.aembed_query("ccc")) == [3.0, -1.0]
+    assert cache.embed_documents(["ccc"]) == [[3.0, 1.0]]
+
+    assert fake.seen == ["ccc", "ccc"]
+    assert cache.stats()["size"] == 2
+
+
+def test_cache_persists_and_is_keyed_by_model(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    CachedEmbeddings(CountingEmbeddings(), "model-a", path=path).embed_query("hello")
+
+    same_model = CountingEmbeddings()
+    CachedEmbeddings(same_model, "model-a", path=path).embed_query("hello")
+    assert same_model.seen == []
+
+    other_model = CountingEmbeddings()
+    CachedEmbeddings(other_model, "model-b", path=path).embed_query("hello")
+    assert other_model.seen == ["hello"]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    fake = CountingEmbeddings()
+    cache = CachedEmbeddings(fake, "model-a", path=str(tmp_path / "cache.sqlite3"), max_entries=2)
+
+    for text in ["a", "bb", "a", "ccc"]:  # the second "a" refreshes it, "ccc" evicts "bb"
+        cache.embed_query(text)
+        time.sleep(0.01)
+
+    fake.seen.clear()
+    cache.embed_query("a")
+    cache.embed_query("bb")
+    assert fake.seen == ["bb"]
+    assert cache.stats()["evictions"] >= 1
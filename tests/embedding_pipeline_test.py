@@ -0,0 +1,77 @@
+"""
+Unit tests for the batched embedding pipeline used during ingestion.
+"""
+
+import time
+import threading
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from src.core.embedding_pipeline import EmbeddingPipeline, TokenBucket
+
+
+class FlakyEmbeddings(Embeddings):
+    """Fake embeddings that fail the first `failures` calls."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = 0
+        self.max_batch = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls += 1
+            self.max_batch = max(self.max_batch, len(texts))
+            if self.failures > 0:
+                self.failures -= 1
+                raise RuntimeError("503 Service Unavailable")
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text))]
+
+
+def make_pipeline(embeddings, **kwargs):
+    options = {"batch_size": 3, "max_concurrency": 4, "requests_per_minute": 0, "max_retries": 2, "backoff_base": 0.001}
+    options.update(kwargs)
+    return EmbeddingPipeline(embeddings, **options)
+
+
+def test_batches_preserve_order():
+    fake = FlakyEmbeddings()
+    pipeline = make_pipeline(fake)
+    texts = ["x" * n for n in range(1, 11)]
+
+    assert pipeline.embed_documents(texts) == [[float(n)] for n in range(1, 11)]
+    assert fake.max_batch == 3
+
+    stats = pipeline.stats()
+    assert stats["chunks"] == 10
+    assert stats["batches"] == 4
+    assert stats["chunks_per_second"] > 0
+
+
+def test_transient_failures_are_retried():
+    pipeline = make_pipeline(FlakyEmbeddings(failures=2), max_concurrency=1)
+
+    assert pipeline.embed_documents(["a", "bb"]) == [[1.0], [2.0]]
+    assert pipeline.stats()["retries"] == 2
+
+
+def test_persistent_failure_is_raised():
+    pipeline = make_pipeline(FlakyEmbeddings(failures=10), max_concurrency=1)
+
+    with pytest.raises(RuntimeError):
+        pipeline.embed_documents(["a"])
+    assert pipeline.stats()["failures"] == 1
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50.0, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # The first token is free, the remaining five refill at 50 tokens/s
+    assert time.monotonic() - start >= 0.09
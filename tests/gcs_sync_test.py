@@ -0,0 +1,131 @@
+"""
+Unit tests for the manifest-based vector store sync.
+
+Runs against LocalBucket, a filesystem stand-in for the GCS bucket.
+"""
+
+import os
+
+import pytest
+
+from src.core.gcs_sync import CURRENT_POINTER, LOCAL_MANIFEST, LocalBucket, StoreSync, build_manifest
+
+
+def write(directory, relative, content):
+    path = os.path.join(directory, *relative.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as target:
+        target.write(content)
+
+
+def read(directory, relative):
+    with open(os.path.join(directory, *relative.split("/")), encoding="utf-8") as source:
+        return source.read()
+
+
+class FailingBucket(LocalBucket):
+    """Fails every upload after the first `allowed` ones, like a dropped connection."""
+
+    def __init__(self, root, allowed):
+        super().__init__(root)
+        self.allowed = allowed
+        self.uploads = 0
+
+    def upload_file(self, name, path):
+        self.uploads += 1
+        if self.uploads > self.allowed:
+            raise ConnectionError("connection reset")
+        super().upload_file(name, path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    source = str(tmp_path / "source")
+    write(source, "chroma.sqlite3", "sqlite")
+    write(source, "segment/data_level0.bin", "vectors")
+    write(source, "bm25_index.json", "{}")
+    write(source, "abc.kbsnap", "snapshot")
+    return source
+
+
+def test_upload_and_download_only_transfer_changes(tmp_path, store):
+    sync = StoreSync(LocalBucket(str(tmp_path / "bucket")), "vector_store", workers=4)
+    first = sync.upload(store, exclude=("*.kbsnap",))
+    assert (first["uploaded"], first["skipped"]) == (3, 0)
+    assert sync.upload(store, exclude=("*.kbsnap",)) == dict(first, uploaded=0, skipped=3, bytes=0)
+
+    replica = str(tmp_path / "replica")
+    assert sync.download(replica)["downloaded"] == 3
+    assert read(replica, "segment/data_level0.bin") == "vectors"
+    assert not os.path.exists(os.path.join(replica, "abc.kbsnap"))
+
+    write(store, "segment/data_level0.bin", "new vectors")
+    os.remove(os.path.join(store, "bm25_index.json"))
+    second = sync.upload(store, exclude=("*.kbsnap",))
+    assert second["version"] != first["version"]
+    assert (second["uploaded"], second["skipped"]) == (1, 1)
+
+    result = sync.download(replica)
+    assert (result["version"], result["downloaded"], result["skipped"], result["removed"]) == (second["version"], 1, 1, 1)
+    assert read(replica, "segment/data_level0.bin") == "new vectors"
+    assert not os.path.exists(os.path.join(replica, "bm25_index.json"))
+    assert build_manifest(replica) == build_manifest(store, exclude=("*.kbsnap",))
+    assert os.path.exists(os.path.join(replica, LOCAL_MANIFEST))
+
+
+def test_interrupted_upload_keeps_the_old_version_current_and_resumes(tmp_path, store):
+    bucket_root = str(tmp_path / "bucket")
+    sync = StoreSync(LocalBucket(bucket_root), "vector_store", workers=1)
+    first = sync.upload(store)
+
+    for name in ("chroma.sqlite3", "segment/data_level0.bin", "bm25_index.json"):
+        write(store, name, f"changed {name}")
+    failing = StoreSync(FailingBucket(bucket_root, allowed=2), "vector_store", workers=1)
+    with pytest.raises(ConnectionError):
+        failing.upload(store)
+    assert sync.current_version() == first["version"]
+
+    # Readers still get the complete old version
+    replica = str(tmp_path / "replica")
+    sync.download(replica)
+    assert read(replica, "chroma.sqlite3") == "sqlite"
+
+    resumed = sync.upload(store)
+    assert resumed["uploaded"] == 1
+    assert sync.current_version() == resumed["version"]
+
+
+def test_download_rejects_corrupt_objects(tmp_path, store):
+    bucket = LocalBucket(str(tmp_path / "bucket"))
+    sync = StoreSync(bucket, "vector_store")
+    sync.upload(store)
+    sha256 = build_manifest(store)["chroma.sqlite3"]["sha256"]
+    write(str(tmp_path / "bucket"), f"vector_store/objects/{sha256}", "tampered")
+
+    replica = str(tmp_path / "replica")
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        sync.download(replica)
+    assert not os.path.exists(os.path.join(replica, "chroma.sqlite3"))
+    assert not os.path.exists(os.path.join(replica, LOCAL_MANIFEST))
+
+
+def test_old_versions_and_their_objects_are_collected(tmp_path, store):
+    bucket = LocalBucket(str(tmp_path / "bucket"))
+    sync = StoreSync(bucket, "vector_store", keep_versions=2)
+    versions = []
+    for i in range(4):
+        write(store, "chroma.sqlite3", f"sqlite {i}")
+        versions.append(sync.upload(store)["version"])
+
+    manifests = bucket.list_names("vector_store/versions/")
+    assert len(manifests) == 2
+    assert sync.current_version() == versions[-1]
+    assert bucket.read_text(f"vector_store/{CURRENT_POINTER}") == versions[-1]
+    # Three unchanged files plus the chroma.sqlite3 of the two kept versions
+    assert len(bucket.list_names("vector_store/objects/")) == 5
+
+
+def test_download_without_any_upload_fails(tmp_path):
+    sync = StoreSync(LocalBucket(str(tmp_path / "bucket")), "vector_store")
+    with pytest.raises(FileNotFoundError):
+        sync.download(str(tmp_path / "replica"))
@@ -0,0 +1,107 @@
+"""
+Unit tests for the BM25 index and the hybrid retriever.
+"""
+
+from typing import List
+
+import numpy as np
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.core.bm25_index import BM25Index
+from src.core.hybrid_retriever import HybridRetriever
+from src.core.vector_snapshot import RELEVANCE_SCORE
+
+TEXTS = [
+    "AI-First companies design products around machine learning from day one.",
+    "Cloud Run scales containers based on request concurrency.",
+    "Prompt engineering techniques for GPT-4o and Gemini models.",
+    "Zaawansowane strategie prompt engineering dla modeli językowych.",
+]
+
+
+class StaticRetriever(BaseRetriever):
+    """Vector retriever stand-in that returns fixed documents and counts calls."""
+
+    documents: List[Document]
+    calls: int = 0
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        self.calls += 1
+        return self.documents
+
+
+def make_index():
+    return BM25Index.build([f"id{i}" for i in range(len(TEXTS))], TEXTS, [{"section": f"s{i}"} for i in range(len(TEXTS))])
+
+
+def test_bm25_ranks_exact_terms_and_handles_polish(tmp_path):
+    index = make_index()
+    assert index.search("Cloud Run concurrency", 1)[0][0] == 1
+    assert index.search("strategie językowych", 1)[0][0] == 3
+
+    path = str(tmp_path / "bm25_index.json")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.search("Cloud Run concurrency", 1) == index.search("Cloud Run concurrency", 1)
+    assert loaded.document(1).metadata == {"section": "s1"}
+
+
+def test_high_term_overlap_skips_vector_search():
+    vector = StaticRetriever(documents=[Document(page_content=TEXTS[0])])
+    retriever = HybridRetriever(vector_retriever=vector, bm25_index=make_index(), k=2, lexical_only_overlap=1.0)
+
+    results = retriever.invoke("Cloud Run concurrency")
+
+    assert results[0].page_content == TEXTS[1]
+    assert vector.calls == 0
+    assert retriever.stats()["lexical"] == 1
+
+
+def test_hybrid_fuses_lexical_and_vector_results():
+    vector = StaticRetriever(documents=[Document(page_content=TEXTS[0]), Document(page_content=TEXTS[2])])
+    retriever = HybridRetriever(vector_retriever=vector, bm25_index=make_index(), k=3, lexical_only_overlap=1.0)
+
+    results = retriever.invoke("prompt engineering for startups")
+    contents = [document.page_content for document in results]
+
+    assert vector.calls == 1
+    # The chunk found by both retrievers ranks first and is not duplicated
+    assert contents[0] == TEXTS[2]
+    assert len(contents) == len(set(contents)) == 3
+
+
+def test_fusion_keeps_the_vector_relevance_score_of_chunks_bm25_also_found():
+    vector = StaticRetriever(documents=[
+        Document(page_content=TEXTS[2], metadata={"section": "s2", RELEVANCE_SCORE: 0.9}),
+        Document(page_content=TEXTS[0], metadata={"section": "s0", RELEVANCE_SCORE: 0.3}),
+    ])
+    retriever = HybridRetriever(vector_retriever=vector, bm25_index=make_index(), k=3, lexical_only_overlap=1.0)
+
+    results = retriever.invoke("prompt engineering for startups")
+
+    # BM25 ranks TEXTS[2] first, but its copy carries no score
+    assert results[0].page_content == TEXTS[2]
+    assert results[0].metadata == {"section": "s2", RELEVANCE_SCORE: 0.9}
+    assert max(document.metadata.get(RELEVANCE_SCORE, 0.0) for document in results) == 0.9
+
+
+def test_mmr_diversifies_the_fused_candidates():
+    vectors = {"id0": [0.0, 0.0, 1.0], "id1": [0.0, 1.0, 0.0], "id2": [1.0, 0.0, 0.0], "id3": [0.99, 0.1, 0.0]}
+    vector = StaticRetriever(documents=[Document(page_content=TEXTS[i], id=f"id{i}") for i in (2, 3, 1, 0)])
+
+    def document_vectors(ids):
+        return np.array([vectors[chunk_id] for chunk_id in ids])
+
+    def retrieve(mmr_lambda):
+        retriever = HybridRetriever(
+            vector_retriever=vector, bm25_index=make_index(), k=2, lexical_only_overlap=1.0,
+            mmr_lambda=mmr_lambda, document_vectors=document_vectors,
+        )
+        return [document.page_content for document in retriever.invoke("prompt engineering for startups")]
+
+    # Both prompt engineering chunks top the fused ranking, but they are near-duplicates
+    assert retrieve(None) == [TEXTS[2], TEXTS[3]]
+    assert retrieve(0.5) == [TEXTS[2], TEXTS[1]]
+    assert retrieve(1.0) == [TEXTS[2], TEXTS[3]]
@@ -0,0 +1,72 @@
+"""
+Unit tests for the single-flight component initializer.
+"""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+from src.agents.initializer import ComponentInitializer, IDLE, READY, FAILED
+
+
+def test_concurrent_callers_initialize_once():
+    calls = []
+
+    def initialize(timer):
+        with timer.stage("vector_db"):
+            calls.append(threading.current_thread().name)
+            time.sleep(0.05)
+
+    initializer = ComponentInitializer(initialize)
+    assert initializer.status()["state"] == IDLE
+
+    threads = [threading.Thread(target=initializer.ensure_ready) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    status = initializer.status()
+    assert status["state"] == READY and status["ready"]
+    assert status["attempts"] == 1
+    assert status["components"]["vector_db"] >= 0.05
+
+
+def test_failed_initialization_is_retried_by_next_caller():
+    attempts = []
+
+    def initialize(timer):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise FileNotFoundError("vector store missing")
+
+    initializer = ComponentInitializer(initialize)
+    with pytest.raises(FileNotFoundError):
+        initializer.ensure_ready()
+    assert initializer.status()["state"] == FAILED
+    assert initializer.status()["error"] == "vector store missing"
+
+    initializer.ensure_ready()
+    assert initializer.ready
+    assert initializer.status()["error"] is None
+    assert len(attempts) == 2
+
+
+def test_background_warm_up_is_awaited_by_requests():
+    started = threading.Event()
+
+    def initialize(timer):
+        started.set()
+        time.sleep(0.05)
+
+    initializer = ComponentInitializer(initialize)
+    initializer.start_background()
+    assert started.wait(1.0)
+    assert not initializer.ready
+
+    asyncio.run(initializer.aensure_ready())
+    assert initializer.ready
+    assert initializer.status()["attempts"] == 1
@@ -22,14 +22,15 @@ def test_telegram_webhook():
     """
     # Get environment variables
     webhook_url = os.getenv("WEBHOOK_URL")
-    bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+    secret_token = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+    webhook_path = os.getenv("TELEGRAM_WEBHOOK_PATH", "/telegram")
     
     # Validate required environment variables
     assert webhook_url, "WEBHOOK_URL environment variable is required"
-    assert bot_token, "TELEGRAM_BOT_TOKEN environment variable is required"
+    assert secret_token, "TELEGRAM_WEBHOOK_SECRET environment variable is required"
     
     # Construct the full webhook URL
-    full_url = f"{webhook_url}/{bot_token}"
+    full_url = f"{webhook_url.rstrip('/')}/{webhook_path.lstrip('/')}"
     
     # Create a sample Telegram webhook payload
     # This simulates a message from a user asking about AI-First concept
@@ -60,7 +61,7 @@ def test_telegram_webhook():
             full_url,
             json=payload,
             timeout=30,  # Give enough time for AI processing
-            headers={"Content-Type": "application/json"}
+            headers={"Content-Type": "application/json", "X-Telegram-Bot-Api-Secret-Token": secret_token}
         )
         
         # Verify the response
@@ -0,0 +1,62 @@
+"""
+Unit tests for the local fast-path intent router.
+"""
+
+from src.agents.intent_router import IntentRouter, KnowledgeQuestionRule, LocalModelClassifier, TimeQueryRule
+from src.core.models import GetCurrentTime, SearchKnowledgeBase
+
+
+def make_router():
+    """Create a router with the built-in rules and a fixed threshold."""
+    return IntentRouter([TimeQueryRule(), KnowledgeQuestionRule()], threshold=0.85)
+
+
+def test_time_query_with_alias_is_resolved_locally():
+    command = make_router().route("What time is it in Warsaw?")
+    assert isinstance(command, GetCurrentTime)
+    assert command.timezone == "Europe/Warsaw"
+
+
+def test_time_query_with_tz_database_city():
+    command = make_router().route("what's the current time in Los Angeles")
+    assert isinstance(command, GetCurrentTime)
+    assert command.timezone == "America/Los_Angeles"
+
+
+def test_time_query_without_location_defaults_to_utc():
+    command = make_router().route("Która godzina?")
+    assert isinstance(command, GetCurrentTime)
+    assert command.timezone == "UTC"
+
+
+def test_unknown_location_falls_back_to_llm():
+    router = make_router()
+    assert router.route("What time is it in Warszawie?") is None
+    assert router.stats()["llm"] == 1
+
+
+def test_knowledge_question_is_resolved_locally():
+    command = make_router().route("What is AI-First?")
+    assert isinstance(command, SearchKnowledgeBase)
+    assert command.query == "What is AI-First?"
+
+
+def test_time_related_knowledge_question_goes_to_llm():
+    assert make_router().route("What is the time complexity of attention?") is None
+
+
+def test_local_model_classifier_and_stats():
+    class StubModel:
+        classes_ = ["get_current_time", "search_knowledge_base"]
+
+        def predict_proba(self, texts):
+            return [[0.97, 0.03]]
+
+    router = IntentRouter([LocalModelClassifier(StubModel())], threshold=0.9)
+    command = router.route("clock in Tokyo")
+    assert isinstance(command, GetCurrentTime)
+    assert command.timezone == "Asia/Tokyo"
+
+    stats = router.stats()
+    assert stats["local_model"] == 1
+    assert stats["fast_path_rate"] == 1.0
@@ -0,0 +1,379 @@
+"""
+Unit tests for the Parse-Execute-Supervise pipeline in src.agents.main_agent.
+
+The AI components are replaced with deterministic stand-ins, so no model,
+vector store or network access is needed.
+"""
+
+import re
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+from pydantic import BaseModel
+
+import src.agents.main_agent as main_agent
+from src.agents.supervision import SupervisionPolicy
+from src.core.config import config
+from src.core.conversation_memory import ChatHistory, ConversationMemory, InMemoryBackend
+from src.core.metrics import StageTimer
+from src.core.models import GetCurrentTime, SearchKnowledgeBase
+from src.core.semantic_cache import SemanticCache
+from src.core.vector_snapshot import RELEVANCE_SCORE
+
+
+class StubLLM:
+    """Chat model returning canned replies and recording its prompts."""
+
+    def __init__(self, reply="Grounded answer."):
+        self.reply = reply
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return SimpleNamespace(content=self.reply)
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+    async def astream(self, prompt):
+        self.prompts.append(prompt)
+        for piece in re.findall(r"\S+\s*", self.reply):
+            yield SimpleNamespace(content=piece)
+
+
+class StubParser:
+    """Structured-output parser treating every message as a knowledge base question."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return SearchKnowledgeBase(query=prompt.rsplit("\n", 1)[-1].strip() or "question")
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+
+class StubRetriever:
+    def __init__(self, documents=None):
+        self.documents = documents if documents is not None else [
+            Document(page_content="Cloud Run costs 5 USD a month.", metadata={"section": "costs.md", "headings": "Costs"}),
+        ]
+        self.queries = []
+
+    def invoke(self, query):
+        self.queries.append(query)
+        if isinstance(self.documents, Exception):
+            raise self.documents
+        return self.documents
+
+    async def ainvoke(self, query):
+        return self.invoke(query)
+
+
+class StubAgentExecutor:
+    def __init__(self, output="Agent answer."):
+        self.output = output
+        self.inputs = []
+
+    def invoke(self, inputs):
+        self.inputs.append(inputs)
+        return {"output": self.output}
+
+    async def ainvoke(self, inputs):
+        return self.invoke(inputs)
+
+
+class StubEmbeddings:
+    """Every query gets the same vector, so any cached answer would be a hit."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [1.0, 0.0, 0.0]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+class ReadyInitializer:
+    def ensure_ready(self):
+        pass
+
+    async def aensure_ready(self):
+        pass
+
+
+@pytest.fixture
+def components(monkeypatch, tmp_path):
+    components = {
+        "parser_llm": StubParser(),
+        "executor_llm": StubLLM(),
+        "supervisor_llm": StubLLM("APPROVED"),
+        "retriever": StubRetriever(),
+        "agent_executor": StubAgentExecutor(),
+        "embeddings": StubEmbeddings(),
+    }
+    monkeypatch.setattr(main_agent, "AI_COMPONENTS", components)
+    monkeypatch.setattr(main_agent, "agent_initializer", ReadyInitializer())
+    monkeypatch.setattr(main_agent, "_CONCURRENCY_LIMITER", None)
+    monkeypatch.setattr(main_agent, "semantic_cache", SemanticCache(store_dir=str(tmp_path)))
+    monkeypatch.setattr(main_agent, "supervision_policy", SupervisionPolicy(policy="never"))
+    monkeypatch.setattr(main_agent, "conversation_memory", ConversationMemory(InMemoryBackend(max_chats=10, idle_ttl=3600)))
+    monkeypatch.setattr(config, "EXECUTION_MODE", main_agent.EXECUTION_DIRECT)
+    monkeypatch.setattr(config, "INTENT_ROUTER_ENABLED", False)
+    monkeypatch.setattr(config, "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "MEMORY_ENABLED", True)
+    return components
+
+
+def run(coroutine):
+    """Run a pipeline coroutine, then let its background tasks (memory, supervision) finish."""
+    async def main():
+        result = await coroutine
+        await asyncio.gather(*main_agent._BACKGROUND_TASKS)
+        return result
+
+    return asyncio.run(main())
+
+
+def stream_final(events):
+    assert [event.kind for event in events][-1] == "final"
+    return events[-1].text
+
+
+def test_semantic_cache_is_not_consulted_for_follow_ups(components):
+    assert main_agent.process_query("How much does Cloud Run cost?", chat_id="first") == "Grounded answer."
+    assert main_agent.semantic_cache.stats()["size"] == 1
+
+    # Another chat's follow-up would match the cached answer, but depends on its own history
+    main_agent.conversation_memory.append("second", "Tell me about Cloud Build.", "It builds containers.")
+    components["executor_llm"].reply = "Cloud Build costs 3 USD."
+    calls = components["embeddings"].calls
+    assert main_agent.process_query("and how much does it cost?", chat_id="second") == "Cloud Build costs 3 USD."
+    assert run(main_agent.aprocess_query("and per build?", chat_id="second")) == "Cloud Build costs 3 USD."
+
+    async def stream():
+        return [event async for event in main_agent.astream_query("and per minute?", chat_id="second")]
+
+    assert stream_final(run(stream())) == "Cloud Build costs 3 USD."
+    assert components["embeddings"].calls == calls
+    assert main_agent.semantic_cache.stats()["hits"] == 0
+
+
+def test_time_requests_are_routed_before_the_semantic_cache_and_never_embedded(components, monkeypatch):
+    monkeypatch.setattr(config, "INTENT_ROUTER_ENABLED", True)
+    routed = main_agent.intent_router.stats()["total"]
+
+    main_agent.process_query("What time is it in Warsaw?")
+    run(main_agent.aprocess_query("What time is it in Tokyo?"))
+
+    async def stream():
+        return [event async for event in main_agent.astream_query("What time is it in London?")]
+
+    stream_final(run(stream()))
+    assert components["embeddings"].calls == 0
+    assert components["parser_llm"].prompts == []
+    assert components["retriever"].queries == []
+    assert main_agent.intent_router.stats()["total"] == routed + 3  # routed once per request
+
+    # Knowledge base questions the router resolves still go through the cache
+    assert main_agent.process_query("How much does Cloud Run cost?") == "Grounded answer."
+    assert components["embeddings"].calls == 1
+    assert main_agent.semantic_cache.stats()["size"] == 1
+
+
+def test_memory_is_written_after_the_reply_is_returned(components, monkeypatch):
+    summarizing, release, summarized = threading.Event(), threading.Event(), threading.Event()
+
+    def slow_summarizer(summary, turns):
+        summarizing.set()
+        release.wait(timeout=5)
+        summarized.set()
+        return "Asked about Cloud Run."
+
+    memory = ConversationMemory(InMemoryBackend(max_chats=10, idle_ttl=3600), max_turns=2, summarizer=slow_summarizer)
+    monkeypatch.setattr(main_agent, "conversation_memory", memory)
+    memory.append("chat", "What is Cloud Run?", "A container platform.")
+
+    # The reply does not wait for the summarizer folding the first exchange away
+    assert main_agent.process_query("How much does it cost?", chat_id="chat") == "Grounded answer."
+    assert not summarized.is_set()
+    assert summarizing.wait(timeout=5)
+    release.set()
+    history = memory.history("chat")  # waits for the write in progress
+    assert history.summary == "Asked about Cloud Run."
+    assert [text for _, text in history.turns] == ["How much does it cost?", "Grounded answer."]
+
+    async def ask():
+        summarizing.clear()
+        release.clear()
+        summarized.clear()
+        answer = await main_agent.aprocess_query("Is there a free tier?", chat_id="chat")
+        assert not summarized.is_set()
+        await asyncio.to_thread(summarizing.wait, 5)
+        release.set()
+        return answer
+
+    assert run(ask()) == "Grounded answer."
+    assert memory.history("chat").turns[0] == ("user", "Is there a free tier?")
+
+
+def test_follow_ups_skip_the_local_router_and_go_to_the_parser(components, monkeypatch):
+    monkeypatch.setattr(config, "INTENT_ROUTER_ENABLED", True)
+    parser = components["parser_llm"]
+    parser.invoke = lambda prompt: parser.prompts.append(prompt) or GetCurrentTime(timezone="Asia/Tokyo")
+
+    # Without history the catch-all knowledge rule answers locally
+    assert main_agent.parse_command("and in Tokyo?") == SearchKnowledgeBase(query="and in Tokyo?")
+    assert parser.prompts == []
+
+    history = ChatHistory()
+    history.turns.extend([("user", "What time is it in Warsaw?"), ("assistant", "It is 10:00 in Warsaw.")])
+    assert main_agent.parse_command("and in Tokyo?", history) == GetCurrentTime(timezone="Asia/Tokyo")
+    assert asyncio.run(main_agent.aparse_command("and in Tokyo?", history)) == GetCurrentTime(timezone="Asia/Tokyo")
+    assert len(parser.prompts) == 2
+    assert all("What time is it in Warsaw?" in prompt for prompt in parser.prompts)
+
+
+@pytest.mark.parametrize("mode, documents, expected", [
+    (main_agent.EXECUTION_DIRECT, None, "Grounded answer."),
+    (main_agent.EXECUTION_DIRECT, [], "Agent answer."),  # nothing retrieved
+    (main_agent.EXECUTION_DIRECT, RuntimeError("store offline"), "Agent answer."),
+    (main_agent.EXECUTION_AGENT, None, "Agent answer."),
+])
+def test_async_pipeline_matches_the_sync_one(components, monkeypatch, mode, documents, expected):
+    monkeypatch.setattr(config, "EXECUTION_MODE", mode)
+    monkeypatch.setattr(config, "SEMANTIC_CACHE_ENABLED", False)
+    if documents is not None:
+        components["retriever"].documents = documents
+
+    assert main_agent.process_query("How much does Cloud Run cost?") == expected
+    assert run(main_agent.aprocess_query("How much does Cloud Run cost?")) == expected
+    parser, executor = components["parser_llm"], components["executor_llm"]
+    assert parser.prompts[0] == parser.prompts[1]
+    if expected == "Grounded answer.":
+        assert executor.prompts[0] == executor.prompts[1]
+        assert "Cloud Run costs 5 USD a month." in executor.prompts[0]
+    else:
+        agent_inputs = components["agent_executor"].inputs
+        assert len(agent_inputs) == 2 and agent_inputs[0] == agent_inputs[1]
+
+
+def test_async_parser_matches_the_sync_one(components, monkeypatch):
+    monkeypatch.setattr(config, "INTENT_ROUTER_ENABLED", True)
+    for text in ("What time is it in Tokyo?", "How much does Cloud Run cost?"):
+        assert asyncio.run(main_agent.aparse_command(text)) == main_agent.parse_command(text)
+
+    monkeypatch.setattr(config, "INTENT_ROUTER_ENABLED", False)
+    text = "How much does Cloud Run cost?"
+    assert asyncio.run(main_agent.aparse_command(text)) == main_agent.parse_command(text)
+    assert components["parser_llm"].prompts[0] == components["parser_llm"].prompts[1]
+
+
+def test_async_execute_handles_unknown_commands_like_the_sync_one(components):
+    class UnknownCommand(BaseModel):
+        pass
+
+    command = UnknownCommand()
+    expected = main_agent.execute_command(command)
+    assert expected == "I'm not sure how to handle that request."
+    assert asyncio.run(main_agent.aexecute_command(command)) == expected
+
+
+def test_pipeline_errors_return_the_apology(components):
+    def broken_parser(prompt):
+        raise RuntimeError("parser unavailable")
+
+    components["parser_llm"].invoke = broken_parser
+    apology = "I'm sorry, an error occurred while processing your request."
+    assert main_agent.process_query("How much does Cloud Run cost?", chat_id="chat") == apology
+    assert run(main_agent.aprocess_query("How much does Cloud Run cost?", chat_id="chat")) == apology
+    # Failed exchanges are not remembered
+    assert not main_agent.conversation_memory.history("chat")
+
+
+def test_answer_directly_grounds_one_completion_in_the_retrieved_chunks(components):
+    timer = StageTimer()
+    history = ChatHistory()
+    history.turns.extend([("user", "What is Cloud Run?"), ("assistant", "A container platform.")])
+    assert main_agent.answer_directly("Cloud Run price", timer, history) == "Grounded answer."
+    assert components["retriever"].queries == ["Cloud Run price"]
+    prompt, = components["executor_llm"].prompts
+    assert "[1] (costs.md > Costs)\nCloud Run costs 5 USD a month." in prompt
+    assert "A container platform." in prompt
+    assert set(timer.stages) == {"retrieve", "generate"}
+
+    assert asyncio.run(main_agent.aanswer_directly("Cloud Run price", history=history)) == "Grounded answer."
+    assert components["executor_llm"].prompts[1] == prompt
+
+
+@pytest.mark.parametrize("retrieved, reply", [
+    ([], "unused"),  # nothing retrieved
+    (None, ""),  # empty completion
+])
+def test_answer_directly_returns_none_when_it_has_no_answer(components, retrieved, reply):
+    if retrieved is not None:
+        components["retriever"].documents = retrieved
+    components["executor_llm"].reply = reply
+    assert main_agent.answer_directly("Cloud Run price") is None
+    assert asyncio.run(main_agent.aanswer_directly("Cloud Run price")) is None
+    if retrieved == []:
+        assert components["executor_llm"].prompts == []
+
+
+@pytest.mark.parametrize("retrieved, reply", [
+    (None, "Grounded answer."),
+    ([], "unused"),
+    (RuntimeError("store offline"), "unused"),
+    (None, RuntimeError("model overloaded")),
+])
+def test_execute_falls_back_to_the_agent_only_without_a_direct_answer(components, retrieved, reply):
+    if retrieved is not None:
+        components["retriever"].documents = retrieved
+    components["executor_llm"].reply = reply
+    command = SearchKnowledgeBase(query="Cloud Run price")
+    direct = reply == "Grounded answer."
+
+    for execute in (main_agent.execute_command, lambda *args: asyncio.run(main_agent.aexecute_command(*args))):
+        timer = StageTimer()
+        assert execute(command, timer) == ("Grounded answer." if direct else "Agent answer.")
+        assert timer.path == (main_agent.EXECUTION_DIRECT if direct else main_agent.EXECUTION_AGENT)
+        assert ("agent" in timer.stages) != direct
+    assert len(components["agent_executor"].inputs) == (0 if direct else 2)
+
+
+@pytest.mark.parametrize("score, supervised", [(0.2, True), (0.9, False), (None, False)])
+def test_adaptive_supervision_uses_the_score_of_the_answering_retrieval(components, monkeypatch, score, supervised):
+    monkeypatch.setattr(config, "SEMANTIC_CACHE_ENABLED", False)
+    policy = SupervisionPolicy(policy="adaptive", sample_rate=0.0, score_threshold=0.5)
+    monkeypatch.setattr(main_agent, "supervision_policy", policy)
+    metadata = {"section": "costs.md"} if score is None else {"section": "costs.md", RELEVANCE_SCORE: score}
+    components["retriever"].documents = [
+        Document(page_content="Cloud Run costs 5 USD a month.", metadata=metadata),
+        Document(page_content="Cloud Run bills per request.", metadata={"section": "billing.md"}),  # BM25 hits carry no score
+    ]
+    components["supervisor_llm"].reply = "Cloud Run costs about 5 USD a month."
+
+    async def stream():
+        return [event async for event in main_agent.astream_query("How much does Cloud Run cost?")]
+
+    answers = [
+        main_agent.process_query("How much does Cloud Run cost?"),
+        run(main_agent.aprocess_query("How much does Cloud Run cost?")),
+        stream_final(run(stream())),
+    ]
+    expected = "Cloud Run costs about 5 USD a month." if supervised else "Grounded answer."
+    assert answers == [expected] * 3
+    assert len(components["supervisor_llm"].prompts) == (3 if supervised else 0)
+    # No second search: the vector store is not even among the stubbed components
+    assert "vector_db" not in components
+    assert len(components["retriever"].queries) == 3
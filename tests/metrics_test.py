@@ -0,0 +1,56 @@
+"""
+Unit tests for the per-stage pipeline metrics.
+"""
+
+import time
+
+from src.core.metrics import StageTimer, PipelineMetrics
+
+
+def test_stage_timer_accumulates_stages():
+    timer = StageTimer()
+    with timer.stage("retrieve"):
+        time.sleep(0.01)
+    with timer.stage("generate"):
+        pass
+    with timer.stage("retrieve"):
+        time.sleep(0.01)
+    timer.path = "direct"
+
+    assert list(timer.stages) == ["retrieve", "generate"]
+    assert timer.stages["retrieve"] >= 0.02
+    assert timer.total() >= timer.stages["retrieve"]
+    assert timer.summary().startswith("[direct] retrieve=")
+
+
+def test_stage_is_recorded_when_the_block_raises():
+    timer = StageTimer()
+    try:
+        with timer.stage("agent"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert "agent" in timer.stages
+
+
+def test_pipeline_metrics_aggregates_paths_and_stages():
+    metrics = PipelineMetrics(window=3)
+    for seconds, path in [(0.1, "direct"), (0.2, "direct"), (0.3, "agent"), (0.4, "agent")]:
+        timer = StageTimer()
+        timer.stages["generate"] = seconds
+        timer.path = path
+        metrics.record(timer)
+
+    stats = metrics.stats()
+    assert stats["paths"] == {"direct": 2, "agent": 2}
+    generate = stats["stages"]["generate"]
+    # Only the last `window` samples are kept
+    assert generate["count"] == 3
+    assert generate["p50"] == 0.3
+    assert generate["max"] == 0.4
+    assert abs(generate["mean"] - 0.3) < 1e-9
+    assert stats["stages"]["total"]["count"] == 3
+
+    metrics.clear()
+    assert metrics.stats() == {"paths": {}, "stages": {}}
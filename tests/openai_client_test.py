@@ -0,0 +1,63 @@
+"""
+Unit tests for the WhatsApp backend's pooled OpenAI client.
+
+Requests go to an httpx MockTransport, so no network access is needed.
+"""
+
+import json
+import asyncio
+
+import httpx
+
+from backend import openai_client
+from backend.openai_client import OpenAIClientManager
+
+
+def completion_handler(request: httpx.Request) -> httpx.Response:
+    """Answer chat completion requests with a fixed reply."""
+    body = json.loads(request.content)
+    return httpx.Response(200, json={
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": body["model"],
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": f"echo: {body['messages'][-1]['content']}"},
+        }],
+    })
+
+
+def test_requests_share_one_client_and_report_metrics(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    manager = OpenAIClientManager(transport=httpx.MockTransport(completion_handler))
+    monkeypatch.setattr(openai_client, "openai_manager", manager)
+
+    async def run():
+        await manager.start()
+        replies = await asyncio.gather(*(openai_client.get_ai_response(f"hi {i}") for i in range(5)))
+        metrics = manager.metrics()
+        await manager.aclose()
+        return replies, metrics
+
+    replies, metrics = asyncio.run(run())
+    assert replies == [f"echo: hi {i}" for i in range(5)]
+    assert metrics["clients_created"] == 1
+    assert metrics["requests"] == 5
+    assert metrics["errors"] == 0
+    assert metrics["in_flight"] == 0
+    assert 1 <= metrics["max_in_flight"] <= 5
+    assert not manager.metrics()["started"]
+
+
+def test_failed_calls_are_counted(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(openai_client, "OPENAI_MAX_RETRIES", 0)
+    manager = OpenAIClientManager(transport=httpx.MockTransport(lambda request: httpx.Response(500, json={})))
+    monkeypatch.setattr(openai_client, "openai_manager", manager)
+
+    reply = asyncio.run(openai_client.get_ai_response("hi"))
+    assert reply == "I'm experiencing technical difficulties. Please try again later."
+    assert manager.metrics()["errors"] == 1
+    asyncio.run(manager.aclose())
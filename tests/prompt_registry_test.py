@@ -0,0 +1,69 @@
+"""
+Unit tests for the local prompt registry.
+"""
+
+import pytest
+
+from src.prompts.registry import PromptRegistry, prompt_registry, PARSER, SUPERVISOR, DIRECT_RAG, EXECUTOR
+from src.prompts.templates import NO_HISTORY
+
+
+def test_builtin_prompts_render_without_network():
+    parser_prompt = prompt_registry.render(PARSER, user_input="What is {AI-First}?")
+    assert 'User Request: "What is {AI-First}?"' in parser_prompt
+
+    supervisor_prompt = prompt_registry.render(SUPERVISOR, original_query="q", generated_answer="a")
+    assert 'Original User Query: "q"' in supervisor_prompt
+    assert "APPROVED" in supervisor_prompt
+
+    rag_prompt = prompt_registry.render(DIRECT_RAG, context="[1] (notes.md)\nchunk", query="q")
+    assert "[1] (notes.md)\nchunk" in rag_prompt
+
+
+def test_executor_prompt_matches_tool_calling_agent_inputs():
+    executor_prompt = prompt_registry.get(EXECUTOR)
+    assert set(executor_prompt.input_variables) == {"input", "agent_scratchpad"}
+    assert "chat_history" in executor_prompt.optional_variables
+
+
+def test_latest_version_is_served_unless_pinned():
+    registry = PromptRegistry(pinned={})
+    registry.register("greeting", "v1", "Hello {name}")
+    registry.register("greeting", "v2", "Hi {name}")
+
+    assert registry.versions("greeting") == ["v1", "v2"]
+    assert registry.render("greeting", name="Ala") == "Hi Ala"
+    assert registry.get("greeting", "v1").format(name="Ala") == "Hello Ala"
+
+    pinned = PromptRegistry(pinned={"greeting": "v1"})
+    pinned.register("greeting", "v1", "Hello {name}")
+    pinned.register("greeting", "v2", "Hi {name}")
+    assert pinned.render("greeting", name="Ala") == "Hello Ala"
+
+
+def test_unknown_prompts_and_duplicate_versions_are_rejected():
+    registry = PromptRegistry(pinned={})
+    registry.register("greeting", "v1", "Hello {name}")
+
+    with pytest.raises(KeyError):
+        registry.get("missing")
+    with pytest.raises(KeyError):
+        registry.get("greeting", "v9")
+    with pytest.raises(ValueError):
+        registry.register("greeting", "v1", "Hey {name}")
+
+
+def test_v2_prompts_include_the_chat_history():
+    parser_prompt = prompt_registry.render(PARSER, user_input="and in Tokyo?", history="User: time in Warsaw?")
+    assert "User: time in Warsaw?" in parser_prompt
+    assert 'User Request: "and in Tokyo?"' in parser_prompt
+    # Older versions ignore variables they do not use, so pinning them stays safe
+    assert "User: hi" not in prompt_registry.get(PARSER, "v1").format(user_input="q", history="User: hi")
+
+    rag_prompt = prompt_registry.render(DIRECT_RAG, context="chunk", query="q", history="User: hi")
+    assert "Conversation so far:\nUser: hi" in rag_prompt
+
+
+def test_v2_prompts_render_without_a_history():
+    assert NO_HISTORY in prompt_registry.render(PARSER, user_input="q")
+    assert NO_HISTORY in prompt_registry.render(DIRECT_RAG, context="chunk", query="q")
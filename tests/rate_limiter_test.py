@@ -0,0 +1,70 @@
+"""
+Unit tests for the Telegram bot's GCRA rate limiter.
+"""
+
+import threading
+
+from src.core import rate_limiter as rate_limiter_module
+from src.core.rate_limiter import RateLimiter, ShardedMemoryBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(monkeypatch, **backend_kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter_module.time, "time", clock)
+    limiter = RateLimiter(limit=3, window=30, backend=ShardedMemoryBackend(**backend_kwargs))
+    return limiter, clock
+
+
+def test_burst_then_steady_rate(monkeypatch):
+    limiter, clock = make_limiter(monkeypatch, shards=4, sweep_interval=60)
+
+    assert [limiter.is_allowed(1) for _ in range(4)] == [True, True, True, False]
+    assert limiter.get_reset_time(1) == 10.0
+    assert limiter.is_allowed(2)
+
+    clock.now += 10
+    assert limiter.acquire(1) == (True, 0.0)
+    allowed, wait = limiter.acquire(1)
+    assert not allowed
+    assert wait == 10.0
+
+
+def test_reset_time_does_not_create_state_and_idle_users_are_swept(monkeypatch):
+    limiter, clock = make_limiter(monkeypatch, shards=2, sweep_interval=60)
+
+    assert limiter.get_reset_time(42) == 0.0
+    assert limiter.tracked_users() == 0
+
+    for user_id in range(100):
+        limiter.is_allowed(user_id)
+    assert limiter.tracked_users() == 100
+
+    # Every arrival time has passed by the next sweep, so only the new request's user remains per shard
+    clock.now += 60
+    for user_id in range(1000, 1010):
+        limiter.is_allowed(user_id)
+    assert limiter.tracked_users() == 10
+
+
+def test_concurrent_requests_admit_exactly_the_limit():
+    limiter = RateLimiter(limit=50, window=3600, backend=ShardedMemoryBackend(shards=4, sweep_interval=60))
+    admitted = []
+
+    def worker():
+        admitted.extend(limiter.is_allowed(7) for _ in range(25))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert admitted.count(True) == 50
@@ -0,0 +1,123 @@
+"""
+Unit tests for the fair scheduler in front of the agent pipeline.
+"""
+
+import asyncio
+
+import pytest
+
+from src.core.scheduler import FairScheduler, SchedulerBusy, PRIORITY_HIGH
+
+
+async def hold(scheduler: FairScheduler, user_id: str, order: list, release: asyncio.Event, priority: int = 1):
+    async with scheduler.slot(user_id, priority):
+        order.append(user_id)
+        await release.wait()
+
+
+def test_waiting_users_are_served_round_robin_with_priority_first():
+    async def run():
+        scheduler = FairScheduler(concurrency=1, max_queue=10, max_queue_per_user=5)
+        order, release, done = [], asyncio.Event(), asyncio.Event()
+        done.set()
+
+        blocker = asyncio.create_task(hold(scheduler, "blocker", order, release))
+        await asyncio.sleep(0)
+        # A spammer queues first, then two other users, then a cheap time request
+        tasks = [asyncio.create_task(hold(scheduler, "spammer", order, done)) for _ in range(3)]
+        tasks += [asyncio.create_task(hold(scheduler, user, order, done)) for user in ("alice", "bob")]
+        tasks.append(asyncio.create_task(hold(scheduler, "clock", order, done, PRIORITY_HIGH)))
+        await asyncio.sleep(0)
+        stats = scheduler.stats()
+
+        release.set()
+        await asyncio.gather(blocker, *tasks)
+        return order, stats, scheduler.stats()
+
+    order, queued, finished = asyncio.run(run())
+    assert order == ["blocker", "clock", "spammer", "alice", "bob", "spammer", "spammer"]
+    assert queued["queue_depth"] == 6
+    assert queued["queued_users"] == 4
+    assert finished["running"] == 0
+    assert finished["queue_depth"] == 0
+    assert finished["admitted"] == 7
+    assert finished["high_priority"] == 1
+
+
+def test_full_queue_and_per_user_share_are_rejected():
+    async def run():
+        scheduler = FairScheduler(concurrency=1, max_queue=3, max_queue_per_user=2)
+        order, release = [], asyncio.Event()
+        tasks = [asyncio.create_task(hold(scheduler, "busy", order, release))]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(hold(scheduler, "spammer", order, release)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(SchedulerBusy):
+            async with scheduler.slot("spammer"):
+                pass
+        tasks.append(asyncio.create_task(hold(scheduler, "alice", order, release)))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerBusy):
+            async with scheduler.slot("bob"):
+                pass
+
+        release.set()
+        await asyncio.gather(*tasks)
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["rejected"] == 2
+    assert stats["admitted"] == 4
+
+
+def test_cancelled_waiters_leave_the_queue():
+    async def run():
+        scheduler = FairScheduler(concurrency=1, max_queue=5, max_queue_per_user=5)
+        order, release = [], asyncio.Event()
+        blocker = asyncio.create_task(hold(scheduler, "blocker", order, release))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold(scheduler, "impatient", order, release))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        depth = scheduler.stats()["queue_depth"]
+
+        release.set()
+        await blocker
+        async with scheduler.slot("late"):
+            order.append("late")
+        return order, depth, scheduler.stats()
+
+    order, depth, stats = asyncio.run(run())
+    assert depth == 0
+    assert order == ["blocker", "late"]
+    assert stats["running"] == 0
+
+
+def test_release_in_the_same_tick_as_a_cancel_skips_the_cancelled_waiter():
+    async def run():
+        scheduler = FairScheduler(concurrency=1, max_queue=5, max_queue_per_user=5)
+        order, release = [], asyncio.Event()
+        holder = scheduler.slot("holder")
+        await holder.__aenter__()
+        cancelled = asyncio.create_task(hold(scheduler, "cancelled", order, release))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold(scheduler, "waiter", order, release))
+        await asyncio.sleep(0)
+
+        # The cancelled request's cleanup has not run yet when the slot is freed
+        cancelled.cancel()
+        await holder.__aexit__(None, None, None)
+        await asyncio.sleep(0)
+        stats = scheduler.stats()
+
+        release.set()
+        await asyncio.wait_for(waiter, timeout=1)
+        await asyncio.gather(cancelled, return_exceptions=True)
+        return order, stats, scheduler.stats()
+
+    order, during, finished = asyncio.run(run())
+    assert order == ["waiter"]
+    assert (during["running"], during["queue_depth"]) == (1, 0)
+    assert (finished["running"], finished["queue_depth"]) == (0, 0)
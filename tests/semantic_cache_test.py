@@ -0,0 +1,86 @@
+"""
+Unit tests for the semantic answer cache.
+
+These tests exercise similarity matching, LRU/TTL eviction and invalidation
+on vector store rebuilds without any network access.
+"""
+
+import os
+import time
+
+from src.core.semantic_cache import SemanticCache
+from src.core.vector_snapshot import POINTER_FILE
+
+
+def make_cache(tmp_path, **kwargs):
+    """Create a cache bound to a temporary vector store directory."""
+    store_dir = tmp_path / "vector_store"
+    store_dir.mkdir(exist_ok=True)
+    options = {"threshold": 0.95, "max_entries": 10, "ttl": 3600, "store_dir": str(store_dir)}
+    options.update(kwargs)
+    return SemanticCache(**options)
+
+
+def test_near_duplicate_query_hits(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store("What is AI-First?", [1.0, 0.0, 0.0], "AI-First means...")
+
+    assert cache.lookup([0.99, 0.05, 0.0]) == "AI-First means..."
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_lru_eviction(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.store("a", [1.0, 0.0, 0.0], "A")
+    cache.store("b", [0.0, 1.0, 0.0], "B")
+
+    # Touch "a" so that "b" becomes the least recently used entry
+    assert cache.lookup([1.0, 0.0, 0.0]) == "A"
+    cache.store("c", [0.0, 0.0, 1.0], "C")
+
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0, 0.0]) == "A"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiration(tmp_path):
+    cache = make_cache(tmp_path, ttl=0.05)
+    cache.store("a", [1.0, 0.0], "A")
+    time.sleep(0.1)
+
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_invalidated_when_vector_store_changes(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store("a", [1.0, 0.0], "A")
+
+    marker = tmp_path / "vector_store" / "chroma.sqlite3"
+    marker.write_text("rebuilt")
+    future = time.time() + 10
+    os.utime(marker, (future, future))
+
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_invalidated_when_a_snapshot_in_its_own_directory_changes(tmp_path):
+    snapshot_dir = tmp_path / "snapshots"
+    snapshot_dir.mkdir()
+    cache = make_cache(tmp_path, snapshot_dir=str(snapshot_dir))
+    cache.store("a", [1.0, 0.0], "A")
+    assert cache.lookup([1.0, 0.0]) == "A"
+
+    pointer = snapshot_dir / POINTER_FILE
+    pointer.write_text("snapshot-new.bin")
+    future = time.time() + 10
+    os.utime(pointer, (future, future))
+
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.stats()["invalidations"] == 1
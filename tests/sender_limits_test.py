@@ -0,0 +1,103 @@
+"""
+Unit tests for the WhatsApp backend's per-sender rate limiter and message coalescer.
+"""
+
+import asyncio
+
+from backend import rate_limiter
+from backend.rate_limiter import TokenBucketLimiter, parse_rate
+from backend.coalescer import MessageCoalescer
+
+ALICE = "whatsapp:+48111111111"
+BOB = "whatsapp:+48222222222"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_parse_rate_accepts_both_formats():
+    assert parse_rate("10/minute") == parse_rate("10") == 10 / 60
+
+
+def test_buckets_are_per_sender_with_burst_and_refill(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    limiter = TokenBucketLimiter(rate_per_second=1.0, burst=3)
+
+    assert [limiter.acquire(ALICE)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.acquire(ALICE)
+    assert not allowed
+    assert retry_after == 1.0
+    # A chatty sender does not throttle anyone else
+    assert limiter.acquire(BOB)[0]
+
+    clock.now += 1.0
+    assert limiter.acquire(ALICE)[0]
+    assert not limiter.acquire(ALICE)[0]
+    assert limiter.metrics()["rejected"] == 2
+
+
+def test_idle_and_excess_senders_are_evicted(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    limiter = TokenBucketLimiter(rate_per_second=1.0, burst=2, max_keys=3)
+
+    for i in range(5):
+        limiter.acquire(f"whatsapp:+4800000000{i}")
+    assert len(limiter) == 3
+
+    # Once a bucket has refilled it is dropped; the sender starts over with a full burst
+    clock.now += 2.0
+    limiter.acquire(ALICE)
+    assert len(limiter) == 1
+    assert limiter.acquire(ALICE)[0]
+
+
+def test_burst_is_merged_into_one_flush():
+    flushed = []
+
+    async def run():
+        coalescer = MessageCoalescer(window=0.05, max_messages=5)
+        # A single message is answered at once; the second one within the window opens a batch
+        assert coalescer.add(ALICE, "hi", lambda sender, text: flushed.append((sender, text)))
+        assert coalescer.add(ALICE, "how are you?", lambda sender, text: flushed.append((sender, text)))
+        assert not coalescer.add(ALICE, "all good?", lambda *_: flushed.append("wrong callback"))
+        assert coalescer.add(BOB, "hello", lambda sender, text: flushed.append((sender, text)))
+        immediate = list(flushed)
+        await asyncio.sleep(0.1)
+        return coalescer, immediate
+
+    coalescer, immediate = asyncio.run(run())
+    assert immediate == [(ALICE, "hi"), (BOB, "hello")]
+    assert flushed == immediate + [(ALICE, "how are you?\nall good?")]
+    assert coalescer.merged == 1
+    assert len(coalescer) == 0
+
+
+def test_submit_returns_merged_text_to_the_first_request_only():
+    async def run():
+        coalescer = MessageCoalescer(window=10.0, max_messages=3)
+        alone = await asyncio.wait_for(coalescer.submit(ALICE, "zero"), 1.0)
+        first = asyncio.create_task(coalescer.submit(ALICE, "one"))
+        await asyncio.sleep(0)
+        # Reaching max_messages flushes without waiting for the window
+        later = await asyncio.gather(coalescer.submit(ALICE, "two"), coalescer.submit(ALICE, "three"))
+        return alone, await asyncio.wait_for(first, 1.0), later
+
+    alone, first, later = asyncio.run(run())
+    assert alone == "zero"
+    assert first == "one\ntwo\nthree"
+    assert later == [None, None]
+
+
+def test_zero_window_disables_coalescing():
+    async def run():
+        coalescer = MessageCoalescer(window=0)
+        return [await coalescer.submit(ALICE, "one"), await coalescer.submit(ALICE, "two")]
+
+    assert asyncio.run(run()) == ["one", "two"]
@@ -0,0 +1,146 @@
+"""
+Unit tests for progressive rendering of streamed answers into Telegram messages.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import BadRequest, RetryAfter
+
+import src.bots.streaming as streaming
+from src.bots.streaming import STREAM_CURSOR, TelegramStreamWriter, split_for_stream
+
+
+class StubBot:
+    """Records Bot API calls instead of talking to Telegram."""
+
+    def __init__(self, failures=None):
+        self.calls = []
+        self.messages = {}
+        self.failures = list(failures or [])
+
+    def _fail(self):
+        if self.failures:
+            raise self.failures.pop(0)
+
+    async def send_message(self, chat_id, text):
+        self._fail()
+        message_id = len(self.calls) + 1
+        self.calls.append(("send", message_id, text))
+        self.messages[message_id] = text
+        return SimpleNamespace(message_id=message_id)
+
+    async def edit_message_text(self, chat_id, message_id, text):
+        self._fail()
+        self.calls.append(("edit", message_id, text))
+        self.messages[message_id] = text
+
+    async def delete_message(self, chat_id, message_id):
+        self.calls.append(("delete", message_id, None))
+        del self.messages[message_id]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(streaming, "time", clock)
+    return clock
+
+
+def test_split_for_stream_cuts_at_whitespace():
+    assert split_for_stream("", 10) == [""]
+    assert split_for_stream("short", 10) == ["short"]
+    assert split_for_stream("one two three four", 9) == ["one two", "three", "four"]
+    assert split_for_stream("abcdefghijkl", 5) == ["abcde", "fghij", "kl"]
+    # Earlier pieces stay the same as more text arrives
+    assert split_for_stream("one two three four five", 9)[:2] == ["one two", "three"]
+
+
+def test_edits_are_throttled_to_the_edit_interval(clock):
+    bot = StubBot()
+    writer = TelegramStreamWriter(bot, chat_id=1, edit_interval=1.0)
+
+    async def run():
+        await writer.append("Hello")
+        clock.now += 0.5
+        await writer.append(" world")  # within the interval: buffered
+        assert bot.calls == [("send", 1, "Hello" + STREAM_CURSOR)]
+        clock.now += 0.6
+        await writer.append(", again")
+        await writer.finish()
+
+    asyncio.run(run())
+    assert bot.calls == [
+        ("send", 1, "Hello" + STREAM_CURSOR),
+        ("edit", 1, "Hello world, again" + STREAM_CURSOR),
+        ("edit", 1, "Hello world, again"),
+    ]
+    assert writer.message_count == 1
+
+
+def test_long_answers_roll_over_into_new_messages(clock):
+    bot = StubBot()
+    writer = TelegramStreamWriter(bot, chat_id=1, max_length=4096, edit_interval=0.0)
+    word = "x" * 99 + " "
+
+    async def run():
+        for _ in range(50):  # 5000 characters
+            await writer.append(word)
+        await writer.finish()
+
+    asyncio.run(run())
+    assert writer.message_count == 2
+    assert all(len(text) <= 4096 for text in bot.messages.values())
+    assert "".join(bot.messages.values()).replace(" ", "") == "x" * 99 * 50
+    assert not any(text.endswith(STREAM_CURSOR) for text in bot.messages.values())
+
+
+def test_revised_final_answer_replaces_and_trims_the_streamed_messages(clock):
+    bot = StubBot()
+    writer = TelegramStreamWriter(bot, chat_id=1, max_length=20, edit_interval=0.0)
+
+    async def run():
+        await writer.append("first part of a long answer")
+        await writer.finish("Short answer.")
+
+    asyncio.run(run())
+    assert list(bot.messages.values()) == ["Short answer."]
+    assert bot.calls[-1][0] == "delete"
+
+
+def test_finish_on_an_empty_stream_sends_nothing(clock):
+    bot = StubBot()
+    writer = TelegramStreamWriter(bot, chat_id=1)
+
+    async def run():
+        await writer.append("   ")
+        await writer.finish()
+        await writer.finish("")
+
+    asyncio.run(run())
+    assert bot.calls == []
+    assert writer.message_count == 0
+
+
+def test_flood_control_is_retried_and_unchanged_edits_ignored(clock):
+    bot = StubBot(failures=[RetryAfter(0)])
+    writer = TelegramStreamWriter(bot, chat_id=1, edit_interval=0.0)
+
+    async def run():
+        await writer.append("Hi")
+        bot.failures.append(BadRequest("Message is not modified"))
+        await writer.finish()
+
+    asyncio.run(run())
+    assert bot.calls == [("send", 1, "Hi" + STREAM_CURSOR)]
+    assert bot.failures == []
+    assert writer.message_count == 1
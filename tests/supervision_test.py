@@ -0,0 +1,67 @@
+"""
+Unit tests for the supervision policy engine.
+"""
+
+import json
+import random
+
+from src.agents.supervision import SupervisionPolicy, VerdictLog, SKIP, SYNC, ASYNC
+from src.core.models import GetCurrentTime, SearchKnowledgeBase
+
+
+def test_deterministic_tools_are_never_supervised():
+    policy = SupervisionPolicy(policy="adaptive", sample_rate=1.0, score_threshold=0.5)
+    command = GetCurrentTime(timezone="UTC")
+
+    assert not policy.needs_retrieval_score(command)
+    assert policy.decide(command).mode == SKIP
+
+
+def test_low_retrieval_score_is_supervised_synchronously():
+    policy = SupervisionPolicy(policy="adaptive", sample_rate=0.0, score_threshold=0.5)
+    command = SearchKnowledgeBase(query="What is AI-First?")
+
+    assert policy.needs_retrieval_score(command)
+    assert policy.decide(command, retrieval_score=0.2).mode == SYNC
+    assert policy.decide(command, retrieval_score=0.9).mode == SKIP
+
+
+def test_sampling_rate_controls_background_supervision():
+    policy = SupervisionPolicy(policy="adaptive", sample_rate=0.25, score_threshold=0.0, rng=random.Random(42))
+    command = SearchKnowledgeBase(query="What is AI-First?")
+
+    modes = [policy.decide(command, retrieval_score=0.9).mode for _ in range(1000)]
+    assert set(modes) == {SKIP, ASYNC}
+    assert 200 < modes.count(ASYNC) < 300
+
+
+def test_fixed_policies():
+    command = GetCurrentTime(timezone="UTC")
+    assert SupervisionPolicy(policy="always").decide(command).mode == SYNC
+    assert SupervisionPolicy(policy="never").decide(SearchKnowledgeBase(query="q")).mode == SKIP
+
+
+def test_stats_report_saved_supervisor_calls():
+    policy = SupervisionPolicy(policy="adaptive", sample_rate=0.0, score_threshold=0.5)
+    skip = policy.decide(GetCurrentTime(timezone="UTC"))
+    sync = policy.decide(SearchKnowledgeBase(query="q"), retrieval_score=0.1)
+    policy.record(skip, 0.001, supervisor_calls=0)
+    policy.record(sync, 1.2, supervisor_calls=1)
+
+    stats = policy.stats()
+    assert stats["decisions"] == 2
+    assert stats["supervisor_calls"] == 1
+    assert stats["supervisor_calls_saved"] == 1
+    assert stats["modes"][SKIP]["reasons"] == {"deterministic_tool": 1}
+    assert stats["modes"][SYNC]["inline_seconds"] == 1.2
+
+
+def test_verdict_log_records_revisions(tmp_path):
+    log_path = tmp_path / "verdicts.jsonl"
+    log = VerdictLog(str(log_path))
+    log.record("q1", "a1", "APPROVED", "sampled")
+    log.record("q2", "a2", "A better answer.", "sampled")
+
+    entries = [json.loads(line) for line in log_path.read_text(encoding="utf-8").splitlines()]
+    assert [entry["verdict"] for entry in entries] == ["approved", "revised"]
+    assert entries[1]["revision"] == "A better answer."
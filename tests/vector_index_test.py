@@ -0,0 +1,90 @@
+"""
+Unit tests for the in-process NumPy vector indexes.
+"""
+
+import numpy as np
+import pytest
+
+from src.core.vector_index import ExactIndex, IVFIndex, build_vector_index, normalize_rows
+from src.core.vector_snapshot import SnapshotVectorStore, quantize, write_snapshot
+from tests.vector_snapshot_test import KeywordEmbeddings, TEXTS, write_example
+
+
+def clustered_corpus(rows=2000, dim=32, clusters=20, seed=1):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    matrix = centers[rng.integers(clusters, size=rows)] + 0.3 * rng.normal(size=(rows, dim))
+    queries = centers[rng.integers(clusters, size=25)] + 0.3 * rng.normal(size=(25, dim))
+    return normalize_rows(matrix), queries.astype(np.float32)
+
+
+def brute_force(matrix, queries, k):
+    scores = normalize_rows(queries) @ matrix.T
+    return [list(np.argsort(-row, kind="stable")[:k]) for row in scores]
+
+
+def test_exact_index_matches_brute_force_in_batch_and_alone():
+    matrix, queries = clustered_corpus()
+    index = ExactIndex(matrix, block_rows=300)
+
+    batch = index.search_batch(queries, k=10)
+    assert [[position for position, _ in hits] for hits in batch] == brute_force(matrix, queries, 10)
+    alone = index.search(queries[3], k=10)
+    assert [position for position, _ in alone] == [position for position, _ in batch[3]]
+    assert batch[0][0][1] == pytest.approx(float(normalize_rows(queries[0]) @ matrix[batch[0][0][0]]), abs=1e-5)
+
+
+def test_quantized_in_place_index_stays_close_to_exact():
+    matrix, queries = clustered_corpus()
+    vectors, scales = quantize(matrix, "int8")
+    in_place = build_vector_index(vectors, scales, "mmap")
+    in_memory = build_vector_index(vectors, scales, "exact")
+
+    assert in_memory.vectors.dtype == np.float32 and in_memory.vectors.flags.c_contiguous
+    expected = brute_force(matrix, queries, 10)
+    for hits, other, truth in zip(in_place.search_batch(queries, 10), in_memory.search_batch(queries, 10), expected):
+        assert [position for position, _ in hits] == [position for position, _ in other]
+        assert len({position for position, _ in hits} & set(truth)) >= 9
+
+
+def test_ivf_index_recall_and_mask():
+    matrix, queries = clustered_corpus()
+    expected = brute_force(matrix, queries, 10)
+
+    # Probing every list is an exact search
+    full = IVFIndex(matrix, n_lists=16, n_probe=16)
+    assert [[position for position, _ in hits] for hits in full.search_batch(queries, 10)] == expected
+
+    partial = IVFIndex(matrix, n_lists=45, n_probe=4)
+    found = [{position for position, _ in hits} for hits in partial.search_batch(queries, 10)]
+    recall = np.mean([len(hits & set(truth)) / 10 for hits, truth in zip(found, expected)])
+    assert recall >= 0.9
+
+    mask = np.zeros(len(matrix), dtype=bool)
+    mask[::2] = True
+    hits = partial.search(queries[0], 10, mask)
+    assert hits and all(position % 2 == 0 for position, _ in hits)
+    assert len(partial.search(queries[0], 10, np.zeros(len(matrix), dtype=bool))) == 0
+
+
+def test_store_batch_search_with_each_index(tmp_path):
+    path = write_example(tmp_path)
+    queries = ["delivery", "returns", "opening hours"]
+    for kind in ("mmap", "exact", "ivf"):
+        store = SnapshotVectorStore.load(path, KeywordEmbeddings(), index=kind, n_lists=2, n_probe=2)
+        batch = store.similarity_search_batch_with_score(queries, k=1)
+        assert [hits[0][0].page_content for hits in batch] == [TEXTS[1], TEXTS[3], TEXTS[0]]
+        assert store.similarity_search(queries[0], k=1)[0].page_content == TEXTS[1]
+
+        filtered = store.similarity_search_batch_with_score(queries, k=4, filter={"section": "returns"})
+        assert [[document.metadata["section"] for document, _ in hits] for hits in filtered] == [["returns"]] * 3
+
+    with pytest.raises(ValueError):
+        SnapshotVectorStore.load(path, KeywordEmbeddings(), index="hnsw")
+
+
+def test_empty_snapshot_searches_return_nothing(tmp_path):
+    path = write_snapshot(str(tmp_path), [], [], [], np.zeros((0, 4)))
+    for kind in ("mmap", "exact", "ivf"):
+        store = SnapshotVectorStore.load(path, KeywordEmbeddings(), index=kind)
+        assert store.similarity_search("delivery", k=3) == []
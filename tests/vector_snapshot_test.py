@@ -0,0 +1,138 @@
+"""
+Unit tests for the binary vector snapshot format.
+"""
+
+import os
+from typing import List
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from src.core.bm25_index import BM25Index
+from src.core.vector_snapshot import (
+    POINTER_FILE, RELEVANCE_SCORE, SnapshotVectorStore, VectorSnapshot, resolve_snapshot_path, write_snapshot,
+)
+
+TEXTS = [
+    "Opening hours are nine to five on weekdays.",
+    "Delivery takes two business days.",
+    "Zażółć gęślą jaźń — unicode survives the round trip.",
+    "Returns are accepted within thirty days.",
+]
+SECTIONS = ["hours", "shipping", "misc", "returns"]
+
+
+class KeywordEmbeddings(Embeddings):
+    """Deterministic embeddings: one dimension per keyword."""
+
+    KEYWORDS = ["hours", "delivery", "unicode", "returns"]
+
+    def _embed(self, text: str) -> List[float]:
+        text = text.lower()
+        return [1.0 if keyword in text else 0.05 for keyword in self.KEYWORDS]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def write_example(directory, dtype="float16", bm25=True):
+    ids = [f"chunk-{i}" for i in range(len(TEXTS))]
+    metadatas = [{"section": section, "source": "kb.md"} for section in SECTIONS]
+    embeddings = KeywordEmbeddings().embed_documents(TEXTS)
+    bm25_index = BM25Index.build(ids, TEXTS, metadatas) if bm25 else None
+    return write_snapshot(str(directory), ids, TEXTS, metadatas, embeddings, dtype=dtype,
+                          bm25_index=bm25_index, model="keyword-test")
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_round_trip_and_exact_search(tmp_path, dtype):
+    path = write_example(tmp_path, dtype)
+    snapshot = VectorSnapshot(path, verify=True)
+
+    assert (len(snapshot), snapshot.dim, snapshot.dtype, snapshot.model) == (4, 4, dtype, "keyword-test")
+    assert [snapshot.text(i) for i in range(4)] == TEXTS
+    assert snapshot.document(2).metadata == {"section": "misc", "source": "kb.md"}
+    assert snapshot.document(2).id == "chunk-2"
+
+    # The matrix is a view onto the mapped file, not a copy
+    assert not snapshot.vectors.flags.owndata
+
+    matrix = np.array(KeywordEmbeddings().embed_documents(TEXTS), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    query = np.array(KeywordEmbeddings().embed_query("returns policy"), dtype=np.float32)
+    expected = matrix @ (query / np.linalg.norm(query))
+    hits = snapshot.search(query, k=4)
+    assert hits[0][0] == int(np.argmax(expected))
+    assert [score for _, score in hits] == pytest.approx(sorted(expected, reverse=True), abs=0.01)
+    snapshot.close()
+
+
+def test_store_filters_like_chroma_and_restores_bm25(tmp_path):
+    store = SnapshotVectorStore.load(write_example(tmp_path), KeywordEmbeddings())
+
+    retriever = store.as_retriever(search_kwargs={"k": 2, "filter": {"section": {"$in": ["hours", "shipping"]}}})
+    documents = retriever.invoke("delivery time")
+    assert [document.metadata["section"] for document in documents] == ["shipping", "hours"]
+
+    scored = store.similarity_search_with_relevance_scores("opening hours", k=1)
+    assert scored[0][0].metadata["section"] == "hours"
+    assert scored[0][1] == pytest.approx(1.0, abs=0.01)
+
+    bm25_index = store.snapshot.bm25_index()
+    assert bm25_index.search("thirty days", k=1)[0][0] == 3
+    assert bm25_index.document(3).page_content == TEXTS[3]
+
+    # Chunks found by BM25 can be diversified with their stored embeddings
+    vectors = store.document_vectors(["chunk-3", "chunk-0"])
+    expected = np.array(KeywordEmbeddings().embed_documents([TEXTS[3], TEXTS[0]]))
+    assert vectors == pytest.approx(expected, abs=0.01)
+    assert store.document_vectors(["chunk-3", "unknown"]) is None
+
+    with pytest.raises(NotImplementedError):
+        store.add_texts(["new"])
+
+
+@pytest.mark.parametrize("search_type, search_kwargs", [
+    ("similarity", {"k": 2}),
+    ("mmr", {"k": 2, "fetch_k": 4}),
+])
+def test_retrieved_documents_carry_their_relevance_score(tmp_path, search_type, search_kwargs):
+    store = SnapshotVectorStore.load(write_example(tmp_path), KeywordEmbeddings())
+    expected = {document.page_content: score for document, score in
+                store.similarity_search_with_relevance_scores("returns policy", k=4)}
+
+    documents = store.as_retriever(search_type=search_type, search_kwargs=search_kwargs).invoke("returns policy")
+    assert documents[0].page_content == TEXTS[3]
+    for document in documents:
+        assert document.metadata[RELEVANCE_SCORE] == pytest.approx(expected[document.page_content])
+    # Stamping the score does not leak into the snapshot's own metadata
+    assert RELEVANCE_SCORE not in store.snapshot.metadatas[3]
+
+
+def test_files_are_named_by_content_and_old_snapshots_pruned(tmp_path):
+    first = write_example(tmp_path, bm25=False)
+    assert write_example(tmp_path, bm25=False) == first
+    assert resolve_snapshot_path(str(tmp_path)) == first
+
+    second = write_example(tmp_path, bm25=True)
+    assert second != first
+    assert not os.path.exists(first)
+    assert resolve_snapshot_path(str(tmp_path)) == second
+    with open(tmp_path / POINTER_FILE, encoding="utf-8") as pointer_file:
+        assert pointer_file.read() == os.path.basename(second)
+    assert resolve_snapshot_path(str(tmp_path / "missing")) is None
+
+
+def test_verify_detects_corruption(tmp_path):
+    path = write_example(tmp_path)
+    with open(path, "r+b") as snapshot_file:
+        snapshot_file.seek(-8, os.SEEK_END)
+        snapshot_file.write(b"garbage!")
+
+    VectorSnapshot(path).close()
+    with pytest.raises(ValueError, match="corrupt"):
+        VectorSnapshot(path, verify=True)
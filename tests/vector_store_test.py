@@ -0,0 +1,151 @@
+"""
+Unit tests for the incremental vector store build in src.core.vector_store.
+
+Vertex AI is replaced with deterministic keyword embeddings, and the
+knowledge base and vector store live in a temporary directory.
+"""
+
+import os
+from typing import List
+
+import pytest
+from chromadb.api.client import SharedSystemClient
+
+import src.core.vector_store as vector_store
+from src.core.config import config
+from src.core.vector_snapshot import resolve_snapshot_path
+from tests.vector_snapshot_test import KeywordEmbeddings
+
+SECTIONS = {
+    "hours.md": "Opening hours are nine to five on weekdays.",
+    "shipping.md": "Delivery takes two business days.",
+    "returns.md": "Returns are accepted within thirty days.",
+}
+
+
+class StubVertexEmbeddings(KeywordEmbeddings):
+    """Stands in for VertexAIEmbeddings; records embedded texts and can fail after a number of calls."""
+
+    embedded: List[str] = []
+    fail_after = None
+
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.fail_after is not None and len(self.embedded) >= self.fail_after:
+            raise RuntimeError("quota exceeded")
+        StubVertexEmbeddings.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def write_knowledge_base(path, sections):
+    parts = ["# Zbiorczy zrzut plików: LLM\n"]
+    for name, text in sections.items():
+        parts.append(f"---\n\n## {name}\n```md\n{text}\n```\n")
+    path.write_text("\n".join(parts), encoding="utf-8")
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    knowledge_base = tmp_path / "wiedza.md"
+    store_dir = tmp_path / "vector_store"
+    monkeypatch.setattr(vector_store, "KNOWLEDGE_BASE_FILE", str(knowledge_base))
+    monkeypatch.setattr(vector_store, "VertexAIEmbeddings", StubVertexEmbeddings)
+    monkeypatch.setattr(StubVertexEmbeddings, "embedded", [])
+    monkeypatch.setattr(StubVertexEmbeddings, "fail_after", None)
+    monkeypatch.setattr(config, "VECTOR_STORE_DIR", str(store_dir))
+    monkeypatch.setattr(config, "CHUNK_WORKERS", 1)
+    monkeypatch.setattr(config, "DEDUP_ENABLED", False)
+    monkeypatch.setattr(config, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(config, "EMBEDDING_BATCH_SIZE", 1)
+    monkeypatch.setattr(config, "EMBEDDING_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(config, "EMBEDDING_MAX_RETRIES", 0)
+    monkeypatch.setattr(config, "EMBEDDING_REQUESTS_PER_MINUTE", 60000.0)
+    monkeypatch.setattr(config, "EMBEDDING_CHECKPOINT_SIZE", 1)
+    return knowledge_base, store_dir
+
+
+def build(full_rebuild=False):
+    """Run an ingest like a fresh process would; Chroma caches one client per path otherwise."""
+    SharedSystemClient.clear_system_cache()
+    vector_store.create_vector_store(full_rebuild=full_rebuild)
+
+
+def manifest_sections(store_dir):
+    manifest = vector_store._load_manifest(str(store_dir / vector_store.MANIFEST_FILE))
+    return sorted(manifest["chunks"].values())
+
+
+def embedded_texts():
+    texts = list(StubVertexEmbeddings.embedded)
+    StubVertexEmbeddings.embedded.clear()
+    return sorted(texts)
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    assert vector_store._load_manifest(path) is None
+    manifest = {"settings": vector_store._ingest_settings(), "chunks": {"abc": "hours.md"}}
+    vector_store._save_manifest(path, manifest)
+    assert vector_store._load_manifest(path) == manifest
+    assert not os.path.exists(f"{path}.tmp")
+
+    with open(path, "w", encoding="utf-8") as manifest_file:
+        manifest_file.write('{"settings": ')  # truncated write
+    assert vector_store._load_manifest(path) is None
+
+
+def test_only_added_chunks_are_embedded_and_removed_ones_deleted(store):
+    knowledge_base, store_dir = store
+    write_knowledge_base(knowledge_base, SECTIONS)
+    build()
+    assert embedded_texts() == sorted(SECTIONS.values())
+    assert manifest_sections(store_dir) == sorted(SECTIONS)
+    assert resolve_snapshot_path(str(store_dir)) is not None
+
+    # Unchanged knowledge base: nothing to embed
+    build()
+    assert embedded_texts() == []
+
+    changed = dict(SECTIONS)
+    del changed["returns.md"]
+    changed["hours.md"] = "Opening hours are ten to six on weekdays."
+    write_knowledge_base(knowledge_base, changed)
+    build()
+    assert embedded_texts() == [changed["hours.md"]]
+    assert manifest_sections(store_dir) == ["hours.md", "shipping.md"]
+    db = vector_store.Chroma(persist_directory=str(store_dir))
+    assert sorted(db.get()["documents"]) == sorted(changed.values())
+
+
+def test_changed_settings_rebuild_the_store(store, monkeypatch):
+    knowledge_base, store_dir = store
+    write_knowledge_base(knowledge_base, SECTIONS)
+    build()
+    embedded_texts()
+
+    monkeypatch.setattr(config, "EMBEDDING_MODEL", "another-embedding-model")
+    build()
+    assert embedded_texts() == sorted(SECTIONS.values())
+    settings = vector_store._load_manifest(str(store_dir / vector_store.MANIFEST_FILE))["settings"]
+    assert settings["embedding_model"] == "another-embedding-model"
+
+    build(full_rebuild=True)
+    assert embedded_texts() == sorted(SECTIONS.values())
+
+
+def test_interrupted_run_resumes_from_the_last_checkpoint(store, monkeypatch):
+    knowledge_base, store_dir = store
+    write_knowledge_base(knowledge_base, SECTIONS)
+    monkeypatch.setattr(StubVertexEmbeddings, "fail_after", 2)
+    with pytest.raises(RuntimeError, match="quota exceeded"):
+        build()
+    done = embedded_texts()
+    assert len(done) == 2
+    assert len(manifest_sections(store_dir)) == 2
+
+    monkeypatch.setattr(StubVertexEmbeddings, "fail_after", None)
+    build()
+    assert embedded_texts() == sorted(set(SECTIONS.values()) - set(done))
+    assert manifest_sections(store_dir) == sorted(SECTIONS)
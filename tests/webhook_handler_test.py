@@ -0,0 +1,140 @@
+"""
+Unit tests for the Telegram webhook server.
+
+The Telegram Bot API is replaced by a local stub request class, so no
+network access or real bot token is needed.
+"""
+
+import os
+import json
+import time
+import asyncio
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:TEST-TOKEN")
+
+from starlette.testclient import TestClient
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+from telegram.request import BaseRequest
+
+from src.api.webhook_handler import create_app, SECRET_TOKEN_HEADER
+from src.core.config import config
+
+TOKEN = "123456:TEST-TOKEN"
+
+
+class StubBotAPI(BaseRequest):
+    """Answers getMe and records sendMessage calls."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def read_timeout(self):
+        return 5.0
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        if endpoint == "getMe":
+            result = {"id": 123456, "is_bot": True, "first_name": "Stub", "username": "stub_bot"}
+        elif endpoint == "sendMessage":
+            params = request_data.parameters
+            self.sent.append(params["text"])
+            result = {
+                "message_id": len(self.sent), "date": 0, "text": params["text"],
+                "chat": {"id": params["chat_id"], "type": "private"},
+            }
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+async def slow_echo(update, context):
+    await asyncio.sleep(0.3)
+    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"echo: {update.message.text}")
+
+
+WEBHOOK_PATH = "/telegram"
+
+
+def make_client(monkeypatch, secret_token="s3cret"):
+    monkeypatch.setattr(config, "WARMUP_ON_START", False)
+    stub = StubBotAPI()
+    application = ApplicationBuilder().token(TOKEN).updater(None).request(stub).build()
+    application.add_handler(MessageHandler(filters.TEXT, slow_echo))
+    return TestClient(create_app(application, secret_token=secret_token, path=WEBHOOK_PATH)), stub
+
+
+def message_update(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1640995200,
+            "text": text,
+            "from": {"id": 42, "is_bot": False, "first_name": "Test"},
+            "chat": {"id": 42, "type": "private"},
+        },
+    }
+
+
+def test_updates_are_verified_and_dispatched_concurrently(monkeypatch):
+    client, stub = make_client(monkeypatch)
+    headers = {SECRET_TOKEN_HEADER: "s3cret"}
+
+    with client:
+        async def post_all():
+            # The TestClient is synchronous, so issue the requests from worker threads at once
+            return await asyncio.gather(*(
+                asyncio.to_thread(client.post, WEBHOOK_PATH, json=message_update(i, f"hi {i}"), headers=headers)
+                for i in range(5)
+            ))
+
+        started = time.perf_counter()
+        responses = asyncio.run(post_all())
+        elapsed = time.perf_counter() - started
+        metrics = client.get("/metrics").json()
+
+    assert [response.status_code for response in responses] == [200] * 5
+    assert sorted(stub.sent) == [f"echo: hi {i}" for i in range(5)]
+    # Five 0.3 s handlers ran side by side rather than one after another
+    assert elapsed < 1.2
+    assert metrics["webhook"] == {"updates": 5, "rejected": 0, "in_flight": 0}
+
+
+def test_requests_without_the_secret_are_rejected(monkeypatch):
+    client, stub = make_client(monkeypatch)
+
+    with client:
+        assert client.post(WEBHOOK_PATH, json=message_update(1, "hi")).status_code == 403
+        assert client.post(WEBHOOK_PATH, json=message_update(1, "hi"), headers={SECRET_TOKEN_HEADER: "nope"}).status_code == 403
+        # The bot token is no longer part of the URL
+        assert client.post(f"/{TOKEN}", json=message_update(1, "hi"), headers={SECRET_TOKEN_HEADER: "s3cret"}).status_code == 404
+        assert client.post(WEBHOOK_PATH, content=b"not json", headers={SECRET_TOKEN_HEADER: "s3cret"}).status_code == 400
+
+    assert stub.sent == []
+
+
+def test_updates_are_rejected_when_no_secret_is_configured(monkeypatch):
+    client, stub = make_client(monkeypatch, secret_token="")
+
+    with client:
+        assert client.post(WEBHOOK_PATH, json=message_update(1, "hi")).status_code == 403
+        assert client.post(WEBHOOK_PATH, json=message_update(1, "hi"), headers={SECRET_TOKEN_HEADER: ""}).status_code == 403
+
+    assert stub.sent == []
+
+
+def test_health_endpoint_shares_the_server(monkeypatch):
+    client, _ = make_client(monkeypatch, secret_token="")
+
+    with client:
+        response = client.get("/health")
+        assert response.status_code == 200
+        assert response.text == "OK"
+        assert client.get("/ready").status_code in (200, 503)